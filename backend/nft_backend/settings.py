@@ -35,6 +35,9 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'nfts.compression.APICompressionMiddleware',
+    'nfts.profiling.ProfilingMiddleware',
+    'nfts.db_router.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -65,11 +68,17 @@ WSGI_APPLICATION = 'nft_backend.wsgi.application'
 
 # Database Configuration
 DATABASE_URL = config('DATABASE_URL', default='sqlite:///db.sqlite3')
+# Seconds a connection is reused across requests (0 closes it after each request)
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=600, cast=int)
+# Check a reused connection before each request so a dropped one is replaced, not failed on
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
 
 if DATABASE_URL:
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(
+            DATABASE_URL, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS
+        )
     }
 else:
     # Fallback PostgreSQL Configuration
@@ -81,9 +90,27 @@ else:
             'PASSWORD': config('DB_PASSWORD', default=''),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DATABASE_CONN_HEALTH_CHECKS,
         }
     }
 
+# Read replicas (comma-separated database URLs) serving NFT list, detail and similar-image reads
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+# Clients that wrote read from the primary for this long, so they see their own writes
+DATABASE_REPLICA_STICKY_SECONDS = config('DATABASE_REPLICA_STICKY_SECONDS', default=15, cast=int)
+DATABASE_REPLICA_STICKY_COOKIE = 'nft_db_primary'
+
+if DATABASE_REPLICA_URLS:
+    import dj_database_url
+    for index, replica_url in enumerate(DATABASE_REPLICA_URLS, start=1):
+        DATABASES[f'replica_{index}'] = dj_database_url.parse(
+            replica_url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+            test_options={'MIRROR': 'default'},
+        )
+
+DATABASE_ROUTERS = ['nfts.db_router.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -161,11 +188,114 @@ CORS_ALLOW_CREDENTIALS = True
 FILEBASE_ACCESS_KEY = config('FILEBASE_ACCESS_KEY', default='')
 FILEBASE_SECRET_KEY = config('FILEBASE_SECRET_KEY', default='')
 FILEBASE_BUCKET_NAME = config('FILEBASE_BUCKET_NAME', default='nft-minting')
+# Point at a local S3-compatible stand-in (e.g. MinIO) for development and CI
+FILEBASE_ENDPOINT_URL = config('FILEBASE_ENDPOINT_URL', default='https://s3.filebase.com')
+FILEBASE_CONNECT_TIMEOUT = config('FILEBASE_CONNECT_TIMEOUT', default=5, cast=float)
+FILEBASE_READ_TIMEOUT = config('FILEBASE_READ_TIMEOUT', default=30, cast=float)
+
+# Filebase resilience: retries, circuit breaker and hedged HEAD requests
+FILEBASE_MAX_ATTEMPTS = config('FILEBASE_MAX_ATTEMPTS', default=4, cast=int)
+FILEBASE_RETRY_BASE_DELAY = config('FILEBASE_RETRY_BASE_DELAY', default=0.25, cast=float)
+FILEBASE_RETRY_MAX_DELAY = config('FILEBASE_RETRY_MAX_DELAY', default=4.0, cast=float)
+FILEBASE_BREAKER_FAILURE_THRESHOLD = config('FILEBASE_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+FILEBASE_BREAKER_RESET_SECONDS = config('FILEBASE_BREAKER_RESET_SECONDS', default=30, cast=float)
+FILEBASE_HEAD_HEDGE_DELAY = config('FILEBASE_HEAD_HEDGE_DELAY', default=0, cast=float)  # seconds, 0 disables
+
+# Resumable chunked uploads (partial files are kept until finalize succeeds)
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'chunked_uploads'))
+CHUNKED_UPLOAD_CHUNK_SIZE = config('CHUNKED_UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = config('CHUNKED_UPLOAD_MAX_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)
+
+# Idempotency-Key handling for create-nft/
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)  # seconds
+IDEMPOTENCY_WAIT_SECONDS = config('IDEMPOTENCY_WAIT_SECONDS', default=20, cast=float)
+IDEMPOTENCY_POLL_INTERVAL = config('IDEMPOTENCY_POLL_INTERVAL', default=0.5, cast=float)
+# An in-flight job unchanged for this long is abandoned and its key released; keep it above the worker timeout
+IDEMPOTENCY_IN_FLIGHT_LEASE = config('IDEMPOTENCY_IN_FLIGHT_LEASE', default=300, cast=int)  # seconds
+
+# Admission control for upload endpoints (create-nft/, upload-image/, chunked finalize),
+# shared by all workers through the database. Keep ADMISSION_MAX_CONCURRENT below the
+# gunicorn worker count so reads always find a free worker. Rates are uploads per
+# minute; 0 disables a bucket. Off by default; set ADMISSION_CONTROL_ENABLED=True to turn it on.
+ADMISSION_CONTROL_ENABLED = config('ADMISSION_CONTROL_ENABLED', default=False, cast=bool)
+ADMISSION_MAX_CONCURRENT = config('ADMISSION_MAX_CONCURRENT', default=8, cast=int)
+ADMISSION_MAX_CONCURRENT_PER_CLIENT = config('ADMISSION_MAX_CONCURRENT_PER_CLIENT', default=2, cast=int)
+ADMISSION_RESERVED_SLOTS = config('ADMISSION_RESERVED_SLOTS', default=2, cast=int)  # for clients with none in flight
+ADMISSION_CLIENT_RATE = config('ADMISSION_CLIENT_RATE', default=20, cast=float)
+ADMISSION_CLIENT_BURST = config('ADMISSION_CLIENT_BURST', default=5, cast=int)
+ADMISSION_GLOBAL_RATE = config('ADMISSION_GLOBAL_RATE', default=600, cast=float)
+ADMISSION_GLOBAL_BURST = config('ADMISSION_GLOBAL_BURST', default=60, cast=int)
+ADMISSION_LEASE_SECONDS = config('ADMISSION_LEASE_SECONDS', default=300, cast=int)  # frees slots of crashed workers
+ADMISSION_RETRY_AFTER = config('ADMISSION_RETRY_AFTER', default=5, cast=float)  # seconds, when slots are full
+# Identify uploads without an owner_address by the last X-Forwarded-For hop (behind a proxy)
+ADMISSION_TRUST_X_FORWARDED_FOR = config('ADMISSION_TRUST_X_FORWARDED_FOR', default=False, cast=bool)
+
+# Blockchain JSON-RPC (defaults to a local Hardhat node)
+ETH_RPC_URL = config('ETH_RPC_URL', default='http://127.0.0.1:8545')
+ETH_RPC_TIMEOUT = config('ETH_RPC_TIMEOUT', default=10, cast=float)
+NFT_CONTRACT_ADDRESS = config('NFT_CONTRACT_ADDRESS', default='')
+# Contract view calls are cached per block; the head block number is reused for ETH_RPC_HEAD_TTL
+ETH_RPC_CACHE_TTL = config('ETH_RPC_CACHE_TTL', default=60, cast=float)  # seconds
+ETH_RPC_HEAD_TTL = config('ETH_RPC_HEAD_TTL', default=2, cast=float)  # seconds
+ETH_RPC_CACHE_MAX_ENTRIES = config('ETH_RPC_CACHE_MAX_ENTRIES', default=10000, cast=int)
+
+# Event indexer: only blocks this many confirmations deep are indexed
+INDEXER_START_BLOCK = config('INDEXER_START_BLOCK', default=0, cast=int)
+INDEXER_BATCH_SIZE = config('INDEXER_BATCH_SIZE', default=2000, cast=int)  # blocks per eth_getLogs
+INDEXER_CONFIRMATIONS = config('INDEXER_CONFIRMATIONS', default=12, cast=int)
+INDEXER_POLL_INTERVAL = config('INDEXER_POLL_INTERVAL', default=15, cast=float)  # seconds
+
+# Perceptual-hash near-duplicate detection (distances are Hamming bits out of 64)
+PHASH_BLOCK_DUPLICATES = config('PHASH_BLOCK_DUPLICATES', default=False, cast=bool)
+PHASH_DUPLICATE_DISTANCE = config('PHASH_DUPLICATE_DISTANCE', default=4, cast=int)
+PHASH_MAX_SEARCH_DISTANCE = config('PHASH_MAX_SEARCH_DISTANCE', default=12, cast=int)
+# Load the index in each web worker at startup instead of in its first similarity search
+PHASH_WARM_INDEX = config('PHASH_WARM_INDEX', default=True, cast=bool)
+
+# Image uploads are validated from their headers before any pixel data is decoded.
+# Decodes above the pixel budget are downscaled while decoding (JPEG) or wait for one
+# of IMAGE_LARGE_DECODE_SLOTS; a decode peaks at roughly 8 bytes per pixel.
+IMAGE_MAX_DIMENSION = config('IMAGE_MAX_DIMENSION', default=16384, cast=int)  # pixels per side
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=40_000_000, cast=int)
+IMAGE_DECODE_PIXEL_BUDGET = config('IMAGE_DECODE_PIXEL_BUDGET', default=16_000_000, cast=int)
+IMAGE_LARGE_DECODE_SLOTS = config('IMAGE_LARGE_DECODE_SLOTS', default=1, cast=int)  # per process
+IMAGE_MAX_FRAMES = config('IMAGE_MAX_FRAMES', default=200, cast=int)
+# Animated GIF/WebP uploads are re-encoded as animated WebP
+IMAGE_MAX_ANIMATION_PIXELS = config('IMAGE_MAX_ANIMATION_PIXELS', default=300_000_000, cast=int)  # all frames
+IMAGE_MAX_ANIMATION_BYTES = config('IMAGE_MAX_ANIMATION_BYTES', default=10 * 1024 * 1024, cast=int)
+
+# Deep-zoom tile pyramids for uploads sent with deep_zoom=true (DZI layout, 254 + 1px overlap = 256px tiles)
+DEEP_ZOOM_TILE_SIZE = config('DEEP_ZOOM_TILE_SIZE', default=254, cast=int)
+DEEP_ZOOM_TILE_OVERLAP = config('DEEP_ZOOM_TILE_OVERLAP', default=1, cast=int)
+DEEP_ZOOM_TILE_QUALITY = config('DEEP_ZOOM_TILE_QUALITY', default=85, cast=int)
+DEEP_ZOOM_UPLOAD_WORKERS = config('DEEP_ZOOM_UPLOAD_WORKERS', default=8, cast=int)
+
+# API response compression (brotli when the package is installed, otherwise gzip)
+API_COMPRESSION_ENABLED = config('API_COMPRESSION_ENABLED', default=True, cast=bool)
+API_COMPRESSION_PATH_PREFIX = config('API_COMPRESSION_PATH_PREFIX', default='/api/')
+API_COMPRESSION_MIN_SIZE = config('API_COMPRESSION_MIN_SIZE', default=1024, cast=int)  # bytes
+API_COMPRESSION_GZIP_LEVEL = config('API_COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+API_COMPRESSION_BROTLI_QUALITY = config('API_COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Memory-mapped store of pre-rendered NFT detail and token metadata JSON, mapped by every
+# worker (see nfts.metadata_store). Empty serves both from the database.
+METADATA_STORE_PATH = config('METADATA_STORE_PATH', default='')
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Request profiling (opt-in)
+# With a slow threshold set, every matching request runs under cProfile and
+# only the slow or sampled ones are kept.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)
+PROFILING_SLOW_THRESHOLD_MS = config('PROFILING_SLOW_THRESHOLD_MS', default=0, cast=int)
+PROFILING_PATHS = config('PROFILING_PATHS', default='/api/create-nft/', cast=lambda v: [s.strip() for s in v.split(',')])
+PROFILING_DIR = config('PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_PROFILES = config('PROFILING_MAX_PROFILES', default=200, cast=int)
+PROFILING_MAX_QUERIES = config('PROFILING_MAX_QUERIES', default=500, cast=int)
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
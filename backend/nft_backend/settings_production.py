@@ -22,9 +22,11 @@ ALLOWED_HOSTS = config(
 
 # Database configuration for Render PostgreSQL
 if 'DATABASE_URL' in os.environ:
-    DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
-    }
+    DATABASES['default'] = dj_database_url.parse(
+        os.environ.get('DATABASE_URL'),
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
 
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
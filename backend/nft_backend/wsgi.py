@@ -18,3 +18,10 @@ else:
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nft_backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.PHASH_WARM_INDEX:
+    from nfts.phash import get_phash_index
+
+    get_phash_index().warm()
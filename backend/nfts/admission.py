@@ -0,0 +1,204 @@
+"""
+Admission control for upload endpoints.
+
+An upload holds a gunicorn worker for seconds while Filebase works, so one
+wallet scripting create-nft/ could occupy every worker and starve everyone
+else. With ADMISSION_CONTROL_ENABLED (off by default), upload views using
+``AdmissionControlMixin`` first pass ``admit``, which checks two things in
+one transaction. Because the state lives in the database, every worker
+sees the same limits:
+
+- token buckets per client and overall (ADMISSION_*_RATE uploads per minute,
+  bursts of up to ADMISSION_*_BURST);
+- leases on uploads in flight: at most ADMISSION_MAX_CONCURRENT overall and
+  ADMISSION_MAX_CONCURRENT_PER_CLIENT per client. The last
+  ADMISSION_RESERVED_SLOTS are kept for clients with nothing in flight, so a
+  busy client never takes the last slots from a newcomer.
+
+A refused request gets 429 with Retry-After at once instead of waiting
+inside a worker; clients wait and retry on their side. An admitted upload
+that the view answers with another 4xx (invalid data, say) gets its tokens
+back. A client is the request's owner_address, or its IP address for
+uploads without one. The lease of a worker that died mid-upload expires
+after ADMISSION_LEASE_SECONDS.
+"""
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import AdmissionBucket, AdmissionLease
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'global'
+
+WALLET_PATTERN = re.compile(r'^0x[0-9a-f]{40}$')
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upload may not start now"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+def client_ip(request) -> str:
+    if settings.ADMISSION_TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            # The last hop is the one added by our own proxy
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request) -> str:
+    """Admission identity of an upload request: its owner wallet, else its IP address"""
+    owner = str(request.data.get('owner_address', '')).strip().lower()
+    if WALLET_PATTERN.match(owner):
+        return f"wallet:{owner}"
+    return f"ip:{client_ip(request)}"
+
+
+def take_token(bucket: AdmissionBucket, rate: float, burst: int, now: datetime) -> float:
+    """Refill ``bucket`` up to ``now`` and take a token; seconds until one is available when empty"""
+    per_second = rate / 60
+    elapsed = max((now - bucket.refilled_at).total_seconds(), 0.0)
+    bucket.tokens = min(float(burst), bucket.tokens + elapsed * per_second)
+    bucket.refilled_at = now
+    if bucket.tokens < 1:
+        return (1 - bucket.tokens) / per_second
+    bucket.tokens -= 1
+    return 0.0
+
+
+def locked_bucket(key: str, burst: int, now: datetime) -> AdmissionBucket:
+    AdmissionBucket.objects.get_or_create(key=key, defaults={'tokens': float(burst), 'refilled_at': now})
+    return AdmissionBucket.objects.select_for_update().get(key=key)
+
+
+def _admit(key: str, now: datetime) -> AdmissionLease:
+    with transaction.atomic():
+        # Every admission locks the global bucket first, so admissions are serialized across workers
+        buckets = [(locked_bucket(GLOBAL_KEY, settings.ADMISSION_GLOBAL_BURST, now),
+                    settings.ADMISSION_GLOBAL_RATE, settings.ADMISSION_GLOBAL_BURST)]
+        if settings.ADMISSION_CLIENT_RATE > 0:
+            buckets.append((locked_bucket(key, settings.ADMISSION_CLIENT_BURST, now),
+                            settings.ADMISSION_CLIENT_RATE, settings.ADMISSION_CLIENT_BURST))
+
+        AdmissionLease.objects.filter(expires_at__lte=now).delete()
+        in_flight = AdmissionLease.objects.count()
+        held = AdmissionLease.objects.filter(client_key=key).count()
+        free = settings.ADMISSION_MAX_CONCURRENT - in_flight
+        if held >= settings.ADMISSION_MAX_CONCURRENT_PER_CLIENT:
+            raise AdmissionRejected(f"{held} uploads from this client are already in progress",
+                                    settings.ADMISSION_RETRY_AFTER)
+        if free <= 0 or (held and free <= settings.ADMISSION_RESERVED_SLOTS):
+            raise AdmissionRejected('All upload slots are in use', settings.ADMISSION_RETRY_AFTER)
+
+        for bucket, rate, burst in buckets:
+            if rate <= 0:
+                continue
+            wait = take_token(bucket, rate, burst, now)
+            if wait:
+                scope = 'Upload' if bucket.key == GLOBAL_KEY else 'Client upload'
+                raise AdmissionRejected(f"{scope} rate limit of {rate:g} per minute exceeded", wait)
+            bucket.save(update_fields=['tokens', 'refilled_at'])
+
+        return AdmissionLease.objects.create(
+            client_key=key,
+            acquired_at=now,
+            expires_at=now + timedelta(seconds=settings.ADMISSION_LEASE_SECONDS)
+        )
+
+
+def admit(key: str, now: Optional[datetime] = None) -> Optional[AdmissionLease]:
+    """Lease for starting an upload for client ``key``, or raise AdmissionRejected"""
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        return None
+    try:
+        return _admit(key, now or timezone.now())
+    except DatabaseError as e:
+        # Admission control must never take uploads down with it
+        logger.error(f"Admission check failed, admitting upload: {e}")
+        return None
+
+
+def release(lease: AdmissionLease):
+    """Free the upload slot held by ``lease``"""
+    try:
+        AdmissionLease.objects.filter(pk=lease.pk).delete()
+    except DatabaseError as e:
+        # The lease expires on its own
+        logger.error(f"Failed to release admission lease {lease.pk}: {e}")
+
+
+def refund(lease: AdmissionLease):
+    """Return the tokens taken when ``lease`` was admitted"""
+    buckets = [(GLOBAL_KEY, settings.ADMISSION_GLOBAL_RATE, settings.ADMISSION_GLOBAL_BURST),
+               (lease.client_key, settings.ADMISSION_CLIENT_RATE, settings.ADMISSION_CLIENT_BURST)]
+    try:
+        with transaction.atomic():
+            for key, rate, burst in buckets:
+                if rate > 0:
+                    AdmissionBucket.objects.filter(key=key).update(tokens=Least(F('tokens') + 1, float(burst)))
+    except DatabaseError as e:
+        logger.error(f"Failed to refund admission tokens of lease {lease.pk}: {e}")
+
+
+def evict_idle_buckets() -> int:
+    """Delete client buckets that have refilled completely (a missing bucket starts full)"""
+    idle = timedelta(minutes=settings.ADMISSION_CLIENT_BURST / max(settings.ADMISSION_CLIENT_RATE, 1e-9))
+    now = timezone.now()
+    AdmissionLease.objects.filter(expires_at__lte=now).delete()
+    deleted, _ = AdmissionBucket.objects.exclude(key=GLOBAL_KEY).filter(refilled_at__lt=now - idle).delete()
+    return deleted
+
+
+def rejected_response(error: AdmissionRejected):
+    """429 response telling the client when to retry its upload"""
+    response = Response({
+        'success': False,
+        'error': 'Too many uploads, retry later',
+        'details': str(error)
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(max(math.ceil(error.retry_after), 1))
+    return response
+
+
+class AdmissionControlMixin:
+    """APIView mixin admitting uploads through ``admit`` and freeing their slot after the response"""
+    admission_methods = ('POST',)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.admission_lease = None
+        response = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            return response
+        finally:
+            if self.admission_lease is not None:
+                if response is not None and 400 <= response.status_code < 500:
+                    # Refused by the view (invalid data, duplicate image): don't count it against the rate
+                    refund(self.admission_lease)
+                release(self.admission_lease)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in self.admission_methods:
+            self.admission_lease = admit(client_key(request))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, AdmissionRejected):
+            return rejected_response(exc)
+        return super().handle_exception(exc)
@@ -0,0 +1,162 @@
+"""
+Streaming CAR (Content Addressable aRchive) writer for IPFS directories.
+
+Builds a flat UnixFS directory of files and writes it as a CARv1 into a
+file object, one file at a time, so memory use is bounded by the largest
+file plus a (name, CID, size) entry per directory link. Files use CIDv1
+raw leaves (chunked under a dag-pb file node above CHUNK_SIZE), and the
+directory is a dag-pb node, matching what `ipfs add --cid-version=1` makes.
+"""
+import hashlib
+from typing import BinaryIO, List, Tuple
+
+CHUNK_SIZE = 256 * 1024
+
+# Multicodec codes
+RAW = 0x55
+DAG_PB = 0x70
+SHA2_256 = 0x12
+
+# UnixFS Data.DataType
+UNIXFS_DIRECTORY = 1
+UNIXFS_FILE = 2
+
+# Gateways and bitswap refuse blocks above 1 MiB; a flat directory must fit in one
+MAX_BLOCK_SIZE = 1024 * 1024
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def make_cid(codec: int, block: bytes) -> bytes:
+    """Binary CIDv1 with a sha2-256 multihash"""
+    digest = hashlib.sha256(block).digest()
+    return bytes([1]) + varint(codec) + bytes([SHA2_256, len(digest)]) + digest
+
+
+BASE32_ALPHABET = 'abcdefghijklmnopqrstuvwxyz234567'
+
+
+def cid_to_str(cid: bytes) -> str:
+    """Multibase base32 (``b...``) string form of a binary CID"""
+    bits = int.from_bytes(cid, 'big')
+    length = len(cid) * 8
+    pad = (5 - length % 5) % 5
+    bits <<= pad
+    chars = []
+    for shift in range(length + pad - 5, -1, -5):
+        chars.append(BASE32_ALPHABET[(bits >> shift) & 0x1F])
+    return 'b' + ''.join(chars)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, value: bytes) -> bytes:
+    return _field(number, 2) + varint(len(value)) + value
+
+
+def unixfs_data(data_type: int, filesize: int = None, blocksizes: List[int] = ()) -> bytes:
+    out = _field(1, 0) + varint(data_type)
+    if filesize is not None:
+        out += _field(3, 0) + varint(filesize)
+    for size in blocksizes:
+        out += _field(4, 0) + varint(size)
+    return out
+
+
+def dag_pb_node(links: List[Tuple[bytes, str, int]], data: bytes) -> bytes:
+    """Canonical dag-pb PBNode: Links (field 2) before Data (field 1)"""
+    out = bytearray()
+    for cid, name, tsize in links:
+        link = _bytes_field(1, cid) + _bytes_field(2, name.encode('utf-8')) + _field(3, 0) + varint(tsize)
+        out += _bytes_field(2, link)
+    out += _bytes_field(1, data)
+    return bytes(out)
+
+
+def car_header(root: bytes) -> bytes:
+    """CARv1 header: dag-cbor {"roots": [root], "version": 1}"""
+    tagged_cid = b'\x00' + root
+    cbor = (
+        b'\xa2'
+        + b'\x65roots' + b'\x81' + b'\xd8\x2a' + b'\x58' + bytes([len(tagged_cid)]) + tagged_cid
+        + b'\x67version' + b'\x01'
+    )
+    return varint(len(cbor)) + cbor
+
+
+class CarDirectoryWriter:
+    """Writes files into a CAR as a single flat UnixFS directory
+
+    The header needs the root CID, which is only known once every file has
+    been added. CIDv1 sha2-256 CIDs have a fixed length, so a placeholder
+    header is written first and overwritten in ``finish``; ``out`` must be
+    seekable (e.g. a temporary file).
+    """
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.links: List[Tuple[bytes, str, int]] = []
+        self._start = out.tell()
+        self._header_size = len(car_header(make_cid(DAG_PB, b'')))
+        out.write(b'\x00' * self._header_size)
+
+    def _write_block(self, cid: bytes, block: bytes):
+        self.out.write(varint(len(cid) + len(block)))
+        self.out.write(cid)
+        self.out.write(block)
+
+    def add_file(self, name: str, content: bytes) -> bytes:
+        """Add one file to the directory and return its CID"""
+        if '/' in name or not name:
+            raise ValueError(f"Invalid directory entry name: {name!r}")
+
+        if len(content) <= CHUNK_SIZE:
+            cid = make_cid(RAW, content)
+            self._write_block(cid, content)
+            self.links.append((cid, name, len(content)))
+            return cid
+
+        leaves = []
+        for offset in range(0, len(content), CHUNK_SIZE):
+            chunk = content[offset:offset + CHUNK_SIZE]
+            leaf = make_cid(RAW, chunk)
+            self._write_block(leaf, chunk)
+            leaves.append((leaf, '', len(chunk)))
+        node = dag_pb_node(
+            leaves, unixfs_data(UNIXFS_FILE, filesize=len(content), blocksizes=[size for _, _, size in leaves])
+        )
+        cid = make_cid(DAG_PB, node)
+        self._write_block(cid, node)
+        self.links.append((cid, name, len(node) + sum(size for _, _, size in leaves)))
+        return cid
+
+    def finish(self) -> bytes:
+        """Write the directory node and the real header; returns the root CID"""
+        links = sorted(self.links, key=lambda link: link[1].encode('utf-8'))
+        names = [link[1] for link in links]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate directory entry names")
+
+        node = dag_pb_node(links, unixfs_data(UNIXFS_DIRECTORY))
+        if len(node) > MAX_BLOCK_SIZE:
+            raise ValueError(f"Directory of {len(links)} entries exceeds the {MAX_BLOCK_SIZE} byte block limit")
+        root = make_cid(DAG_PB, node)
+        self._write_block(root, node)
+
+        end = self.out.tell()
+        self.out.seek(self._start)
+        self.out.write(car_header(root))
+        self.out.seek(end)
+        return root
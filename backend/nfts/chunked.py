@@ -0,0 +1,64 @@
+"""
+Temp storage for resumable chunked uploads.
+
+Each UploadSession gets one partial file that chunks are written into at
+their byte offset, streamed from the request without buffering the file.
+"""
+import os
+from typing import BinaryIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+# Size of the buffer used when copying a chunk from the request stream
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+def partial_path(session_id) -> str:
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{session_id}.part")
+
+
+def create_partial(session_id):
+    """Create the empty partial file for a new session"""
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(partial_path(session_id), 'wb').close()
+
+
+def has_partial(session_id) -> bool:
+    """Whether ``session_id`` is a chunked upload whose partial file still exists"""
+    return os.path.isfile(partial_path(session_id))
+
+
+def write_chunk(session_id, offset: int, stream: BinaryIO, length: int) -> int:
+    """Copy up to ``length`` bytes from ``stream`` into the partial file at ``offset``
+
+    Returns the number of bytes actually received, which is less than
+    ``length`` if the client disconnected mid-chunk.
+    """
+    written = 0
+    with open(partial_path(session_id), 'r+b') as fh:
+        fh.seek(offset)
+        while written < length:
+            block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not block:
+                break
+            fh.write(block)
+            written += len(block)
+    return written
+
+
+def open_upload(session) -> UploadedFile:
+    """Open a completed partial file as an uploaded file for the NFT pipeline"""
+    return UploadedFile(
+        file=open(partial_path(session.session_id), 'rb'),
+        name=session.original_filename,
+        content_type=session.content_type,
+        size=session.file_size
+    )
+
+
+def discard_partial(session_id):
+    try:
+        os.remove(partial_path(session_id))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,148 @@
+"""
+Response compression for the API.
+
+Whitenoise only pre-compresses static files, so API JSON went out as is.
+This middleware negotiates brotli (when the ``brotli`` package is
+installed) or gzip from Accept-Encoding, skips bodies below a size
+threshold, and compresses streaming responses chunk by chunk.
+"""
+import gzip
+import logging
+import re
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+ACCEPT_ENCODING_RE = re.compile(r'^\s*([a-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$', re.IGNORECASE)
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Best of ``available`` for an Accept-Encoding header, or None for identity"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            weights[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+
+    best = None
+    best_weight = 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        # Ties keep the earlier (preferred) encoding
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES or media_type.endswith('+json')
+
+
+def compress_bytes(encoding: str, content: bytes, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=brotli_quality)
+    return gzip.compress(content, compresslevel=gzip_level, mtime=0)
+
+
+def compress_stream(encoding: str, chunks: Iterable[bytes], gzip_level: int = 6,
+                    brotli_quality: int = 5) -> Iterator[bytes]:
+    """Compress a streaming body, flushing after every chunk so clients see data as it is produced"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class APICompressionMiddleware:
+    """Compress API responses with the best encoding the client accepts"""
+
+    def __init__(self, get_response):
+        if not settings.API_COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.path_prefix = settings.API_COMPRESSION_PATH_PREFIX
+        self.min_size = settings.API_COMPRESSION_MIN_SIZE
+        self.gzip_level = settings.API_COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = settings.API_COMPRESSION_BROTLI_QUALITY
+        self.encodings = supported_encodings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.path.startswith(self.path_prefix):
+            self.compress(request, response)
+        return response
+
+    def compress(self, request, response):
+        if response.status_code in (204, 304) or response.has_header('Content-Encoding'):
+            return
+        if not is_compressible(response.get('Content-Type', '')):
+            return
+
+        if response.streaming:
+            declared = response.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) < self.min_size:
+                return
+        elif len(response.content) < self.min_size:
+            return
+
+        # The representation now depends on Accept-Encoding, even for clients that get identity
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                encoding, response.streaming_content, self.gzip_level, self.brotli_quality
+            )
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_bytes(encoding, response.content, self.gzip_level, self.brotli_quality)
+            if len(compressed) >= len(response.content):
+                return
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is not byte-identical to the one the ETag was computed for
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
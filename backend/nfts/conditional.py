@@ -0,0 +1,56 @@
+"""
+Cheap HTTP validators for NFT metadata responses.
+
+ETags and Last-Modified come from ``NFTMetadata.updated_at`` (plus the row
+count for lists) and the full request path, so a conditional GET for an
+unchanged page is answered with 304 after one aggregate query, before any
+rows are fetched or serialized. Attribute rows do not touch
+``updated_at``; code that edits them must call
+``traits.sync_attributes_json``, which also bumps it.
+"""
+import calendar
+import datetime
+import hashlib
+from typing import Optional, Tuple
+
+from django.db.models import Count, Max, QuerySet
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+Validators = Tuple[str, Optional[datetime.datetime]]
+
+
+def make_etag(*parts) -> str:
+    """Quoted strong ETag for the given version parts"""
+    return quote_etag(hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest())
+
+
+def list_validators(request, queryset: QuerySet) -> Validators:
+    """Validators for a list page: row count and newest updated_at of the whole listing"""
+    summary = queryset.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    etag = make_etag(request.get_full_path(), summary['count'], summary['last_modified'])
+    return etag, summary['last_modified']
+
+
+def object_validators(request, updated_at: datetime.datetime) -> Validators:
+    return make_etag(request.get_full_path(), updated_at), updated_at
+
+
+def not_modified_response(request, validators: Validators):
+    """304 (or 412) response if the client's copy is current, otherwise None"""
+    etag, last_modified = validators
+    timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def set_validators(response, validators: Validators):
+    """Attach ETag/Last-Modified and require revalidation instead of heuristic caching"""
+    etag, last_modified = validators
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    return response
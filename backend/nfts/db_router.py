@@ -0,0 +1,129 @@
+"""
+Read-replica routing for read-heavy NFT endpoints.
+
+Only views using ``ReplicaReadMixin`` (NFT list, detail and similar-image
+search) read from ``DATABASE_REPLICA_URLS``; everything else, including
+every write, stays on the primary. A replica lags the primary, so a client
+whose request wrote to the primary (a mint, say) gets a short-lived cookie
+from ``ReplicaStickinessMiddleware`` and reads from the primary until it
+expires, so it always sees its own writes.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set while a replica-eligible view runs
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+# Set for requests from clients that wrote recently
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+
+SAFE_STATEMENTS = ('SELECT', 'SHOW', 'EXPLAIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'SET')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside the block to a replica, unless the client is pinned to the primary"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Keep reads inside the block on the primary, e.g. to see uncommitted rows"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+    """Database router sending opted-in reads to a random replica and everything else to the primary"""
+
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if self.replicas and _replica_reads.get() and not _pinned.get():
+            return random.choice(self.replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """APIView mixin serving read-only requests from a replica"""
+    replica_methods = ('GET', 'HEAD')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.replica_methods:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class WriteDetector:
+    """Database execute wrapper noting whether a request changed the primary"""
+
+    def __init__(self):
+        self.wrote = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.wrote and not sql.lstrip().upper().startswith(SAFE_STATEMENTS):
+            self.wrote = True
+        return execute(sql, params, many, context)
+
+
+class ReplicaStickinessMiddleware:
+    """Pin clients to the primary for DATABASE_REPLICA_STICKY_SECONDS after they write
+
+    Writes are detected on the ``default`` connection of the request thread
+    only. Writes made from other threads (a hedge executor, say) or to
+    other aliases do not set the cookie.
+    """
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.cookie_name = settings.DATABASE_REPLICA_STICKY_COOKIE
+        self.sticky_seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        detector = WriteDetector()
+        token = _pinned.set(self.cookie_name in request.COOKIES)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(detector):
+                response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if detector.wrote and self.sticky_seconds:
+            # The frontend calls the API cross-site, which needs SameSite=None (HTTPS only)
+            secure = request.is_secure()
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.sticky_seconds, httponly=True,
+                secure=secure, samesite='None' if secure else 'Lax',
+            )
+        return response
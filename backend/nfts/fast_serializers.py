@@ -0,0 +1,98 @@
+"""
+Read-only fast path for NFT list and detail responses.
+
+NFTMetadataSerializer builds a field tree and runs per-field
+to_representation calls for every row and attribute, which costs more than
+the SQL on a typical list page. These helpers produce the same output from
+``.values()`` rows, taking attributes from the denormalized
+``attributes_json`` column (see nfts.traits) instead of a join, and
+FastJSONRenderer encodes with orjson when it is installed.
+"""
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import traits
+from .serializers import NFTMetadataSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+# Output fields and order follow the DRF serializers so the two stay in sync
+NFT_FIELDS: Tuple[str, ...] = tuple(NFTMetadataSerializer.Meta.fields)
+DATETIME_FIELDS = frozenset({'minted_at', 'created_at', 'updated_at'})
+
+# Serializer fields whose values() column has a different name
+COLUMNS = {'collection': 'collection_id', 'attributes': 'attributes_json'}
+
+
+def parse_fields(raw: Optional[str]) -> Tuple[str, ...]:
+    """Fields selected by a ``fields=a,b,c`` query parameter, in serializer order"""
+    if not raw:
+        return NFT_FIELDS
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = sorted(requested - set(NFT_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(field for field in NFT_FIELDS if field in requested)
+
+
+def nft_values(queryset: QuerySet, fields: Sequence[str] = NFT_FIELDS) -> QuerySet:
+    """``queryset`` as dict rows holding just the columns ``fields`` need"""
+    return queryset.values(*[COLUMNS.get(field, field) for field in fields])
+
+
+def format_datetime(value: Optional[datetime.datetime], tz) -> Optional[str]:
+    """Same representation as DRF's DateTimeField with the default ISO 8601 format"""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(tz)
+    representation = value.isoformat()
+    if representation.endswith('+00:00'):
+        representation = representation[:-6] + 'Z'
+    return representation
+
+
+def serialize_rows(rows: Iterable[Dict[str, Any]], fields: Sequence[str] = NFT_FIELDS) -> List[Dict[str, Any]]:
+    """NFTMetadataSerializer-equivalent dicts for rows from ``nft_values``"""
+    tz = timezone.get_current_timezone()
+    columns = [(field, COLUMNS.get(field, field)) for field in fields]
+    results = []
+    for row in rows:
+        item = {}
+        for field, column in columns:
+            if field == 'attributes':
+                item[field] = traits.ordered(row[column])
+            elif field in DATETIME_FIELDS:
+                item[field] = format_datetime(row[column], tz)
+            else:
+                item[field] = row[column]
+        results.append(item)
+    return results
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when available, byte-for-byte compatible"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Datetimes and other non-JSON types go through DRF's encoder as usual
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Like JSONRenderer, escape the separators that are invalid in JavaScript strings
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,453 @@
+"""
+Generative collections.
+
+Composes NFT images from trait layers: one directory per trait type, one
+RGBA PNG per value named ``<value>#<weight>.png`` (the weight is optional
+and defaults to 1). Combinations are drawn by rarity weight and checked
+against a set of the combinations already in the collection, so no two
+NFTs share the same traits.
+
+Layers are decoded once into premultiplied-alpha NumPy arrays cropped to
+their visible area. A pool of render processes shares them (copy-on-write
+where processes are forked) and composites each image over white with
+integer array arithmetic. The PNGs then go through
+FilebaseService.upload_complete_nft like any other upload, from a few
+upload threads, and the NFT and attribute rows are written as uploads
+complete.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from . import stats
+from . import traits
+from .metadata_store import refresh_nfts
+from .models import NFTCollection, NFTMetadata
+from .resilience import FilebaseUnavailableError
+
+logger = logging.getLogger(__name__)
+
+LAYER_EXTENSION = '.png'
+
+# Value index per trait, in compositing order
+Combination = Tuple[int, ...]
+
+# After this many draws per requested NFT, sample the remaining combinations directly
+MAX_DRAWS_PER_NFT = 50
+
+# Largest layer set whose combinations are enumerated for that fallback
+MAX_ENUMERATED_COMBINATIONS = 10_000_000
+
+
+@dataclass
+class TraitValue:
+    value: str
+    weight: float
+    path: str
+
+
+@dataclass
+class Trait:
+    trait_type: str
+    values: List[TraitValue]
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        weights = np.array([value.weight for value in self.values], dtype=np.float64)
+        return weights / weights.sum()
+
+
+def parse_layer_name(filename: str) -> Tuple[str, float]:
+    """Trait value and rarity weight from a ``<value>#<weight>.png`` file name"""
+    stem = filename[:-len(LAYER_EXTENSION)]
+    value, separator, weight = stem.rpartition('#')
+    if not separator:
+        return stem, 1.0
+    try:
+        parsed = float(weight)
+    except ValueError:
+        raise ValueError(f"Layer {filename}: weight {weight!r} is not a number")
+    if not parsed > 0:
+        raise ValueError(f"Layer {filename}: weight must be positive")
+    return value, parsed
+
+
+class LayerSet:
+    """Trait layers in compositing order, bottom first"""
+
+    def __init__(self, traits: List[Trait]):
+        if not traits:
+            raise ValueError("A generative collection needs at least one trait")
+        self.traits = traits
+
+    @classmethod
+    def from_directory(cls, directory: str, order: Optional[Sequence[str]] = None) -> 'LayerSet':
+        """Load ``<directory>/<trait_type>/<value>#<weight>.png``; traits stack in ``order`` or by name"""
+        if not os.path.isdir(directory):
+            raise ValueError(f"Layer directory {directory} does not exist")
+        available = sorted(
+            name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))
+        )
+        order = list(order) if order else available
+        missing = sorted(set(order) - set(available))
+        if missing:
+            raise ValueError(f"No layer directory for traits: {', '.join(missing)}")
+
+        traits = []
+        for trait_type in order:
+            trait_dir = os.path.join(directory, trait_type)
+            values = [
+                TraitValue(*parse_layer_name(name), path=os.path.join(trait_dir, name))
+                for name in sorted(os.listdir(trait_dir))
+                if name.lower().endswith(LAYER_EXTENSION)
+            ]
+            if not values:
+                raise ValueError(f"Trait {trait_type} has no {LAYER_EXTENSION} layers")
+            traits.append(Trait(trait_type, values))
+        return cls(traits)
+
+    @property
+    def capacity(self) -> int:
+        """Number of distinct combinations"""
+        total = 1
+        for trait in self.traits:
+            total *= len(trait.values)
+        return total
+
+    def attributes(self, combination: Combination) -> List[Dict[str, str]]:
+        return [
+            {'trait_type': trait.trait_type, 'value': trait.values[index].value}
+            for trait, index in zip(self.traits, combination)
+        ]
+
+    def combination_for(self, attributes: Dict[str, str]) -> Optional[Combination]:
+        """Combination matching an NFT's trait_type -> value attributes, if it is one of this set's"""
+        combination = []
+        for trait in self.traits:
+            value = attributes.get(trait.trait_type)
+            index = next((i for i, candidate in enumerate(trait.values) if candidate.value == value), None)
+            if index is None:
+                return None
+            combination.append(index)
+        return tuple(combination)
+
+
+@dataclass
+class Layer:
+    """A decoded layer, cropped to the box where its alpha is non-zero"""
+    top: int
+    left: int
+    rgb: np.ndarray  # premultiplied, uint16, (h, w, 3)
+    inverse_alpha: Optional[np.ndarray]  # 255 - alpha, uint16, (h, w, 1); None when fully opaque
+
+    def composite_over(self, canvas: np.ndarray):
+        """Porter-Duff "over" onto an opaque uint16 canvas, in place"""
+        height, width = self.rgb.shape[:2]
+        region = canvas[self.top:self.top + height, self.left:self.left + width]
+        if self.inverse_alpha is None:
+            region[...] = self.rgb
+            return
+        # region * (255 - alpha) / 255, rounded, without leaving uint16 (max 65025 before rounding)
+        np.multiply(region, self.inverse_alpha, out=region)
+        region += 128
+        region += region >> 8
+        region >>= 8
+        region += self.rgb
+
+
+def decode_layer(path: str, size: Optional[Tuple[int, int]]) -> Tuple[Optional[Layer], Tuple[int, int]]:
+    """Premultiplied, cropped layer (None if fully transparent) and the PNG's size"""
+    with Image.open(path) as image:
+        if size is not None and image.size != size:
+            raise ValueError(f"Layer {path} is {image.size[0]}x{image.size[1]}; expected {size[0]}x{size[1]}")
+        pixels = np.asarray(image.convert('RGBA'))
+        image_size = image.size
+
+    alpha = pixels[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not len(rows):
+        return None, image_size
+    columns = np.flatnonzero(alpha.any(axis=0))
+    top, bottom, left, right = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+    cropped = pixels[top:bottom, left:right].astype(np.uint16)
+
+    alpha = cropped[..., 3:4]
+    if (alpha == 255).all():
+        return Layer(int(top), int(left), np.ascontiguousarray(cropped[..., :3]), None), image_size
+    rgb = (cropped[..., :3] * alpha + 127) // 255
+    return Layer(int(top), int(left), rgb, 255 - alpha), image_size
+
+
+class LayerStack:
+    """Every layer of a LayerSet, decoded once and ready to composite"""
+
+    def __init__(self, layer_set: LayerSet):
+        self.size: Optional[Tuple[int, int]] = None
+        self.layers: List[List[Optional[Layer]]] = []
+        for trait in layer_set.traits:
+            decoded = []
+            for value in trait.values:
+                layer, self.size = decode_layer(value.path, self.size)
+                decoded.append(layer)
+            self.layers.append(decoded)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            layer.rgb.nbytes + (layer.inverse_alpha.nbytes if layer.inverse_alpha is not None else 0)
+            for trait in self.layers for layer in trait if layer is not None
+        )
+
+    def render(self, combination: Combination) -> np.ndarray:
+        """RGB uint8 image of a combination over white (transparency is flattened as for uploads)"""
+        width, height = self.size
+        canvas = np.full((height, width, 3), 255, dtype=np.uint16)
+        for trait_layers, index in zip(self.layers, combination):
+            layer = trait_layers[index]
+            if layer is not None:
+                layer.composite_over(canvas)
+        return canvas.astype(np.uint8)
+
+    def render_png(self, combination: Combination) -> bytes:
+        output = BytesIO()
+        # Fast, lossless: the upload pipeline re-encodes it anyway
+        Image.fromarray(self.render(combination)).save(output, format='PNG', compress_level=1)
+        return output.getvalue()
+
+
+def draw_combinations(layer_set: LayerSet, count: int, taken: Set[Combination],
+                      seed: Optional[int] = None) -> List[Combination]:
+    """``count`` new combinations drawn by rarity weight; they are added to ``taken``"""
+    available = layer_set.capacity - len(taken)
+    if count > available:
+        raise ValueError(f"Only {available} unused trait combinations remain; requested {count}")
+
+    rng = np.random.default_rng(seed)
+    combinations: List[Combination] = []
+    draws = 0
+    while len(combinations) < count:
+        if draws > MAX_DRAWS_PER_NFT * count:
+            # Rejection sampling stalls once most likely combinations are taken
+            combinations += sample_remaining(layer_set, count - len(combinations), taken, rng)
+            break
+        batch = max(count - len(combinations), 256)
+        columns = [
+            rng.choice(len(trait.values), size=batch, p=trait.probabilities)
+            for trait in layer_set.traits
+        ]
+        draws += batch
+        for combination in zip(*(column.tolist() for column in columns)):
+            if combination in taken:
+                continue
+            taken.add(combination)
+            combinations.append(combination)
+            if len(combinations) == count:
+                break
+    return combinations
+
+
+def sample_remaining(layer_set: LayerSet, count: int, taken: Set[Combination],
+                     rng: np.random.Generator) -> List[Combination]:
+    """``count`` untaken combinations, weighted by rarity, without replacement"""
+    if layer_set.capacity > MAX_ENUMERATED_COMBINATIONS:
+        raise ValueError(
+            f"Could not draw {count} more unique combinations; the rarity weights leave too few likely ones"
+        )
+    shape = tuple(len(trait.values) for trait in layer_set.traits)
+    weights = np.ones(layer_set.capacity)
+    for trait, indices in zip(layer_set.traits, np.indices(shape).reshape(len(shape), -1)):
+        weights *= trait.probabilities[indices]
+    if taken:
+        weights[np.ravel_multi_index(np.array(list(taken)).T, shape)] = 0
+    picked = rng.choice(layer_set.capacity, size=count, replace=False, p=weights / weights.sum())
+
+    combinations = [tuple(combination) for combination in np.stack(np.unravel_index(picked, shape), 1).tolist()]
+    taken.update(combinations)
+    return combinations
+
+
+def existing_combinations(collection: NFTCollection, layer_set: LayerSet) -> Set[Combination]:
+    """Combinations of the collection's NFTs that match this layer set"""
+    combinations = set()
+    for nft_attributes in collection.nftmetadata_set.values_list(
+        'attributes_json', flat=True
+    ).iterator(chunk_size=2000):
+        combination = layer_set.combination_for(
+            {attribute['trait_type']: attribute['value'] for attribute in nft_attributes}
+        )
+        if combination is not None:
+            combinations.add(combination)
+    return combinations
+
+
+def bounded_map(executor: Executor, func: Callable, items: Iterable, max_in_flight: int) -> Iterator:
+    """Like ``executor.map`` in order, but with at most ``max_in_flight`` results pending in memory"""
+    pending = deque()
+    for item in items:
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+        pending.append(executor.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+_worker_stack: Optional[LayerStack] = None
+
+
+def _init_render_worker(stack: LayerStack):
+    global _worker_stack
+    _worker_stack = stack
+
+
+def _render_in_worker(combination: Combination) -> bytes:
+    return _worker_stack.render_png(combination)
+
+
+def render_pool(stack: LayerStack, workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers hold the decoded layers"""
+    # Forked workers share the parent's arrays copy-on-write instead of unpickling a copy each
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=_init_render_worker, initargs=(stack,)
+    )
+
+
+@dataclass
+class Edition:
+    number: int
+    combination: Combination
+    attributes: List[Dict[str, str]]
+    name: str
+
+    @property
+    def filename(self) -> str:
+        return f"{self.number}{LAYER_EXTENSION}"
+
+
+@dataclass
+class GenerationResult:
+    requested: int
+    rendered: int = 0
+    created: int = 0
+    failed: int = 0
+    nft_ids: List[int] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+
+def upload_edition(edition: Edition, png: bytes, description: str) -> Tuple[Dict[str, Any], float]:
+    """Run a rendered edition through the regular image + metadata upload"""
+    from .services import filebase_service
+
+    start = time.time()
+    result = filebase_service.upload_complete_nft(
+        name=edition.name,
+        description=description,
+        attributes=edition.attributes,
+        image_file=ContentFile(png, name=edition.filename)
+    )
+    return result, time.time() - start
+
+
+def record_edition(collection: NFTCollection, edition: Edition, upload_result: Dict[str, Any],
+                   owner_address: str, duration: float) -> NFTMetadata:
+    """Create the NFT and its attribute rows for an uploaded edition"""
+    with transaction.atomic():
+        nft = NFTMetadata.objects.create(
+            name=edition.name,
+            description=upload_result['metadata']['description'],
+            image_ipfs_hash=upload_result['image_ipfs_hash'],
+            image_ipfs_url=upload_result['image_ipfs_url'],
+            metadata_ipfs_hash=upload_result['metadata_ipfs_hash'],
+            metadata_ipfs_url=upload_result['metadata_ipfs_url'],
+            original_filename=upload_result['original_filename'],
+            file_size=upload_result['file_size'],
+            content_type=upload_result['content_type'],
+            perceptual_hash=upload_result['perceptual_hash'],
+            blurhash=upload_result['blurhash'],
+            dominant_colors=upload_result['dominant_colors'],
+            attributes_json=traits.normalize(edition.attributes),
+            owner_address=owner_address,
+            collection=collection,
+            image_object_key=upload_result['image_object_key'],
+            metadata_object_key=upload_result['metadata_object_key']
+        )
+        traits.create_attribute_rows(nft)
+        refresh_nfts([nft.id])
+    stats.record_upload_completed(nft, duration)
+    return nft
+
+
+def generate_collection(collection: NFTCollection, layer_set: LayerSet, count: int, description: str = '',
+                        owner_address: Optional[str] = None, seed: Optional[int] = None,
+                        render_workers: Optional[int] = None, upload_workers: int = 4,
+                        dry_run: bool = False,
+                        progress: Optional[Callable[[GenerationResult], None]] = None) -> GenerationResult:
+    """Render ``count`` new unique NFTs for a collection and upload them
+
+    Failed uploads are logged and counted; FilebaseUnavailableError stops
+    the run, keeping the NFTs created so far.
+    """
+    start = time.time()
+    stack = LayerStack(layer_set)
+    logger.info(f"Decoded {sum(len(trait.values) for trait in layer_set.traits)} layers "
+                f"({stack.nbytes / 1e6:.0f} MB) for collection {collection.id}")
+
+    combinations = draw_combinations(layer_set, count, existing_combinations(collection, layer_set), seed)
+    first_number = collection.nftmetadata_set.count() + 1
+    editions = [
+        Edition(number, combination, layer_set.attributes(combination), f"{collection.name} #{number}")
+        for number, combination in enumerate(combinations, start=first_number)
+    ]
+    owner_address = owner_address or collection.creator
+    render_workers = render_workers or os.cpu_count() or 1
+
+    result = GenerationResult(requested=count)
+    uploads = deque()
+
+    def finish_upload():
+        edition, future = uploads.popleft()
+        try:
+            upload_result, duration = future.result()
+            nft = record_edition(collection, edition, upload_result, owner_address, duration)
+        except FilebaseUnavailableError:
+            raise
+        except Exception as e:
+            result.failed += 1
+            logger.error(f"Generated NFT {edition.name} failed: {e}")
+            return
+        result.created += 1
+        result.nft_ids.append(nft.id)
+        if progress and result.created % 100 == 0:
+            progress(result)
+
+    with render_pool(stack, render_workers) as renderers, ThreadPoolExecutor(upload_workers) as uploaders:
+        rendered = bounded_map(
+            renderers, _render_in_worker, (edition.combination for edition in editions), render_workers * 2
+        )
+        for edition, png in zip(editions, rendered):
+            result.rendered += 1
+            if dry_run:
+                continue
+            uploads.append((edition, uploaders.submit(upload_edition, edition, png, description)))
+            if len(uploads) >= upload_workers * 2:
+                finish_upload()
+        while uploads:
+            finish_upload()
+
+    result.elapsed_seconds = time.time() - start
+    logger.info(f"Generated {result.created} NFTs for collection {collection.id} "
+                f"({result.failed} failed) in {result.elapsed_seconds:.1f}s")
+    return result
+
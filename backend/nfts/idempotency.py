@@ -0,0 +1,110 @@
+"""
+Idempotency-Key support for create-nft/.
+
+The first request carrying a key claims it by creating the UploadSession
+that owns it; repeats with the same key replay the stored response or wait
+for the in-flight job instead of re-running the upload pipeline. A job
+whose session has not changed for IDEMPOTENCY_IN_FLIGHT_LEASE seconds is
+taken to have died with its worker, and its key may be claimed again.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import UploadSession
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+IN_FLIGHT_STATUSES = ('uploading', 'processing')
+
+
+def image_digest(image) -> str:
+    """Hex SHA-256 of an uploaded image's content, leaving the file rewound"""
+    image.seek(0)
+    digest = hashlib.sha256()
+    for chunk in image.chunks():
+        digest.update(chunk)
+    image.seek(0)
+    return digest.hexdigest()
+
+
+def request_fingerprint(data: Dict[str, Any]) -> str:
+    """Hash the parts of a create-nft request that define its result"""
+    payload = {
+        'name': data['name'],
+        'description': data['description'],
+        'owner_address': data['owner_address'],
+        'collection_id': data.get('collection_id'),
+        'attributes': data.get('attributes', []),
+        'image': image_digest(data['image']),
+    }
+    if data.get('deep_zoom'):
+        payload['deep_zoom'] = True
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def key_expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def lease_expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_LEASE)
+
+
+def evict_expired_keys() -> int:
+    """Release every idempotency key older than the TTL"""
+    return UploadSession.objects.filter(
+        idempotency_key__isnull=False,
+        created_at__lt=key_expiry_cutoff()
+    ).update(idempotency_key=None)
+
+
+def claim_key(key: str, fingerprint: str, **session_fields) -> Tuple[UploadSession, bool]:
+    """Create the UploadSession owning ``key``, or return the session that already owns it"""
+    # An expired key, or one whose job failed, may be claimed again
+    UploadSession.objects.filter(idempotency_key=key).filter(
+        Q(created_at__lt=key_expiry_cutoff()) | Q(upload_status='failed')
+    ).update(idempotency_key=None)
+    # So may the key of a job whose worker died mid-upload, leaving its session in flight
+    UploadSession.objects.filter(
+        idempotency_key=key,
+        upload_status__in=IN_FLIGHT_STATUSES,
+        updated_at__lt=lease_expiry_cutoff()
+    ).update(
+        idempotency_key=None,
+        upload_status='failed',
+        error_message='Upload was abandoned before it finished',
+        updated_at=timezone.now()
+    )
+
+    while True:
+        try:
+            with transaction.atomic():
+                session = UploadSession.objects.create(
+                    idempotency_key=key,
+                    request_fingerprint=fingerprint,
+                    **session_fields
+                )
+            return session, True
+        except IntegrityError:
+            existing = UploadSession.objects.filter(idempotency_key=key).first()
+            if existing is not None:
+                return existing, False
+            # The owner was released between our insert and lookup; try again
+
+
+def wait_for_completion(session: UploadSession) -> UploadSession:
+    """Poll an in-flight session until it finishes or the wait budget runs out"""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while session.upload_status in IN_FLIGHT_STATUSES and time.monotonic() < deadline:
+        time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+        session.refresh_from_db()
+    return session
@@ -0,0 +1,251 @@
+"""
+Header-only image probing for uploads.
+
+Uploaded images are opened once. The serializer field parses just the
+header (format, dimensions, mode, frame count) and rejects bad uploads
+before any pixel data is decoded, then attaches the probe to the file so
+that FilebaseService._process_image decodes the same, still lazy, Image
+instead of opening the bytes a second time.
+
+A small, highly compressed file can describe gigapixels, so the probe also
+plans the decode against a pixel budget. JPEGs above the budget are
+decoded at a reduced DCT scale (``draft``) close to the output size; other
+formats above the budget take one of a few process-wide large-decode slots,
+and anything that would still decode to more than IMAGE_MAX_PIXELS is
+rejected. Peak memory of a decode is roughly 8 bytes per decoded pixel.
+
+Animated GIF/WebP uploads are re-encoded as animated WebP one frame at a
+time, so memory scales with a single frame rather than the sequence.
+"""
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+# Pillow format name -> content type served for it
+ALLOWED_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Processed images are scaled to fit within this box
+MAX_OUTPUT_SIZE = (2048, 2048)
+
+# JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding
+JPEG_DRAFT_SCALES = (8, 4, 2, 1)
+
+# Formats whose multi-frame uploads are kept animated
+ANIMATED_FORMATS = {'GIF', 'WEBP'}
+
+# Frame duration (ms) assumed when a GIF frame does not specify one
+DEFAULT_FRAME_DURATION = 100
+
+
+class ImageRejected(ValueError):
+    """Raised when an uploaded image fails validation"""
+
+
+@dataclass
+class ImageProbe:
+    """Header information and decode plan of an opened, not yet decoded, upload
+
+    Closing ``image`` also closes the upload's file.
+    """
+    file: Any
+    image: Image.Image
+    format: str
+    width: int
+    height: int
+    mode: str
+    frames: int = 1
+    draft_size: Optional[Tuple[int, int]] = None  # Reduced-scale JPEG decode target
+    decode_pixels: int = 0
+
+    @property
+    def content_type(self) -> str:
+        return ALLOWED_FORMATS[self.format]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def is_animated(self) -> bool:
+        return self.frames > 1 and self.format in ANIMATED_FORMATS
+
+    @property
+    def is_large(self) -> bool:
+        """Whether the decode exceeds the per-request pixel budget and needs a large-decode slot"""
+        return self.decode_pixels > settings.IMAGE_DECODE_PIXEL_BUDGET
+
+    def original_bytes(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+
+def fit_within(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Size of ``size`` scaled down (never up) to fit ``box``, keeping the aspect ratio"""
+    width, height = size
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+def jpeg_draft_scale(size: Tuple[int, int], target: Tuple[int, int]) -> int:
+    """Scale divisor Pillow's JPEG draft() picks so the decode is still at least ``target``"""
+    ratio = min(size[0] // target[0], size[1] // target[1])
+    return next(scale for scale in JPEG_DRAFT_SCALES if ratio >= scale)
+
+
+def probe_image(file) -> ImageProbe:
+    """Open an upload and validate it from its header alone"""
+    size = getattr(file, 'size', None)
+    if size is not None and size > MAX_UPLOAD_SIZE:
+        raise ImageRejected("Image file too large. Maximum size is 10MB.")
+
+    file.seek(0)
+    try:
+        # Read the underlying BytesIO/temporary file directly rather than through the Django File proxy
+        image = Image.open(getattr(file, 'file', None) or file, formats=list(ALLOWED_FORMATS))
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(f"Image rejected as a decompression bomb: {e}")
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise ImageRejected("Invalid image type. Allowed: JPEG, PNG, GIF, WebP")
+
+    width, height = image.size
+    if width < 1 or height < 1:
+        raise ImageRejected("Image has no pixels")
+    if max(width, height) > settings.IMAGE_MAX_DIMENSION:
+        raise ImageRejected(
+            f"Image is {width}x{height}; the maximum is {settings.IMAGE_MAX_DIMENSION} pixels per side."
+        )
+
+    # Counting frames walks the frame headers without decoding them
+    try:
+        frames = getattr(image, 'n_frames', 1)
+    except (OSError, EOFError, SyntaxError, ValueError):
+        raise ImageRejected("Image frames could not be read")
+    if frames > settings.IMAGE_MAX_FRAMES:
+        raise ImageRejected(f"Image has {frames} frames; the maximum is {settings.IMAGE_MAX_FRAMES}.")
+
+    probe = ImageProbe(file=file, image=image, format=image.format, width=width, height=height,
+                       mode=image.mode, frames=frames, decode_pixels=width * height)
+    if probe.format == 'JPEG' and probe.pixels > settings.IMAGE_DECODE_PIXEL_BUDGET:
+        probe.draft_size = fit_within(probe.size, MAX_OUTPUT_SIZE)
+        scale = jpeg_draft_scale(probe.size, probe.draft_size)
+        probe.decode_pixels = -(-width // scale) * -(-height // scale)
+
+    if probe.decode_pixels > settings.IMAGE_MAX_PIXELS:
+        raise ImageRejected(
+            f"Image is {width}x{height} ({probe.pixels / 1e6:.0f} megapixels); "
+            f"the maximum is {settings.IMAGE_MAX_PIXELS / 1e6:.0f} megapixels."
+        )
+    if probe.is_animated and probe.pixels * frames > settings.IMAGE_MAX_ANIMATION_PIXELS:
+        raise ImageRejected(
+            f"Animation decodes to {probe.pixels * frames / 1e6:.0f} megapixels across {frames} frames; "
+            f"the maximum is {settings.IMAGE_MAX_ANIMATION_PIXELS / 1e6:.0f} megapixels."
+        )
+    return probe
+
+
+_large_decode_slots = None
+_slots_lock = threading.Lock()
+
+
+def large_decode_slot() -> threading.BoundedSemaphore:
+    """Process-wide semaphore bounding concurrent over-budget decodes"""
+    global _large_decode_slots
+    with _slots_lock:
+        if _large_decode_slots is None:
+            _large_decode_slots = threading.BoundedSemaphore(settings.IMAGE_LARGE_DECODE_SLOTS)
+    return _large_decode_slots
+
+
+@contextmanager
+def decoded(probe: ImageProbe):
+    """Decode a probed upload within its memory plan; the image is closed on exit"""
+    image = probe.image
+    # Over-budget decodes wait for a slot so a worker holds at most a few at once
+    with large_decode_slot() if probe.is_large else nullcontext():
+        try:
+            try:
+                if probe.draft_size:
+                    # Big JPEG: let the decoder scale down by 1/2-1/8 instead of materializing every pixel
+                    image.draft(None, probe.draft_size)
+                image.load()
+            except (OSError, SyntaxError, ValueError) as e:
+                # Header parsed but the pixel data is corrupt or truncated
+                raise ImageRejected(f"Image could not be decoded: {e}")
+            yield image
+        finally:
+            image.close()
+
+
+def resize_frame(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Current frame of ``image`` as RGBA at ``size``"""
+    frame = image.convert('RGBA')
+    if frame.size != size:
+        frame = frame.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return frame
+
+
+class AnimationFrames:
+    """Frames 1..n of an animated image, decoded and resized only when the encoder asks
+
+    Passed to Pillow's animated WebP writer as an ``append_images`` entry.
+    The writer only uses ``n_frames``, ``seek``, ``mode`` and ``getim``, so
+    at most one source frame and one resized frame are alive at a time.
+    The duration of each frame is appended to ``durations`` when it is read,
+    before the writer looks it up.
+    """
+    mode = 'RGBA'
+
+    def __init__(self, image: Image.Image, size: Tuple[int, int], frames: int, durations: List[int]):
+        self.image = image
+        self.size = size
+        self.n_frames = frames - 1
+        self.durations = durations
+        self._frame = None
+
+    def seek(self, index: int):
+        self.image.seek(index + 1)
+        self._frame = resize_frame(self.image, self.size)
+        # WebP frames only report their duration once loaded
+        self.durations.append(self.image.info.get('duration') or DEFAULT_FRAME_DURATION)
+
+    def getim(self):
+        return self._frame.getim()
+
+
+def encode_animation(probe: ImageProbe, size: Tuple[int, int], quality: int = 80) -> bytes:
+    """Re-encode a decoded animated GIF/WebP as animated WebP, streaming its frames"""
+    image = probe.image
+    durations = [image.info.get('duration') or DEFAULT_FRAME_DURATION]
+    first = resize_frame(image, size)
+    output = BytesIO()
+    first.save(
+        output,
+        format='WEBP',
+        save_all=True,
+        append_images=[AnimationFrames(image, size, probe.frames, durations)],
+        duration=durations,
+        loop=image.info.get('loop', 0),
+        quality=quality,
+    )
+    if output.tell() > settings.IMAGE_MAX_ANIMATION_BYTES:
+        raise ImageRejected(
+            f"Animation re-encodes to {output.tell() / 1e6:.1f} MB; "
+            f"the maximum is {settings.IMAGE_MAX_ANIMATION_BYTES / 1e6:.0f} MB. Use fewer or smaller frames."
+        )
+    return output.getvalue()
@@ -0,0 +1,406 @@
+"""
+Blockchain event indexer.
+
+Pulls the NFT contract's logs in block-range batches and links on-chain
+mints to NFTMetadata rows: single mints by metadata CID, collection batch
+mints by the published collection directory. Only blocks that are
+INDEXER_CONFIRMATIONS deep are indexed; progress is checkpointed together
+with the hashes of recently indexed blocks so a deeper reorg can be
+detected and rewound.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .metadata_store import refresh_nfts
+from .models import NFTCollection, NFTMetadata, TaskCheckpoint, TokenOwnership
+from .rpc import JSONRPCClient, RPCError, decode_result, encode_call, from_hex, get_rpc_client, to_hex
+
+logger = logging.getLogger(__name__)
+
+# keccak256('NFTMinted(address,uint256,string)')
+NFT_MINTED_TOPIC = '0xd35bb95e09c04b219e35047ce7b7b300e3384264ef84a40456943dbc0fc17c14'
+
+# keccak256('BatchMinted(address,uint256,uint256)')
+BATCH_MINTED_TOPIC = '0x59f9fb6d992d2aee0ed338bb4c504a17fd3f67ae91a3135bc2ef947e308c41b2'
+
+# keccak256('Transfer(address,address,uint256)')
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+ZERO_ADDRESS = '0x' + '0' * 40
+
+# Number of (block, hash) pairs kept in the checkpoint for reorg detection
+RECENT_BLOCKS_KEPT = 16
+
+
+def decode_string(data: str) -> str:
+    """Decode a single ABI-encoded ``string`` from log data"""
+    raw = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    offset = int.from_bytes(raw[0:32], 'big')
+    length = int.from_bytes(raw[offset:offset + 32], 'big')
+    return raw[offset + 32:offset + 32 + length].decode('utf-8', errors='replace')
+
+
+def topic_address(topic: str) -> str:
+    return '0x' + topic[-40:].lower()
+
+
+def extract_cid(uri: str) -> str:
+    """CID from ipfs://<cid>, a gateway URL or a bare CID"""
+    uri = uri.strip()
+    if uri.startswith('ipfs://'):
+        uri = uri[len('ipfs://'):]
+    elif '/ipfs/' in uri:
+        uri = uri.split('/ipfs/', 1)[1]
+    return uri.split('/', 1)[0].split('?', 1)[0]
+
+
+class EventIndexer:
+    """Incrementally indexes one contract's events into the database"""
+
+    def __init__(self, rpc: JSONRPCClient, contract_address: str, confirmations: int = 12,
+                 batch_size: int = 2000, start_block: int = 0):
+        if not contract_address:
+            raise ValueError("NFT contract address not configured")
+        self.rpc = rpc
+        self.contract_address = contract_address.lower()
+        self.confirmations = confirmations
+        self.batch_size = max(1, batch_size)
+        self.start_block = start_block
+        self.checkpoint_name = f"index_events:{self.contract_address}"
+        # topic0 -> handler(logs) returning the number of rows changed
+        # (mints run first so transfers in the same batch can link to the new rows)
+        self.handlers = {
+            NFT_MINTED_TOPIC: self.apply_mints,
+            BATCH_MINTED_TOPIC: self.apply_batch_mints,
+            TRANSFER_TOPIC: self.apply_transfers,
+        }
+        # Called with the last canonical block when a reorg is rewound
+        self.rewinders = [self.rewind_mints, self.rewind_transfers]
+        self._timestamps: Dict[int, datetime] = {}
+
+    # Checkpoint
+
+    def load_state(self) -> Dict[str, Any]:
+        checkpoint = TaskCheckpoint.objects.filter(name=self.checkpoint_name).first()
+        if checkpoint:
+            return checkpoint.state
+        return {'block': self.start_block - 1, 'recent': []}
+
+    def save_state(self, state: Dict[str, Any]):
+        TaskCheckpoint.objects.update_or_create(name=self.checkpoint_name, defaults={'state': state})
+
+    def reset(self, from_block: int):
+        """Restart indexing at ``from_block``"""
+        self.save_state({'block': from_block - 1, 'recent': []})
+
+    # Reorg handling
+
+    def check_reorg(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Rewind the checkpoint if recently indexed blocks are no longer canonical"""
+        recent = state.get('recent', [])
+        if not recent:
+            return state
+
+        for index in range(len(recent) - 1, -1, -1):
+            number, block_hash = recent[index]
+            block = self.rpc.get_block(number)
+            if block and block.get('hash') == block_hash:
+                if index == len(recent) - 1:
+                    return state
+                return self.rewind(number, recent[:index + 1])
+
+        # None of the remembered blocks survived: go back a full window
+        oldest = recent[0][0]
+        return self.rewind(max(oldest - self.batch_size, self.start_block - 1), [])
+
+    def rewind(self, block: int, recent: List[List[Any]]) -> Dict[str, Any]:
+        logger.warning(f"Chain reorganisation detected for {self.contract_address}, rewinding to block {block}")
+        state = {'block': block, 'recent': recent}
+        with transaction.atomic():
+            for rewinder in self.rewinders:
+                rewinder(block)
+            self.save_state(state)
+        return state
+
+    # Sync
+
+    def get_logs(self, from_block: int, to_block: int, topics: Optional[List[Any]] = None,
+                 backwards: bool = False) -> Tuple[List[dict], int, int]:
+        """eth_getLogs (by default for all handled topics), halving the range if the node refuses it
+
+        Returns the logs and the (from_block, to_block) range they cover. The
+        range keeps its low end, or its high end when scanning ``backwards``.
+        """
+        topics = topics or [list(self.handlers)]
+        while True:
+            try:
+                return self.rpc.get_logs(self.contract_address, from_block, to_block, topics), from_block, to_block
+            except RPCError:
+                if to_block == from_block:
+                    raise
+                if backwards:
+                    from_block = to_block - (to_block - from_block) // 2
+                else:
+                    to_block = from_block + (to_block - from_block) // 2
+                self.batch_size = max(1, (to_block - from_block) + 1)
+                logger.info(f"Reducing indexer batch size to {self.batch_size} blocks")
+
+    def sync_once(self) -> Optional[Dict[str, Any]]:
+        """Index the next batch of confirmed blocks; returns None when caught up"""
+        safe_block = self.rpc.block_number() - self.confirmations
+        state = self.check_reorg(self.load_state())
+        if state['block'] >= safe_block:
+            return None
+
+        from_block = state['block'] + 1
+        to_block = min(from_block + self.batch_size - 1, safe_block)
+        logs, from_block, to_block = self.get_logs(from_block, to_block)
+        logs = [log for log in logs if not log.get('removed')]
+        logs.sort(key=lambda log: (from_hex(log['blockNumber']), from_hex(log['logIndex'])))
+
+        by_topic: Dict[str, List[dict]] = {}
+        for log in logs:
+            by_topic.setdefault(log['topics'][0], []).append(log)
+
+        end = self.rpc.get_block(to_block)
+        recent = state.get('recent', []) + [[to_block, end['hash'] if end else None]]
+
+        changed = 0
+        with transaction.atomic():
+            for topic, handler in self.handlers.items():
+                if by_topic.get(topic):
+                    changed += handler(by_topic[topic])
+            self.save_state({'block': to_block, 'recent': recent[-RECENT_BLOCKS_KEPT:]})
+        self._timestamps.clear()
+
+        return {'from_block': from_block, 'to_block': to_block, 'logs': len(logs), 'changed': changed}
+
+    def load_timestamps(self, numbers):
+        """Fetch the timestamps of several blocks in one JSON-RPC batch"""
+        missing = sorted(set(numbers) - set(self._timestamps))
+        for number, block in zip(missing, self.rpc.get_blocks(missing)):
+            if block:
+                self._timestamps[number] = datetime.fromtimestamp(from_hex(block['timestamp']), tz=dt_timezone.utc)
+
+    def block_timestamp(self, number: int) -> Optional[datetime]:
+        self.load_timestamps([number])
+        return self._timestamps.get(number)
+
+    # NFTMinted
+
+    def apply_mints(self, logs: List[dict]) -> int:
+        """Fill token_id, minted_at and transaction_hash of the NFTs whose metadata was minted"""
+        events = []
+        for log in logs:
+            events.append({
+                'token_id': from_hex(log['topics'][2]),
+                'cid': extract_cid(decode_string(log['data'])),
+                'block': from_hex(log['blockNumber']),
+                'transaction_hash': log['transactionHash'],
+            })
+
+        already_linked = set(
+            NFTMetadata.objects.filter(
+                contract_address=self.contract_address,
+                token_id__in=[event['token_id'] for event in events]
+            ).values_list('token_id', flat=True)
+        )
+
+        # Rows sharing a CID are linked to that CID's mints in upload order
+        candidates: Dict[str, List[NFTMetadata]] = {}
+        unlinked = NFTMetadata.objects.filter(
+            metadata_ipfs_hash__in={event['cid'] for event in events}, token_id__isnull=True
+        ).order_by('id')
+        for nft in unlinked:
+            candidates.setdefault(nft.metadata_ipfs_hash, []).append(nft)
+
+        updated = []
+        now = timezone.now()
+        self.load_timestamps(event['block'] for event in events if candidates.get(event['cid']))
+        for event in events:
+            rows = candidates.get(event['cid'])
+            if event['token_id'] in already_linked or not rows:
+                continue
+            nft = rows.pop(0)
+            nft.token_id = event['token_id']
+            nft.minted_at = self.block_timestamp(event['block'])
+            nft.minted_block = event['block']
+            nft.transaction_hash = event['transaction_hash']
+            updated.append(nft)
+
+        return self.link_tokens(updated, now)
+
+    def link_tokens(self, updated: List[NFTMetadata], now: datetime) -> int:
+        """Save the token fields of newly linked NFTs"""
+        for nft in updated:
+            nft.contract_address = self.contract_address
+            # bulk_update skips auto_now; bump it so cached detail ETags change
+            nft.updated_at = now
+        NFTMetadata.objects.bulk_update(
+            updated,
+            ['token_id', 'contract_address', 'minted_at', 'minted_block', 'transaction_hash', 'updated_at'],
+            batch_size=500
+        )
+        refresh_nfts(nft.id for nft in updated)
+        if updated:
+            logger.info(f"Linked {len(updated)} minted tokens to NFT metadata")
+        return len(updated)
+
+    # BatchMinted
+
+    def batch_collection(self, start_token_id: int, block: int) -> Optional[NFTCollection]:
+        """Collection whose published directory the batch's tokens resolve to (tokenURI = batch base URI + id)"""
+        try:
+            data = self.rpc.call('eth_call', [
+                {'to': self.contract_address, 'data': encode_call('tokenURI', start_token_id)}, to_hex(block)
+            ])
+            uri = decode_result('tokenURI', data)
+        except RPCError as e:
+            logger.warning(f"Could not read tokenURI({start_token_id}) at block {block}: {e}")
+            return None
+        root_cid = extract_cid(uri)
+        return NFTCollection.objects.filter(metadata_root_cid=root_cid).first() if root_cid else None
+
+    def apply_batch_mints(self, logs: List[dict]) -> int:
+        """Link ownerBatchMint tokens to the NFTs their collection published under those token ids"""
+        linked = 0
+        now = timezone.now()
+        for log in logs:
+            data = bytes.fromhex(log['data'][2:])
+            start_token_id = int.from_bytes(data[0:32], 'big')
+            quantity = int.from_bytes(data[32:64], 'big')
+            block = from_hex(log['blockNumber'])
+
+            collection = self.batch_collection(start_token_id, block)
+            if collection is None:
+                logger.warning(
+                    f"BatchMinted tokens {start_token_id}-{start_token_id + quantity - 1} do not resolve to a "
+                    f"published collection; leaving them unlinked"
+                )
+                continue
+
+            # Each token id names the file its NFT was published as
+            rows = list(
+                NFTMetadata.objects.filter(
+                    collection=collection, token_id__isnull=True,
+                    published_token_id__gte=start_token_id, published_token_id__lt=start_token_id + quantity
+                ).order_by('published_token_id')
+            )
+            already_linked = set(
+                NFTMetadata.objects.filter(
+                    contract_address=self.contract_address, token_id__in=[nft.published_token_id for nft in rows]
+                ).values_list('token_id', flat=True)
+            )
+            rows = [nft for nft in rows if nft.published_token_id not in already_linked]
+            if len(rows) + len(already_linked) < quantity:
+                logger.warning(
+                    f"Collection {collection.id} published {len(rows) + len(already_linked)} of the "
+                    f"{quantity} NFTs batch-minted from token {start_token_id}"
+                )
+
+            minted_at = self.block_timestamp(block)
+            for nft in rows:
+                nft.token_id = nft.published_token_id
+                nft.minted_at = minted_at
+                nft.minted_block = block
+                nft.transaction_hash = log['transactionHash']
+            # Saved per event so the next batch in this sync sees these rows as minted
+            linked += self.link_tokens(rows, now)
+        return linked
+
+    def rewind_mints(self, block: int):
+        rewound = NFTMetadata.objects.filter(contract_address=self.contract_address, minted_block__gt=block)
+        nft_ids = list(rewound.values_list('id', flat=True))
+        rewound.update(token_id=None, minted_at=None, minted_block=None, transaction_hash='', updated_at=timezone.now())
+        refresh_nfts(nft_ids)
+
+    # Transfer
+
+    def apply_transfers(self, logs: List[dict]) -> int:
+        """Upsert the latest owner of every token transferred in the batch"""
+        latest: Dict[int, dict] = {}
+        for log in logs:
+            # ERC-20 style Transfer events carry the amount in data, not a third topic
+            if len(log['topics']) != 4:
+                continue
+            latest[from_hex(log['topics'][3])] = log
+        return self.set_owners(latest)
+
+    def set_owners(self, latest: Dict[int, dict]) -> int:
+        """Write ownership rows for {token_id: last Transfer log}; burns delete the row"""
+        burned = [token_id for token_id, log in latest.items() if topic_address(log['topics'][2]) == ZERO_ADDRESS]
+        owned = {token_id: log for token_id, log in latest.items() if token_id not in burned}
+
+        nft_ids = dict(
+            NFTMetadata.objects.filter(
+                contract_address=self.contract_address, token_id__in=list(owned)
+            ).values_list('token_id', 'id')
+        )
+        rows = [
+            TokenOwnership(
+                contract_address=self.contract_address,
+                token_id=token_id,
+                owner_address=topic_address(log['topics'][2]),
+                nft_id=nft_ids.get(token_id),
+                block_number=from_hex(log['blockNumber']),
+                log_index=from_hex(log['logIndex']),
+            )
+            for token_id, log in owned.items()
+        ]
+        TokenOwnership.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['contract_address', 'token_id'],
+            update_fields=['owner_address', 'nft', 'block_number', 'log_index', 'updated_at'],
+        )
+        if burned:
+            TokenOwnership.objects.filter(contract_address=self.contract_address, token_id__in=burned).delete()
+        return len(rows) + len(burned)
+
+    def rewind_transfers(self, block: int):
+        """Restore the owners of tokens whose latest transfer was reorganised away"""
+        affected = list(
+            TokenOwnership.objects.filter(
+                contract_address=self.contract_address, block_number__gt=block
+            ).values_list('token_id', flat=True)
+        )
+        if not affected:
+            return
+        TokenOwnership.objects.filter(contract_address=self.contract_address, token_id__in=affected).delete()
+
+        # Scan backwards from the fork point for each token's last canonical transfer
+        latest: Dict[int, dict] = {}
+        missing = set(affected)
+        to_block = block
+        while missing and to_block >= self.start_block:
+            from_block = max(to_block - self.batch_size + 1, self.start_block)
+            topics = [TRANSFER_TOPIC, None, None, ['0x' + token_id.to_bytes(32, 'big').hex() for token_id in missing]]
+            logs, from_block, to_block = self.get_logs(from_block, to_block, topics, backwards=True)
+            for log in logs:
+                if len(log['topics']) == 4 and not log.get('removed'):
+                    token_id = from_hex(log['topics'][3])
+                    if token_id in missing:
+                        current = latest.get(token_id)
+                        position = (from_hex(log['blockNumber']), from_hex(log['logIndex']))
+                        if not current or position > (from_hex(current['blockNumber']), from_hex(current['logIndex'])):
+                            latest[token_id] = log
+            missing -= set(latest)
+            to_block = from_block - 1
+        self.set_owners(latest)
+
+
+def get_indexer() -> EventIndexer:
+    """Indexer for NFT_CONTRACT_ADDRESS using the project settings"""
+    return EventIndexer(
+        get_rpc_client(),
+        settings.NFT_CONTRACT_ADDRESS,
+        confirmations=settings.INDEXER_CONFIRMATIONS,
+        batch_size=settings.INDEXER_BATCH_SIZE,
+        start_block=settings.INDEXER_START_BLOCK,
+    )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from nfts.metadata_store import refresh_nfts
+from nfts.models import NFTMetadata
+from nfts.phash import image_hash
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for NFTs uploaded before near-duplicate detection existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows hashed per bulk update')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many NFTs (0 = all)')
+
+    def handle(self, *args, **options):
+        from nfts.services import filebase_service
+
+        pending = NFTMetadata.objects.filter(perceptual_hash='').exclude(image_object_key='').order_by('id')
+        skipped = NFTMetadata.objects.filter(perceptual_hash='', image_object_key='').count()
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} NFTs without a recorded image object key")
+
+        last_id = 0
+        hashed = 0
+        failed = 0
+        while not options['limit'] or hashed + failed < options['limit']:
+            batch = list(pending.filter(id__gt=last_id).only('id', 'image_object_key')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            updated = []
+            for nft in batch:
+                try:
+                    response = filebase_service.s3_client.get_object(
+                        Bucket=filebase_service.bucket_name, Key=nft.image_object_key
+                    )
+                    nft.perceptual_hash = image_hash(response['Body'].read())
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"  NFT {nft.id}: {e}")
+                    continue
+                # bulk_update skips auto_now; bump it so cached list/detail ETags change
+                nft.updated_at = timezone.now()
+                updated.append(nft)
+
+            NFTMetadata.objects.bulk_update(updated, ['perceptual_hash', 'updated_at'])
+            refresh_nfts(nft.id for nft in updated)
+            hashed += len(updated)
+            self.stdout.write(f"  Hashed {hashed} NFTs (through id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Hashed {hashed} NFTs, {failed} failed"))
@@ -0,0 +1,816 @@
+import ctypes
+import heapq
+import math
+import os
+import random
+import struct
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, reset_queries, transaction
+from django.db.models import Exists, OuterRef
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+import numpy as np
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from nfts import traits
+from nfts.admission import AdmissionRejected, admit, release
+from nfts.compression import APICompressionMiddleware, compress_bytes, supported_encodings
+from nfts.db_router import primary_reads
+from nfts.fast_serializers import NFT_FIELDS, FastJSONRenderer, nft_values, orjson, parse_fields, serialize_rows
+from nfts.metadata_store import build as build_metadata_store
+from nfts.models import AdmissionBucket, AdmissionLease, NFTAttribute, NFTMetadata
+from nfts.phash import dhash
+from nfts.serializers import NFTMetadataSerializer, ProbedImageField
+from nfts.views import NFTMetadataDetailView, NFTMetadataListView, TokenMetadataView
+
+
+# NFTs inserted per bulk_create when building fixtures
+FIXTURE_BATCH = 5000
+
+# Contract of the synthetic minted NFTs
+FIXTURE_CONTRACT = '0x' + 'be' * 20
+
+# Fast path fields the join path serializes before adding attributes from NFTAttribute
+NFT_FIELDS_WITHOUT_ATTRIBUTES = tuple(field for field in NFT_FIELDS if field != 'attributes')
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark fixtures"""
+
+
+def timed(func, iterations: int, clock=time.perf_counter):
+    """Best time of ``iterations`` calls, and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(iterations):
+        start = clock()
+        result = func()
+        best = min(best, clock() - start)
+    return best, result
+
+
+def python_heap_peak(func) -> int:
+    """Peak bytes allocated through Python while ``func`` runs (Pillow pixel buffers are not included)"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def proc_status_kb(field: str) -> int:
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def peak_rss_growth(func) -> float:
+    """Run ``func`` in a forked child; how far its peak RSS rose above its starting RSS, in MB (Linux only)"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            # Return the parent's freed heap to the OS so the child cannot reuse already resident pages
+            try:
+                ctypes.CDLL('libc.so.6').malloc_trim(0)
+            except (OSError, AttributeError):
+                pass
+            # A forked child inherits the parent's high-water mark; "5" resets it
+            with open('/proc/self/clear_refs', 'w') as clear_refs:
+                clear_refs.write('5')
+            start = proc_status_kb('VmRSS')
+            func()
+            os.write(write_fd, str(proc_status_kb('VmHWM') - start).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        growth = pipe.read()
+    os.waitpid(pid, 0)
+    return int(growth) / 1024 if growth else float('nan')
+
+
+def png_bomb(width: int, height: int, color_type: int = 0, bit_depth: int = 1) -> bytes:
+    """Valid PNG of zero pixels, streamed through zlib so it is tiny without ever existing in memory"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    channels = {0: 1, 2: 3}[color_type]
+    row = bytes(1 + (width * channels * bit_depth + 7) // 8)  # filter byte + zero samples
+    compressor = zlib.compressobj(9)
+    idat = b''.join(compressor.compress(row) for _ in range(height)) + compressor.flush()
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', idat) + chunk(b'IEND', b'')
+
+
+def gif_screen_bomb(width: int, height: int) -> bytes:
+    """GIF whose logical screen is huge but whose single frame is one pixel"""
+    return (
+        b'GIF89a' + struct.pack('<HHBBB', width, height, 0, 0, 0)
+        + b',' + struct.pack('<HHHHB', 0, 0, 1, 1, 0) + b'\x02\x02\x44\x01\x00' + b';'
+    )
+
+
+def many_frames_gif(frames: int) -> bytes:
+    images = [Image.new('RGB', (16, 16), (index % 256, index // 256, 0)) for index in range(frames)]
+    output = BytesIO()
+    images[0].save(output, format='GIF', save_all=True, append_images=images[1:])
+    return output.getvalue()
+
+
+def smooth_jpeg(size) -> bytes:
+    """Large but well-compressing RGB JPEG"""
+    gradient = Image.linear_gradient('L').resize(size)
+    output = BytesIO()
+    Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.ROTATE_180), gradient)).save(
+        output, format='JPEG', quality=85
+    )
+    return output.getvalue()
+
+
+def animated_gif(size, frames: int) -> bytes:
+    """Animated GIF of a shape moving over a gradient background"""
+    gradient = Image.linear_gradient('L').resize(size)
+    background = Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.ROTATE_90).resize(size), gradient))
+    images = []
+    for index in range(frames):
+        frame = background.copy()
+        offset = index * 7 % size[0]
+        frame.paste((255, index * 3 % 256, 0), (offset, size[1] // 3, min(offset + size[0] // 5, size[0]), size[1] // 2))
+        images.append(frame)
+    output = BytesIO()
+    images[0].save(output, format='GIF', save_all=True, append_images=images[1:], duration=40, loop=0)
+    return output.getvalue()
+
+
+def sample_image(size, mode: str, image_format: str) -> bytes:
+    """Photo-like test image: a gradient with noise, which compresses realistically"""
+    noise = Image.effect_noise(size, 40).convert('L')
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if mode != 'RGB':
+        image = image.convert(mode)
+    output = BytesIO()
+    image.save(output, format=image_format, **({'quality': 90} if image_format == 'JPEG' else {}))
+    return output.getvalue()
+
+
+def trait_layers(directory: str, size, traits: int = 6, values: int = 8):
+    """Layer directory for the generative engine: an opaque background and translucent shapes"""
+    for trait in range(traits):
+        trait_dir = os.path.join(directory, f"{trait}_trait")
+        os.makedirs(trait_dir)
+        for value in range(values):
+            image = Image.new('RGBA', size, (0, 0, 0, 0))
+            if trait == 0:
+                image.paste((value * 30, 90, 200 - value * 20, 255), (0, 0) + size)
+            else:
+                box = (size[0] * value // (values * 2), size[1] * trait // (traits * 2))
+                image.paste((trait * 40 % 256, value * 30, 120, 140 + value * 10),
+                            box + (box[0] + size[0] // 2, box[1] + size[1] // 3))
+            image.save(os.path.join(trait_dir, f"value{value}#{value + 1}.png"))
+
+
+def legacy_upload_pipeline(upload):
+    """Validation and processing as they were before header probing: two opens, verify() and a decode"""
+    image_file = serializers.ImageField().run_validation(upload)
+    image_file.seek(0)
+    image = Image.open(BytesIO(image_file.read()))
+    perceptual_hash = dhash(image)
+    if image.mode in ('RGBA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        if image.mode == 'RGBA':
+            background.paste(image, mask=image.split()[-1])
+        image = background
+    if image.size[0] > 2048 or image.size[1] > 2048:
+        image.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
+    output = BytesIO()
+    image.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue(), perceptual_hash
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API hot paths against synthetic NFTs (created in a transaction that is rolled back)'
+
+    SCENARIOS = ['serializer', 'compression', 'conditional', 'images', 'image_guards', 'animation', 'generative', 'tiles',
+                 'placeholders', 'attributes', 'metadata_store', 'admission']
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run: {', '.join(self.SCENARIOS)} (default: all)")
+        parser.add_argument('--rows', type=int, default=200, help='Synthetic NFTs to create')
+        parser.add_argument('--attributes', type=int, default=6,
+                            help='Attributes per synthetic NFT (attributes scenario: e.g. --rows 1000000 --attributes 10)')
+        parser.add_argument('--page-sizes', default='20,100', help='Comma-separated page sizes to measure')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per measurement (best is kept)')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or self.SCENARIOS
+        unknown = sorted(set(scenarios) - set(self.SCENARIOS))
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+        try:
+            page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--page-sizes must be comma-separated integers')
+        if max(page_sizes) > options['rows']:
+            raise CommandError('--rows must be at least the largest page size')
+
+        try:
+            # Fixtures are uncommitted, so replicas cannot see them
+            with transaction.atomic(), primary_reads():
+                queryset = self.create_fixtures(options['rows'], options['attributes'])
+                for scenario in scenarios:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"\n{scenario}"))
+                    getattr(self, f"run_{scenario}")(queryset, page_sizes, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_fixtures(self, rows: int, attributes: int):
+        """Synthetic NFTs, returned as a deterministically ordered queryset"""
+        first_id = last_id = None
+        for start in range(0, rows, FIXTURE_BATCH):
+            nfts = self.create_fixture_batch(range(start, min(start + FIXTURE_BATCH, rows)), attributes)
+            first_id = nfts[0].id if first_id is None else first_id
+            last_id = nfts[-1].id
+            # With DEBUG on, Django would keep every multi-megabyte INSERT in connection.queries
+            reset_queries()
+        self.stdout.write(f"Created {rows} NFTs with {attributes} attributes each")
+        if connection.vendor == 'postgresql':
+            # Autovacuum never sees the uncommitted fixtures; give the planner their statistics
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {NFTMetadata._meta.db_table}, {NFTAttribute._meta.db_table}")
+        # bulk_create gives every row the same created_at, so break ties by id
+        return NFTMetadata.objects.filter(id__gte=first_id, id__lte=last_id).order_by('-created_at', '-id')
+
+    def create_fixture_batch(self, indexes, attributes: int):
+        # Trait n cycles through its own n + 2 values, so trait filters have a range of selectivities
+        nft_attributes = [
+            [{'trait_type': f"Trait {position}", 'value': f"Value {position}.{index % (position + 2)} ✓",
+              'display_type': 'number' if position == 0 else ''} for position in range(attributes)]
+            for index in indexes
+        ]
+        nfts = NFTMetadata.objects.bulk_create([
+            NFTMetadata(
+                token_id=index if index % 2 else None,
+                contract_address=FIXTURE_CONTRACT if index % 2 else '',
+                name=f"Benchmark NFT #{index}",
+                description=f"Synthetic NFT {index} for the benchmark command. " * 4,
+                image_ipfs_hash=f"bafybenchimage{index:040d}",
+                image_ipfs_url=f"https://ipfs.filebase.io/ipfs/bafybenchimage{index:040d}",
+                metadata_ipfs_hash=f"bafybenchmeta{index:040d}",
+                metadata_ipfs_url=f"https://ipfs.filebase.io/ipfs/bafybenchmeta{index:040d}",
+                original_filename=f"bench_{index}.png",
+                file_size=100000 + index,
+                content_type='image/png',
+                perceptual_hash=f"{index:016x}",
+                owner_address='0x' + f"{index:040x}",
+                attributes_json=values,
+            )
+            for index, values in zip(indexes, nft_attributes)
+        ])
+        NFTAttribute.objects.bulk_create([
+            NFTAttribute(nft=nft, **attribute)
+            for nft, values in zip(nfts, nft_attributes)
+            for attribute in values
+        ])
+        return nfts
+
+    def run_serializer(self, queryset, page_sizes, options):
+        """DRF NFTMetadataSerializer vs the values() fast path, rendered to JSON"""
+        self.stdout.write(f"Encoder: {'orjson' if orjson else 'json (install orjson for the fast encoder)'}")
+        drf_renderer = JSONRenderer()
+        fast_renderer = FastJSONRenderer()
+
+        for size in page_sizes:
+            def drf():
+                page = list(queryset.prefetch_related('attributes')[:size])
+                return drf_renderer.render(NFTMetadataSerializer(page, many=True).data)
+
+            def fast():
+                return fast_renderer.render(serialize_rows(nft_values(queryset)[:size]))
+
+            drf_time, drf_body = timed(drf, options['iterations'])
+            fast_time, fast_body = timed(fast, options['iterations'])
+            if drf_body != fast_body:
+                raise CommandError(f"Fast path output differs from NFTMetadataSerializer at page size {size}")
+
+            self.stdout.write(
+                f"  {size:>4} rows: DRF {size / drf_time:>9.0f} rows/s   fast {size / fast_time:>9.0f} rows/s   "
+                f"x{drf_time / fast_time:.1f}   {len(fast_body)} bytes (identical)"
+            )
+
+        sparse = parse_fields('id,name,image_ipfs_url,token_id')
+        size = max(page_sizes)
+        sparse_time, sparse_body = timed(
+            lambda: fast_renderer.render(serialize_rows(nft_values(queryset, sparse)[:size], sparse)),
+            options['iterations']
+        )
+        self.stdout.write(
+            f"  {size:>4} rows, fields={','.join(sparse)}: {size / sparse_time:.0f} rows/s, {len(sparse_body)} bytes"
+        )
+
+    def run_compression(self, queryset, page_sizes, options):
+        """Compressed size and CPU cost of list pages per encoding"""
+        renderer = FastJSONRenderer()
+        for size in page_sizes:
+            body = renderer.render(serialize_rows(nft_values(queryset)[:size]))
+            if len(body) < settings.API_COMPRESSION_MIN_SIZE:
+                self.stdout.write(f"  {size:>4} rows: {len(body)} bytes, below API_COMPRESSION_MIN_SIZE (sent as is)")
+                continue
+            for encoding in supported_encodings():
+                elapsed, compressed = timed(
+                    lambda: compress_bytes(encoding, body, settings.API_COMPRESSION_GZIP_LEVEL,
+                                           settings.API_COMPRESSION_BROTLI_QUALITY),
+                    options['iterations']
+                )
+                self.stdout.write(
+                    f"  {size:>4} rows, {encoding:<4}: {len(body):>7} -> {len(compressed):>6} bytes "
+                    f"({100 - 100 * len(compressed) / len(body):.0f}% saved), {elapsed * 1000:.2f} ms, "
+                    f"{len(body) / elapsed / 1e6:.0f} MB/s"
+                )
+
+    def run_conditional(self, queryset, page_sizes, options):
+        """Full responses vs 304 revalidation through the views and compression middleware"""
+        factory = RequestFactory()
+        host = next((allowed.lstrip('.') for allowed in settings.ALLOWED_HOSTS if allowed != '*'), 'localhost')
+        list_view = NFTMetadataListView.as_view()
+        detail_view = NFTMetadataDetailView.as_view()
+        nft_id = queryset.values_list('id', flat=True).first()
+
+        cases = [
+            ('list', '/api/nfts/', list_view, {}),
+            ('detail', f"/api/nfts/{nft_id}/", detail_view, {'id': nft_id}),
+        ]
+        for label, path, view, kwargs in cases:
+            def render(request, view=view, kwargs=kwargs):
+                # Django renders DRF responses before the middleware sees them
+                response = view(request, **kwargs)
+                return response.render() if hasattr(response, 'render') else response
+
+            handler = APICompressionMiddleware(render)
+
+            def get(**headers):
+                response = handler(factory.get(path, HTTP_HOST=host, **headers))
+                if response.status_code not in (200, 304):
+                    raise CommandError(f"GET {path} returned {response.status_code}")
+                return response
+
+            full_time, full = timed(lambda: get(), options['iterations'])
+            encoded_time, encoded = timed(lambda: get(HTTP_ACCEPT_ENCODING='br, gzip'), options['iterations'])
+            cached_time, cached = timed(
+                lambda: get(HTTP_ACCEPT_ENCODING='br, gzip', HTTP_IF_NONE_MATCH=encoded['ETag']),
+                options['iterations']
+            )
+            if cached.status_code != 304:
+                raise CommandError(f"Revalidating {path} returned {cached.status_code}, expected 304")
+
+            self.stdout.write(
+                f"  {label:<6} identity {full_time * 1000:6.2f} ms {len(full.content):>7} bytes   "
+                f"{encoded.get('Content-Encoding', 'identity'):<4} {encoded_time * 1000:6.2f} ms "
+                f"{len(encoded.content):>7} bytes   304 {cached_time * 1000:6.2f} ms {len(cached.content)} bytes"
+            )
+
+    def run_images(self, queryset, page_sizes, options):
+        """CPU and memory per upload for validation + processing, before and after single-decode probing"""
+        from nfts.services import filebase_service
+
+        samples = [
+            ('photo.jpg', sample_image((4000, 3000), 'RGB', 'JPEG'), 'image/jpeg'),
+            ('art.png', sample_image((2400, 1800), 'RGBA', 'PNG'), 'image/png'),
+            ('small.png', sample_image((800, 800), 'RGB', 'PNG'), 'image/png'),
+        ]
+        field = ProbedImageField()
+        iterations = max(options['iterations'] // 4, 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data, content_type in samples:
+                path = os.path.join(directory, name)
+                with open(path, 'wb') as f:
+                    f.write(data)
+
+                # Multipart uploads arrive in memory; finalized chunked uploads are read from disk
+                sources = [
+                    ('memory', lambda: SimpleUploadedFile(name, data, content_type=content_type)),
+                    ('disk', lambda: UploadedFile(open(path, 'rb'), name=name, content_type=content_type,
+                                                  size=len(data))),
+                ]
+                for source, make_upload in sources:
+                    def legacy():
+                        with make_upload() as upload:
+                            return legacy_upload_pipeline(upload)
+
+                    def probed():
+                        with make_upload() as upload:
+                            return filebase_service._process_image(field.run_validation(upload).image_probe)
+
+                    legacy_cpu, legacy_result = timed(legacy, iterations, clock=time.process_time)
+                    probed_cpu, probed_result = timed(probed, iterations, clock=time.process_time)
+                    if legacy_result != (probed_result[0], probed_result[2]):
+                        raise CommandError(f"Processed output of {name} differs from the legacy pipeline")
+
+                    self.stdout.write(
+                        f"  {name:<10} {len(data) / 1e6:4.1f} MB {source:<6}: "
+                        f"before {legacy_cpu * 1000:6.1f} ms CPU, {python_heap_peak(legacy) / 1e6:5.1f} MB heap   "
+                        f"after {probed_cpu * 1000:6.1f} ms CPU, {python_heap_peak(probed) / 1e6:5.1f} MB heap"
+                    )
+
+    def run_image_guards(self, queryset, page_sizes, options):
+        """Crafted decompression bombs are rejected from headers; big legal images stay within budget"""
+        from nfts.services import filebase_service
+
+        field = ProbedImageField()
+        cases = [
+            # (label, file name, data, should be accepted)
+            ('1-bit PNG 16000x16000', 'bomb.png', png_bomb(16000, 16000), False),
+            ('RGB PNG 8000x8000', 'big.png', png_bomb(8000, 8000, color_type=2, bit_depth=8), False),
+            ('GIF screen 65535x65535', 'screen.gif', gif_screen_bomb(65535, 65535), False),
+            (f"GIF {settings.IMAGE_MAX_FRAMES + 1} frames", 'frames.gif',
+             many_frames_gif(settings.IMAGE_MAX_FRAMES + 1), False),
+            ('RGB PNG 6000x6000', 'large.png', png_bomb(6000, 6000, color_type=2, bit_depth=8), True),
+            ('JPEG 8000x6000', 'large.jpg', smooth_jpeg((8000, 6000)), True),
+            ('RGB PNG 2000x2000', 'normal.png', png_bomb(2000, 2000, color_type=2, bit_depth=8), True),
+        ]
+
+        for label, name, data, expect_accepted in cases:
+            try:
+                start = time.perf_counter()
+                probe = field.run_validation(SimpleUploadedFile(name, data)).image_probe
+                probe_ms = (time.perf_counter() - start) * 1000
+            except serializers.ValidationError as e:
+                if expect_accepted:
+                    raise CommandError(f"{label} should be accepted but was rejected: {e.detail[0]}")
+                self.stdout.write(f"  {label:<24} {len(data) / 1e3:8.1f} KB  rejected: {e.detail[0]}")
+                continue
+            if not expect_accepted:
+                raise CommandError(f"{label} should be rejected by the header probe")
+
+            path = 'draft' if probe.draft_size else 'large slot' if probe.is_large else 'normal'
+            growth = peak_rss_growth(lambda: filebase_service._process_image(probe))
+            self.stdout.write(
+                f"  {label:<24} {len(data) / 1e3:8.1f} KB  accepted ({path}): probe {probe_ms:.1f} ms, "
+                f"{probe.decode_pixels / 1e6:.1f} MP decoded, peak RSS +{growth:.0f} MB"
+            )
+
+    def run_animation(self, queryset, page_sizes, options):
+        """Animated GIF -> animated WebP: streamed frames vs materializing every frame"""
+        from nfts.imaging import fit_within, resize_frame
+        from nfts.services import filebase_service
+
+        field = ProbedImageField()
+        for size, frames in [((480, 360), 60), ((1200, 900), 120)]:
+            data = animated_gif(size, frames)
+
+            def streamed():
+                probe = field.run_validation(SimpleUploadedFile('anim.gif', data)).image_probe
+                return filebase_service._process_image(probe)
+
+            def materialized():
+                probe = field.run_validation(SimpleUploadedFile('anim.gif', data)).image_probe
+                image = probe.image
+                target = fit_within(image.size, (2048, 2048))
+                images = []
+                for index in range(probe.frames):
+                    image.seek(index)
+                    images.append(resize_frame(image, target))
+                output = BytesIO()
+                images[0].save(output, format='WEBP', save_all=True, append_images=images[1:], duration=40, quality=80)
+                return output.getvalue()
+
+            elapsed, result = timed(streamed, 1)
+            if result[1] != 'image/webp' or Image.open(BytesIO(result[0])).n_frames != frames:
+                raise CommandError(f"Animation of {frames} frames was not kept")
+            self.stdout.write(
+                f"  {size[0]}x{size[1]} x {frames} frames ({len(data) / 1e6:.1f} MB GIF -> {len(result[0]) / 1e6:.1f} MB WebP): "
+                f"{frames / elapsed:.0f} frames/s, peak RSS +{peak_rss_growth(streamed):.0f} MB streamed vs "
+                f"+{peak_rss_growth(materialized):.0f} MB with every frame in memory"
+            )
+
+    def run_generative(self, queryset, page_sizes, options):
+        """Trait compositing: Pillow per image vs pre-decoded NumPy layers, in-process and pooled"""
+        from nfts.generative import LayerSet, LayerStack, _render_in_worker, bounded_map, draw_combinations, render_pool
+
+        size = (1024, 1024)
+        count = 40
+        workers = os.cpu_count() or 1
+        with tempfile.TemporaryDirectory() as directory:
+            trait_layers(directory, size)
+            layer_set = LayerSet.from_directory(directory)
+            combinations = draw_combinations(layer_set, count, set(), seed=0)
+
+            def pillow(combination):
+                image = Image.new('RGBA', size, (255, 255, 255, 255))
+                for trait, index in zip(layer_set.traits, combination):
+                    with Image.open(trait.values[index].path) as layer:
+                        image = Image.alpha_composite(image, layer.convert('RGBA'))
+                output = BytesIO()
+                image.convert('RGB').save(output, format='PNG', compress_level=1)
+                return output.getvalue()
+
+            decode_seconds, stack = timed(lambda: LayerStack(layer_set), 1)
+            pillow_seconds, _ = timed(lambda: [pillow(combination) for combination in combinations], 1)
+            numpy_seconds, _ = timed(lambda: [stack.render_png(combination) for combination in combinations], 1)
+
+            def pooled():
+                with render_pool(stack, workers) as pool:
+                    return list(bounded_map(pool, _render_in_worker, combinations, workers * 2))
+            pooled_seconds, _ = timed(pooled, 1)
+
+            for combination in combinations[:3]:
+                expected = np.asarray(Image.open(BytesIO(pillow(combination))))
+                if np.abs(expected.astype(int) - stack.render(combination)).max() > 1:
+                    raise CommandError(f"NumPy composite of {combination} differs from Pillow")
+
+        self.stdout.write(
+            f"  {len(layer_set.traits)} traits x 8 values at {size[0]}x{size[1]}, "
+            f"{layer_set.capacity} combinations; layers decoded once in {decode_seconds * 1000:.0f} ms "
+            f"({stack.nbytes / 1e6:.0f} MB)"
+        )
+        for label, seconds in [
+            ('Pillow, layers decoded per image', pillow_seconds),
+            ('NumPy, pre-decoded layers', numpy_seconds),
+            (f"NumPy, {workers} render process{'es' if workers > 1 else ''}", pooled_seconds),
+        ]:
+            self.stdout.write(f"  {label:<36} {count / seconds * 60:8.0f} images/min")
+
+    def run_tiles(self, queryset, page_sizes, options):
+        """Deep-zoom pyramid: one-pass row cascade vs resizing every level of the whole image"""
+        from nfts import tiles
+
+        size = (6000, 4000)
+        gradient = Image.linear_gradient('L').resize(size)
+        source = Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient))
+        pyramid = tiles.new_pyramid('benchmark', size)
+        counts = []
+
+        def encode(level, column, row, tile):
+            tiles.encode_tile(tile)
+
+        def cascade():
+            tiles.build_pyramid(source, pyramid, lambda *tile: counts.append(encode(*tile)))
+
+        def per_level():
+            image = source
+            for level in reversed(range(tiles.level_count(pyramid))):
+                if level < tiles.level_count(pyramid) - 1:
+                    image = image.reduce(2)
+                columns, rows = tiles.tile_grid(pyramid, level)
+                step, overlap = pyramid['tile_size'], pyramid['overlap']
+                for column in range(columns):
+                    for row in range(rows):
+                        encode(level, column, row, image.crop((
+                            max(column * step - overlap, 0), max(row * step - overlap, 0),
+                            min((column + 1) * step + overlap, image.width), min((row + 1) * step + overlap, image.height)
+                        )))
+
+        cascade_seconds, _ = timed(cascade, 1)
+        per_level_seconds, _ = timed(per_level, 1)
+        self.stdout.write(
+            f"  {size[0]}x{size[1]}: {len(counts)} tiles in {tiles.level_count(pyramid)} levels "
+            f"({size[0] * size[1] * 3 / 1e6:.0f} MB decoded source)"
+        )
+        self.stdout.write(
+            f"  one-pass cascade     {cascade_seconds * 1000:7.0f} ms   peak RSS +{peak_rss_growth(cascade):.0f} MB"
+        )
+        self.stdout.write(
+            f"  full level images    {per_level_seconds * 1000:7.0f} ms   peak RSS +{peak_rss_growth(per_level):.0f} MB"
+        )
+
+    def run_placeholders(self, queryset, page_sizes, options):
+        """BlurHash + dominant colors as computed in _process_image, on the already resized image"""
+        from nfts import placeholders
+
+        iterations = max(options['iterations'], 5)
+        for size in [(512, 512), (2048, 1365), (1365, 2048)]:
+            image = Image.open(BytesIO(sample_image(size, 'RGB', 'PNG')))
+            image.load()
+            elapsed, (blurhash, colors) = timed(lambda: placeholders.compute(image), iterations)
+            self.stdout.write(f"  {size[0]}x{size[1]:<5} {elapsed * 1000:6.2f} ms   {blurhash}  {' '.join(colors)}")
+
+    def run_attributes(self, queryset, page_sizes, options):
+        """Attribute reads and trait filters: NFTAttribute join path vs the denormalized attributes_json column"""
+        vendor = connections[queryset.db].vendor
+        containment = connections[queryset.db].features.supports_json_field_contains
+        self.stdout.write(
+            f"Database: {vendor}; trait filters use "
+            f"{'JSON containment' if containment else 'EXISTS on NFTAttribute (JSON containment needs PostgreSQL)'}"
+        )
+        renderer = FastJSONRenderer()
+        # Fixtures share one created_at; order by the key so pages time attribute access, not a tie-break sort
+        queryset = queryset.order_by('-id')
+
+        for size in page_sizes:
+            def join():
+                rows = list(nft_values(queryset, NFT_FIELDS_WITHOUT_ATTRIBUTES)[:size])
+                attributes = {}
+                for nft_id, *values in NFTAttribute.objects.filter(
+                    nft_id__in=[row['id'] for row in rows]
+                ).order_by('id').values_list('nft_id', *traits.ATTRIBUTE_FIELDS):
+                    attributes.setdefault(nft_id, []).append(dict(zip(traits.ATTRIBUTE_FIELDS, values)))
+                results = serialize_rows(rows, NFT_FIELDS_WITHOUT_ATTRIBUTES)
+                for row, item in zip(rows, results):
+                    item['attributes'] = attributes.get(row['id'], [])
+                return renderer.render([{field: item[field] for field in NFT_FIELDS} for item in results])
+
+            def denormalized():
+                return renderer.render(serialize_rows(nft_values(queryset)[:size]))
+
+            join_time, join_body = timed(join, options['iterations'])
+            json_time, json_body = timed(denormalized, options['iterations'])
+            if join_body != json_body:
+                raise CommandError(f"attributes_json output differs from NFTAttribute rows at page size {size}")
+            self.stdout.write(
+                f"  read {size:>4} rows: join {join_time * 1000:7.2f} ms   attributes_json {json_time * 1000:7.2f} ms   "
+                f"x{join_time / json_time:.1f} (identical)"
+            )
+
+        size = max(page_sizes)
+        last = options['attributes'] - 1
+        cases = [
+            [('Trait 1', 'Value 1.1 ✓')],
+            [('Trait 1', 'Value 1.1 ✓'), (f"Trait {last}", f"Value {last}.0 ✓")],
+        ]
+        for trait_filters in cases:
+            def join_filter():
+                filtered = queryset
+                for trait_type, value in trait_filters:
+                    filtered = filtered.filter(Exists(
+                        NFTAttribute.objects.filter(nft=OuterRef('pk'), trait_type=trait_type, value=value)
+                    ))
+                return filtered.count(), list(filtered.values_list('id', flat=True)[:size])
+
+            def json_filter():
+                filtered = traits.filter_traits(queryset, trait_filters)
+                return filtered.count(), list(filtered.values_list('id', flat=True)[:size])
+
+            join_time, join_result = timed(join_filter, options['iterations'])
+            json_time, json_result = timed(json_filter, options['iterations'])
+            if join_result != json_result:
+                raise CommandError(f"Trait filter results differ for {trait_filters}")
+            label = ' & '.join(f"{trait_type}:{value}" for trait_type, value in trait_filters)
+            self.stdout.write(
+                f"  filter {label} ({join_result[0]} matches, count + first {size}): "
+                f"join {join_time * 1000:7.2f} ms   attributes_json {json_time * 1000:7.2f} ms   "
+                f"x{join_time / json_time:.1f}"
+            )
+
+    def run_metadata_store(self, queryset, page_sizes, options):
+        """Detail and token metadata responses from the database vs the memory-mapped metadata store"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metadata.store')
+            start = time.perf_counter()
+            count = build_metadata_store(path)
+            self.stdout.write(
+                f"Built {count} NFTs in {time.perf_counter() - start:.2f}s, {os.path.getsize(path) / 1e6:.1f} MB"
+            )
+
+            factory = RequestFactory()
+            host = next((allowed.lstrip('.') for allowed in settings.ALLOWED_HOSTS if allowed != '*'), 'localhost')
+            nft_id, token_id = queryset.filter(token_id__isnull=False).values_list('id', 'token_id').first()
+            cases = [
+                ('detail', f"/api/nfts/{nft_id}/", NFTMetadataDetailView.as_view(), {'id': nft_id}),
+                ('token', f"/api/tokens/{FIXTURE_CONTRACT}/{token_id}/", TokenMetadataView.as_view(),
+                 {'contract_address': FIXTURE_CONTRACT, 'token_id': token_id}),
+            ]
+            for label, url, view, kwargs in cases:
+                def get(view=view, url=url, kwargs=kwargs):
+                    response = view(factory.get(url, HTTP_HOST=host), **kwargs)
+                    if hasattr(response, 'render'):
+                        response.render()
+                    if response.status_code != 200:
+                        raise CommandError(f"GET {url} returned {response.status_code}")
+                    return response.content
+
+                with override_settings(METADATA_STORE_PATH=''):
+                    database_time, database_body = timed(get, options['iterations'])
+                with override_settings(METADATA_STORE_PATH=path):
+                    get()  # Map the file and read the header once
+                    with CaptureQueriesContext(connections[queryset.db]) as queries:
+                        store_time, store_body = timed(get, options['iterations'])
+                if queries.captured_queries:
+                    raise CommandError(f"Serving {url} from the metadata store queried the database")
+                if store_body != database_body:
+                    raise CommandError(f"Metadata store output differs from the database for {url}")
+                self.stdout.write(
+                    f"  {label:<6} database {database_time * 1000:6.3f} ms   store {store_time * 1000:6.3f} ms   "
+                    f"x{database_time / store_time:.1f}   {len(store_body)} bytes (identical, no queries)"
+                )
+
+    def run_admission(self, queryset, page_sizes, options):
+        """Simulated create-nft/ load, one wallet scripting uploads among well-behaved wallets, with and without admission control
+
+        Time is simulated: gunicorn workers take requests from one FIFO backlog, and
+        uploads hold a worker for a log-normal time (median 2s). Admission decisions
+        are real ``admit``/``release`` calls against the database.
+        """
+        workers, duration, script_loops, wallets, think_time = 10, 600.0, 30, 8, 20.0
+        reject_seconds = 0.02  # Worker time to parse a request and answer 429
+        limits = {
+            'ADMISSION_MAX_CONCURRENT': 8, 'ADMISSION_MAX_CONCURRENT_PER_CLIENT': 2, 'ADMISSION_RESERVED_SLOTS': 2,
+            'ADMISSION_CLIENT_RATE': 20, 'ADMISSION_CLIENT_BURST': 5, 'ADMISSION_GLOBAL_RATE': 0,
+            'ADMISSION_RETRY_AFTER': 5, 'ADMISSION_LEASE_SECONDS': 300,
+        }
+        self.stdout.write(
+            f"{workers} workers, {duration:.0f}s: 1 wallet x {script_loops} upload loops, "
+            f"{wallets} wallets uploading every ~{think_time:.0f}s; "
+            f"limits {limits['ADMISSION_MAX_CONCURRENT']} concurrent, "
+            f"{limits['ADMISSION_MAX_CONCURRENT_PER_CLIENT']} per wallet, "
+            f"{limits['ADMISSION_CLIENT_RATE']}/min per wallet"
+        )
+        epoch = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+        def simulate(enabled: bool):
+            rng = random.Random(1)
+            events, backlog = [], deque()
+            sequence = 0
+            idle = workers
+            latencies, completed, rejected = [], {'script': 0, 'wallets': 0}, {'script': 0, 'wallets': 0}
+            admission_time, admission_calls = 0.0, 0
+
+            def schedule(at, action, *payload):
+                nonlocal sequence
+                sequence += 1
+                heapq.heappush(events, (at, sequence, action, payload))
+
+            def start(now):
+                nonlocal idle, admission_time, admission_calls
+                while idle and backlog:
+                    idle -= 1
+                    client, first_at = backlog.popleft()
+                    lease = None
+                    if enabled:
+                        started = time.perf_counter()
+                        try:
+                            lease = admit(client, now=epoch + timedelta(seconds=now))
+                        except AdmissionRejected as e:
+                            schedule(now + reject_seconds, 'rejected', client, first_at, e.retry_after)
+                            continue
+                        finally:
+                            admission_time += time.perf_counter() - started
+                            admission_calls += 1
+                    schedule(now + rng.lognormvariate(math.log(2.0), 0.5), 'done', client, first_at, lease)
+
+            for loop in range(script_loops):
+                schedule(loop * 0.01, 'arrive', 'wallet:script', None)
+            for wallet in range(wallets):
+                schedule(rng.expovariate(1 / think_time), 'arrive', f"wallet:{wallet}", None)
+
+            while events:
+                now, _, action, payload = heapq.heappop(events)
+                if now > duration:
+                    break
+                client, first_at = payload[0], payload[1]
+                group = 'script' if client == 'wallet:script' else 'wallets'
+                if action == 'arrive':
+                    backlog.append((client, now if first_at is None else first_at))
+                elif action == 'rejected':
+                    idle += 1
+                    rejected[group] += 1
+                    schedule(now + max(math.ceil(payload[2]), 1), 'arrive', client, first_at)
+                else:
+                    idle += 1
+                    if payload[2] is not None:
+                        release(payload[2])
+                    completed[group] += 1
+                    if group == 'script':
+                        schedule(now, 'arrive', client, None)
+                    else:
+                        latencies.append(now - first_at)
+                        schedule(now + rng.expovariate(1 / think_time), 'arrive', client, None)
+                start(now)
+            return sorted(latencies), completed, rejected, admission_time / max(admission_calls, 1)
+
+        with override_settings(ADMISSION_CONTROL_ENABLED=True, **limits):
+            for enabled in (False, True):
+                AdmissionLease.objects.all().delete()
+                AdmissionBucket.objects.all().delete()
+                latencies, completed, rejected, admission_cost = simulate(enabled)
+
+                def percentile(q):
+                    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+                self.stdout.write(
+                    f"  admission {'on ' if enabled else 'off'}: wallets p50 {percentile(0.5):5.1f}s  "
+                    f"p95 {percentile(0.95):5.1f}s  p99 {percentile(0.99):5.1f}s  max {latencies[-1]:5.1f}s "
+                    f"({completed['wallets']} uploads, {rejected['wallets']} x 429)   "
+                    f"script {completed['script']} uploads, {rejected['script']} x 429"
+                    + (f"   admit {admission_cost * 1000:.2f} ms/call" if enabled else '')
+                )
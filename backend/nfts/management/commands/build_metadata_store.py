@@ -0,0 +1,38 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nfts.metadata_store import CHUNK_SIZE, append_nfts, build
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped metadata store from the database, or append re-rendered NFTs to it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Store file (default: METADATA_STORE_PATH)')
+        parser.add_argument('--ids', help='Comma-separated NFT ids to append instead of rebuilding')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='NFTs rendered per query')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.METADATA_STORE_PATH
+        if not path:
+            raise CommandError('Set METADATA_STORE_PATH or pass --path')
+
+        start = time.time()
+        if options['ids']:
+            try:
+                nft_ids = [int(nft_id) for nft_id in options['ids'].split(',')]
+            except ValueError:
+                raise CommandError('--ids must be comma-separated integers')
+            if not os.path.exists(path):
+                raise CommandError(f"{path} does not exist; build it first")
+            appended = append_nfts(path, nft_ids)
+            self.stdout.write(self.style.SUCCESS(f"Appended {appended} NFTs to {path}"))
+            return
+
+        count = build(path, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} NFTs to {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.time() - start:.1f}s"
+        ))
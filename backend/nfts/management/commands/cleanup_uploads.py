@@ -0,0 +1,217 @@
+import time
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from nfts import chunked
+from nfts.admission import evict_idle_buckets
+from nfts.idempotency import evict_expired_keys
+from nfts.models import NFTCollection, NFTMetadata, TaskCheckpoint, UploadSession
+
+STALE_STATUSES = ['failed', 'uploading']
+SESSIONS_CHECKPOINT = 'cleanup_uploads:sessions'
+
+# S3 DeleteObjects accepts at most 1,000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+class Throttle:
+    """Spaces out operations to at most ``rate`` per second (0 = unlimited)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class Command(BaseCommand):
+    help = 'Delete stale upload sessions and the Filebase objects failed uploads left behind, in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=24,
+                            help='Only touch sessions/objects not modified for this long')
+        parser.add_argument('--batch-size', type=int, default=500, help='Sessions deleted per transaction')
+        parser.add_argument('--rate', type=float, default=5,
+                            help='Max DB batches / S3 requests per second (0 = unlimited)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting')
+        parser.add_argument('--restart', action='store_true', help='Ignore saved progress and start from the beginning')
+        parser.add_argument('--skip-sessions', action='store_true', help='Do not clean up upload sessions')
+        parser.add_argument('--skip-objects', action='store_true', help='Do not delete objects left by failed uploads')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.throttle = Throttle(options['rate'])
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+
+        if options['restart'] and not self.dry_run:
+            TaskCheckpoint.objects.filter(name=SESSIONS_CHECKPOINT).delete()
+
+        # Objects first: the failed sessions recording them are stale sessions too
+        if not options['skip_objects']:
+            self.cleanup_objects(cutoff, options['batch_size'])
+        if not options['skip_sessions']:
+            self.cleanup_sessions(cutoff, options['batch_size'])
+
+    # Checkpoints
+
+    def load_checkpoint(self, name):
+        checkpoint = TaskCheckpoint.objects.filter(name=name).first()
+        return checkpoint.state if checkpoint else {}
+
+    def save_checkpoint(self, name, state):
+        if not self.dry_run:
+            TaskCheckpoint.objects.update_or_create(name=name, defaults={'state': state})
+
+    def clear_checkpoint(self, name):
+        if not self.dry_run:
+            TaskCheckpoint.objects.filter(name=name).delete()
+
+    # Upload sessions
+
+    def cleanup_sessions(self, cutoff, batch_size):
+        last_id = self.load_checkpoint(SESSIONS_CHECKPOINT).get('last_id', 0)
+        if last_id:
+            self.stdout.write(f"Resuming session cleanup after id {last_id}")
+
+        stale = UploadSession.objects.filter(upload_status__in=STALE_STATUSES, updated_at__lt=cutoff)
+        total = 0
+        while True:
+            self.throttle.wait()
+            batch = list(
+                stale.filter(id__gt=last_id).order_by('id').values_list('id', 'session_id')[:batch_size]
+            )
+            if not batch:
+                break
+
+            first_id, last_id = batch[0][0], batch[-1][0]
+            if not self.dry_run:
+                # Short, indexed range delete per batch instead of one huge transaction
+                with transaction.atomic():
+                    stale.filter(id__gte=first_id, id__lte=last_id).delete()
+                for _, session_id in batch:
+                    chunked.discard_partial(session_id)
+
+            total += len(batch)
+            self.save_checkpoint(SESSIONS_CHECKPOINT, {'last_id': last_id})
+            self.stdout.write(f"  {'Would delete' if self.dry_run else 'Deleted'} {len(batch)} sessions (through id {last_id})")
+
+        self.clear_checkpoint(SESSIONS_CHECKPOINT)
+        if not self.dry_run:
+            released = evict_expired_keys()
+            if released:
+                self.stdout.write(f"Released {released} expired idempotency keys")
+            evicted = evict_idle_buckets()
+            if evicted:
+                self.stdout.write(f"Evicted {evicted} idle admission buckets")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if self.dry_run else 'Deleted'} {total} stale upload sessions"
+        ))
+
+    # Bucket objects
+
+    def cleanup_objects(self, cutoff, batch_size):
+        """Delete the objects left behind by failed create-nft jobs
+
+        Only keys recorded on failed sessions are candidates: standalone
+        uploads and tile pyramids are never recorded, so they are never
+        deleted. A recorded key is deleted only if nothing links it, no NFT
+        carries its CID (as rows from before object keys were recorded do),
+        and it was not stored again after the cutoff.
+        """
+        from nfts.services import filebase_service
+
+        s3 = filebase_service.s3_client
+        bucket = filebase_service.bucket_name
+        abandoned = UploadSession.objects.filter(upload_status='failed', updated_at__lt=cutoff).exclude(
+            orphaned_object_keys=[]
+        )
+
+        last_id = 0
+        deleted = 0
+        while True:
+            batch = list(
+                abandoned.filter(id__gt=last_id).order_by('id').values_list('id', 'orphaned_object_keys')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            keys = {key for _, session_keys in batch for key in session_keys}
+            linked = NFTMetadata.objects.filter(Q(image_object_key__in=keys) | Q(metadata_object_key__in=keys))
+            keys -= {key for pair in linked.values_list('image_object_key', 'metadata_object_key') for key in pair}
+            keys -= set(NFTCollection.objects.filter(metadata_car_key__in=keys).values_list('metadata_car_key', flat=True))
+
+            orphans = []
+            for key in sorted(keys):
+                info = self.object_info(s3, bucket, key)
+                if info is None:
+                    continue
+                cid, last_modified = info
+                if last_modified and last_modified >= cutoff:
+                    continue
+                if cid and NFTMetadata.objects.filter(Q(image_ipfs_hash=cid) | Q(metadata_ipfs_hash=cid)).exists():
+                    continue
+                orphans.append(key)
+
+            failed = set()
+            for start in range(0, len(orphans), DELETE_BATCH_SIZE):
+                chunk = orphans[start:start + DELETE_BATCH_SIZE]
+                failed |= self.delete_objects(s3, bucket, chunk)
+                deleted += len(chunk) - len(failed & set(chunk))
+            if not self.dry_run:
+                # Keys that could not be deleted stay recorded for the next run
+                for session_id, session_keys in batch:
+                    UploadSession.objects.filter(id=session_id).update(
+                        orphaned_object_keys=[key for key in session_keys if key in failed]
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if self.dry_run else 'Deleted'} {deleted} objects left by failed uploads"
+        ))
+
+    def object_info(self, s3, bucket, key):
+        """(CID, LastModified) of an object; None if it is gone or unreadable"""
+        self.throttle.wait()
+        try:
+            info = s3.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                self.stderr.write(f"  Could not inspect {key}: {e}")
+            return None
+        except Exception as e:
+            self.stderr.write(f"  Could not inspect {key}: {e}")
+            return None
+        cid = info.get('Metadata', {}).get('cid', '')
+        if not cid:
+            headers = info.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            cid = headers.get('x-amz-meta-cid', '')
+        return cid, info.get('LastModified')
+
+    def delete_objects(self, s3, bucket, keys):
+        """Delete up to DELETE_BATCH_SIZE keys; the keys that failed"""
+        if self.dry_run:
+            self.stdout.write(f"  Would delete {len(keys)} objects (first: {keys[0]})")
+            return set()
+
+        self.throttle.wait()
+        response = s3.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        errors = response.get('Errors', [])
+        for error in errors[:10]:
+            self.stderr.write(f"  Failed to delete {error.get('Key')}: {error.get('Message')}")
+        self.stdout.write(f"  Deleted {len(keys) - len(errors)} objects")
+        return {error.get('Key') for error in errors}
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from nfts.generative import LayerSet, generate_collection
+from nfts.models import NFTCollection
+from nfts.resilience import FilebaseUnavailableError
+
+
+class Command(BaseCommand):
+    help = ("Generate and upload a collection's NFTs from trait layers "
+            "(<layers>/<trait_type>/<value>#<weight>.png)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('collection_id', type=int)
+        parser.add_argument('layers', help='Directory with one sub-directory of RGBA PNG layers per trait type')
+        parser.add_argument('--count', type=int, required=True, help='Number of new NFTs to generate')
+        parser.add_argument('--order', help='Comma-separated trait types, bottom layer first (default: by name)')
+        parser.add_argument('--description', default='', help='Description of every generated NFT')
+        parser.add_argument('--owner', help='Owner address of the NFTs (default: the collection creator)')
+        parser.add_argument('--seed', type=int, help='Random seed, for a reproducible draw')
+        parser.add_argument('--workers', type=int, default=0, help='Render processes (default: one per CPU)')
+        parser.add_argument('--upload-workers', type=int, default=4, help='Concurrent uploads to Filebase')
+        parser.add_argument('--dry-run', action='store_true', help='Draw and render without uploading')
+
+    def handle(self, *args, **options):
+        collection = NFTCollection.objects.filter(id=options['collection_id']).first()
+        if collection is None:
+            raise CommandError(f"Collection {options['collection_id']} not found")
+        if options['count'] < 1:
+            raise CommandError('--count must be positive')
+
+        order = [name.strip() for name in options['order'].split(',')] if options['order'] else None
+        try:
+            layer_set = LayerSet.from_directory(options['layers'], order)
+            self.stdout.write(
+                f"  Traits:       {', '.join(trait.trait_type for trait in layer_set.traits)}"
+            )
+            self.stdout.write(f"  Combinations: {layer_set.capacity}")
+            result = generate_collection(
+                collection, layer_set, options['count'],
+                description=options['description'],
+                owner_address=options['owner'],
+                seed=options['seed'],
+                render_workers=options['workers'] or None,
+                upload_workers=options['upload_workers'],
+                dry_run=options['dry_run'],
+                progress=lambda progress: self.stdout.write(f"  Created {progress.created} NFTs"),
+            )
+        except (ValueError, FilebaseUnavailableError) as e:
+            raise CommandError(str(e))
+
+        per_minute = result.rendered / result.elapsed_seconds * 60 if result.elapsed_seconds else 0
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rendered {result.rendered} NFTs in {result.elapsed_seconds:.1f}s ({per_minute:.0f}/min); nothing uploaded"
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} NFTs in collection {collection.id}, {result.failed} failed, "
+            f"in {result.elapsed_seconds:.1f}s ({per_minute:.0f}/min)"
+        ))
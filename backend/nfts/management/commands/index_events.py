@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nfts.indexer import EventIndexer
+from nfts.rpc import RPCError, get_rpc_client
+
+
+class Command(BaseCommand):
+    help = 'Index NFT contract events from the JSON-RPC node into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Catch up to the confirmed head and exit')
+        parser.add_argument('--from-block', type=int, help='Discard saved progress and restart at this block')
+        parser.add_argument('--contract', default=settings.NFT_CONTRACT_ADDRESS, help='Contract address to index')
+        parser.add_argument('--batch-size', type=int, default=settings.INDEXER_BATCH_SIZE,
+                            help='Blocks per eth_getLogs request')
+        parser.add_argument('--confirmations', type=int, default=settings.INDEXER_CONFIRMATIONS,
+                            help='Only index blocks this many confirmations deep')
+        parser.add_argument('--poll-interval', type=float, default=settings.INDEXER_POLL_INTERVAL,
+                            help='Seconds to wait for new blocks once caught up')
+
+    def handle(self, *args, **options):
+        try:
+            indexer = EventIndexer(
+                get_rpc_client(),
+                options['contract'],
+                confirmations=options['confirmations'],
+                batch_size=options['batch_size'],
+                start_block=settings.INDEXER_START_BLOCK,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['from_block'] is not None:
+            indexer.reset(options['from_block'])
+            self.stdout.write(f"Restarting at block {options['from_block']}")
+
+        self.stdout.write(f"Indexing {indexer.contract_address} via {indexer.rpc.url}")
+        while True:
+            try:
+                self.catch_up(indexer)
+            except RPCError as e:
+                if options['once']:
+                    raise CommandError(str(e))
+                self.stderr.write(f"RPC error, retrying: {e}")
+
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
+
+    def catch_up(self, indexer):
+        while True:
+            result = indexer.sync_once()
+            if result is None:
+                return
+            self.stdout.write(
+                f"  Blocks {result['from_block']}-{result['to_block']}: "
+                f"{result['logs']} logs, {result['changed']} rows updated"
+            )
@@ -0,0 +1,75 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nfts import stats
+
+
+class Command(BaseCommand):
+    help = 'Show NFT statistics from the daily rollups, or backfill the rollups from source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Recompute rollups one day at a time')
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to backfill (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to backfill (YYYY-MM-DD)')
+        parser.add_argument('--days', type=int, default=30, help='Reporting window in days')
+        parser.add_argument('--collection', help='Report on a single collection id')
+        parser.add_argument('--owner', help='Report on a single owner address')
+        parser.add_argument('--top', type=int, default=5, help='Number of top owners/collections to list')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill(options['since'], options['until'])
+            return
+
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        if options['collection']:
+            dimension, value = 'collection', options['collection']
+        elif options['owner']:
+            dimension, value = 'owner', options['owner'].lower()
+        else:
+            dimension, value = 'all', ''
+
+        summary = stats.summarize(days=options['days'], dimension=dimension, value=value)
+        label = f"{dimension}={value}" if value else 'all NFTs'
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Last {options['days']} days ({label})"))
+        self.print_metrics(summary['totals'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Daily'))
+        self.stdout.write(f"  {'day':<12}{'nfts':>8}{'MB':>10}{'ok':>6}{'fail':>6}{'mean s':>9}")
+        for row in summary['daily']:
+            self.stdout.write(
+                f"  {row['day']:<12}{row['nfts_created']:>8}{row['bytes_stored'] / 1e6:>10.2f}"
+                f"{row['uploads_completed']:>6}{row['uploads_failed']:>6}"
+                f"{self.fmt(row['mean_upload_seconds']):>9}"
+            )
+
+        if dimension == 'all' and options['top']:
+            for top_dimension in ('owner', 'collection'):
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Top {top_dimension}s"))
+                for row in stats.top(options['days'], top_dimension, options['top']):
+                    self.stdout.write(
+                        f"  {row['dimension_value']:<44}{row['nfts_created']:>8} nfts"
+                        f"{row['bytes_stored'] / 1e6:>10.2f} MB"
+                    )
+
+    def backfill(self, since, until):
+        days = 0
+        for day, rows in stats.backfill(since=since, until=until):
+            days += 1
+            if rows:
+                self.stdout.write(f"  {day}: {rows} rollup rows")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {days} days"))
+
+    def print_metrics(self, metrics):
+        self.stdout.write(f"  NFTs created:        {metrics['nfts_created']}")
+        self.stdout.write(f"  Bytes stored:        {metrics['bytes_stored']}")
+        self.stdout.write(f"  Uploads completed:   {metrics['uploads_completed']}")
+        self.stdout.write(f"  Uploads failed:      {metrics['uploads_failed']}")
+        self.stdout.write(f"  Success rate:        {self.fmt(metrics['success_rate'])}")
+        self.stdout.write(f"  Mean upload seconds: {self.fmt(metrics['mean_upload_seconds'])}")
+
+    def fmt(self, value):
+        return '-' if value is None else f"{value:.3f}"
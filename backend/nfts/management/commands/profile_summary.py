@@ -0,0 +1,81 @@
+import io
+import pstats
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from nfts.profiling import get_profile_store
+
+
+class Command(BaseCommand):
+    help = 'Summarize the hottest functions and queries across captured request profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Number of functions/queries to show')
+        parser.add_argument(
+            '--sort',
+            default='tottime',
+            choices=['tottime', 'cumulative', 'ncalls'],
+            help='pstats sort key'
+        )
+        parser.add_argument('--path', default='', help='Only include profiles whose path starts with this prefix')
+        parser.add_argument('--slow-only', action='store_true', help='Only include profiles captured for being slow')
+
+    def handle(self, *args, **options):
+        store = get_profile_store()
+        profiles = [
+            info for info in store.list()
+            if info['path'].startswith(options['path'])
+            and (not options['slow_only'] or info.get('reason') == 'slow')
+        ]
+
+        # pstats writes partial lines, so buffer its report instead of
+        # streaming through self.stdout (which appends newlines per write)
+        report = io.StringIO()
+        stats = None
+        used = []
+        for info in profiles:
+            path = store.profile_path(info['id'])
+            if path is None:
+                continue
+            if stats is None:
+                stats = pstats.Stats(str(path), stream=report)
+            else:
+                stats.add(str(path))
+            used.append(info)
+
+        if stats is None:
+            self.stdout.write('No captured profiles found.')
+            return
+
+        durations = sorted(info['duration_ms'] for info in used)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{len(used)} profiles"))
+        self.stdout.write(
+            f"  duration ms: min {durations[0]:.1f}  "
+            f"median {durations[len(durations) // 2]:.1f}  max {durations[-1]:.1f}"
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Hottest functions'))
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(report.getvalue())
+
+        self._print_queries(store, used, options['limit'])
+
+    def _print_queries(self, store, profiles, limit):
+        """Aggregate recorded SQL by statement text"""
+        totals = defaultdict(lambda: [0, 0.0])
+        for info in profiles:
+            full = store.get(info['id']) or {}
+            for query in full.get('queries', []):
+                entry = totals[query['sql']]
+                entry[0] += 1
+                entry[1] += query['duration_ms']
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest queries (total time)'))
+        if not totals:
+            self.stdout.write('  No queries recorded.')
+            return
+
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        for sql, (count, total_ms) in ranked:
+            self.stdout.write(f"  {total_ms:10.2f} ms  {count:6d}x  {sql[:160]}")
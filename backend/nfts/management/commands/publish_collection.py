@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from nfts.models import NFTCollection
+from nfts.publish import publish_collection
+from nfts.resilience import FilebaseUnavailableError
+from nfts.rpc import predict_next_token_id
+
+
+class Command(BaseCommand):
+    help = "Publish a collection's metadata as one IPFS directory (single CAR upload) for ownerBatchMint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('collection_id', type=int)
+        parser.add_argument('--start-token-id', type=int,
+                            help='Token id of the first unminted NFT (default: the contract totalSupply)')
+        parser.add_argument('--dry-run', action='store_true', help='Build the CAR and report the root CID without uploading')
+        parser.add_argument('--force', action='store_true',
+                            help='Publish again even though tokens were minted under the current root')
+
+    def handle(self, *args, **options):
+        collection = NFTCollection.objects.filter(id=options['collection_id']).first()
+        if collection is None:
+            raise CommandError(f"Collection {options['collection_id']} not found")
+
+        start_token_id = options['start_token_id']
+        if start_token_id is None:
+            start_token_id = predict_next_token_id()
+
+        try:
+            result = publish_collection(collection, start_token_id=start_token_id, dry_run=options['dry_run'],
+                                         force=options['force'])
+        except (ValueError, FilebaseUnavailableError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"  Files:    {result['files']}")
+        self.stdout.write(f"  CAR size: {result['car_size']} bytes")
+        self.stdout.write(f"  Root CID: {result['metadata_root_cid']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would publish' if options['dry_run'] else 'Published'} collection {collection.id}; "
+            f"mint with ownerBatchMint(to, {result['quantity']}, {result['start_token_id']}, \"{result['base_uri']}\")"
+        ))
@@ -0,0 +1,234 @@
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+SIZE_UNITS = {'b': 1, 'kb': 1024, 'mb': 1024 * 1024}
+
+# Upper bounds (seconds) of the CID-availability histogram buckets
+CID_DELAY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    for unit in ('kb', 'mb', 'b'):
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(value)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = 'Probe storage throughput and latency (PUT, HEAD/CID resolution, GET) against the configured backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='64KB,1MB', help='Comma-separated object sizes, e.g. 16KB,1MB')
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of concurrent workers')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to keep starting new operations')
+        parser.add_argument('--max-ops', type=int, default=0, help='Stop after this many objects (0 = no limit)')
+        parser.add_argument('--cid-timeout', type=float, default=60, help='Give up waiting for a CID after this long')
+        parser.add_argument('--cid-poll-interval', type=float, default=0.25, help='Delay between HEAD polls for the CID')
+        parser.add_argument('--no-cid', action='store_true',
+                            help='HEAD each object once without waiting for a CID (for S3 stand-ins without one)')
+        parser.add_argument('--prefix', default='probe/', help='Key prefix for probe objects')
+        parser.add_argument('--with-retries', action='store_true',
+                            help='Go through the retry/circuit-breaker layer instead of the raw client')
+        parser.add_argument('--keep', action='store_true', help='Do not delete probe objects afterwards')
+
+    def handle(self, *args, **options):
+        try:
+            from nfts.services import filebase_service
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            sizes = [parse_size(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError(f"Invalid --sizes value: {options['sizes']}")
+        if not sizes or min(sizes) < 16:
+            raise CommandError('Object sizes must be at least 16 bytes')
+
+        self.s3 = filebase_service.s3_client if options['with_retries'] else filebase_service.s3_client.client
+        self.bucket = filebase_service.bucket_name
+        self.options = options
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.cid_delays = []
+        self.cid_timeouts = 0
+        self.timed_out_heads = 0
+        self.bytes_moved = defaultdict(int)
+        self.keys = []
+        self.started = 0
+
+        # One random payload per size; each object gets a unique prefix so it gets its own CID
+        payloads = [os.urandom(size) for size in sizes]
+
+        self.stdout.write(
+            f"Probing {filebase_service.endpoint_url} bucket {self.bucket}: sizes {sizes}, "
+            f"concurrency {options['concurrency']}, duration {options['duration']}s"
+        )
+
+        deadline = time.monotonic() + options['duration']
+        wall_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for _ in range(options['concurrency']):
+                executor.submit(self.worker, payloads, deadline)
+        elapsed = time.monotonic() - wall_start
+
+        self.report(elapsed)
+        if not options['keep']:
+            self.cleanup()
+
+    def next_op(self, deadline):
+        with self.lock:
+            if time.monotonic() >= deadline:
+                return None
+            if self.options['max_ops'] and self.started >= self.options['max_ops']:
+                return None
+            self.started += 1
+            return self.started
+
+    def record(self, op, seconds, nbytes=0):
+        with self.lock:
+            self.latencies[op].append(seconds)
+            self.bytes_moved[op] += nbytes
+
+    def fail(self, op):
+        with self.lock:
+            self.errors[op] += 1
+
+    def worker(self, payloads, deadline):
+        while True:
+            number = self.next_op(deadline)
+            if number is None:
+                return
+            payload = payloads[number % len(payloads)]
+            body = uuid.uuid4().bytes + payload[16:]
+            key = f"{self.options['prefix']}{uuid.uuid4().hex}"
+            try:
+                self.probe_object(key, body)
+            except Exception as e:
+                self.stderr.write(f"  {key}: {e}")
+
+    def probe_object(self, key, body):
+        start = time.perf_counter()
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType='application/octet-stream')
+        except Exception:
+            self.fail('PUT')
+            raise
+        put_done = time.perf_counter()
+        self.record('PUT', put_done - start, len(body))
+        with self.lock:
+            self.keys.append(key)
+
+        # Poll HEAD until the backend reports the IPFS CID
+        head_times = []
+        timed_out = False
+        while True:
+            head_start = time.perf_counter()
+            try:
+                info = self.s3.head_object(Bucket=self.bucket, Key=key)
+            except Exception:
+                self.fail('HEAD')
+                raise
+            now = time.perf_counter()
+            head_times.append(now - head_start)
+            cid = info.get('Metadata', {}).get('cid', '') or \
+                info.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('x-amz-meta-cid', '')
+            if cid or self.options['no_cid']:
+                break
+            if now - put_done > self.options['cid_timeout']:
+                timed_out = True
+                break
+            time.sleep(self.options['cid_poll_interval'])
+
+        with self.lock:
+            if cid:
+                self.cid_delays.append(now - put_done)
+            if timed_out:
+                # Reported on their own so endless polls don't skew HEAD latency
+                self.cid_timeouts += 1
+                self.timed_out_heads += len(head_times)
+            else:
+                self.latencies['HEAD'].extend(head_times)
+
+        get_start = time.perf_counter()
+        try:
+            data = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except Exception:
+            self.fail('GET')
+            raise
+        self.record('GET', time.perf_counter() - get_start, len(data))
+        if len(data) != len(body):
+            self.fail('GET')
+            raise ValueError(f"GET returned {len(data)} bytes, expected {len(body)}")
+
+    def report(self, elapsed):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Results over {elapsed:.1f}s"))
+        self.stdout.write(
+            f"  {'op':<6}{'count':>7}{'errors':>8}{'ops/s':>9}{'MB/s':>9}"
+            f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for op in ('PUT', 'HEAD', 'GET'):
+            values = sorted(self.latencies[op])
+            row = f"  {op:<6}{len(values):>7}{self.errors[op]:>8}{len(values) / elapsed:>9.2f}"
+            row += f"{self.bytes_moved[op] / elapsed / 1e6:>9.2f}"
+            for pct in (50, 90, 99, 100):
+                value = percentile(values, pct)
+                row += f"{'-' if value is None else f'{value * 1000:.1f}':>10}"
+            self.stdout.write(row)
+        if self.cid_timeouts:
+            self.stdout.write(
+                f"  {self.cid_timeouts} objects timed out waiting for a CID after {self.options['cid_timeout']:g}s; "
+                f"their {self.timed_out_heads} HEAD polls are not included above"
+            )
+
+        delays = sorted(self.cid_delays)
+        self.stdout.write(self.style.MIGRATE_HEADING('CID availability delay (after PUT completes)'))
+        if self.options['no_cid']:
+            self.stdout.write("  Not measured (--no-cid)")
+            return
+        if not delays:
+            self.stdout.write(
+                f"  No CIDs resolved ({self.cid_timeouts} timed out); "
+                f"pass --no-cid for backends that never report one"
+            )
+            return
+        summary = ', '.join(
+            f"p{pct} {percentile(delays, pct) * 1000:.0f} ms" for pct in (50, 90, 99)
+        )
+        self.stdout.write(f"  {summary}, max {delays[-1] * 1000:.0f} ms, timeouts {self.cid_timeouts}")
+
+        lower = 0.0
+        for upper in CID_DELAY_BUCKETS + [math.inf]:
+            count = sum(1 for delay in delays if lower <= delay < upper)
+            label = f"{lower:g}-{upper:g}s" if upper != math.inf else f">={lower:g}s"
+            self.stdout.write(f"  {label:>10} {count:>6} {'#' * round(40 * count / len(delays))}")
+            lower = upper
+
+    def cleanup(self):
+        for start in range(0, len(self.keys), 1000):
+            batch = self.keys[start:start + 1000]
+            try:
+                self.s3.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+            except Exception as e:
+                self.stderr.write(f"Failed to delete probe objects: {e}")
+                return
+        self.stdout.write(f"Deleted {len(self.keys)} probe objects")
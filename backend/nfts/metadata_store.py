@@ -0,0 +1,378 @@
+"""
+Memory-mapped store of pre-rendered NFT metadata, shared by all workers.
+
+Each gunicorn worker maps the same file read-only, so hot token metadata
+is served from the shared page cache: no database query and no
+per-worker copy. For every NFT the file holds two documents. One is the
+ERC-721 metadata JSON (as uploaded to IPFS); the other is the detail
+endpoint's JSON. Either is found by ``NFTMetadata.id`` or by
+``(contract_address, token_id)``.
+
+Layout (integers little-endian)::
+
+    header | records | id index | token index | appended records
+
+``build_metadata_store`` writes a record for every NFT followed by two
+sorted indexes, which readers binary-search in place. Later writes (new
+NFTs, mints, attribute edits) append re-rendered records under a file
+lock. Workers track just the appended part in small dicts and pick up
+growth from the header. The newest rendering of an NFT wins, so stale
+records are harmless. A rebuild folds the appended part back into the
+sorted indexes and atomically replaces the file. Deleted NFTs drop out at
+the next rebuild. Lookups the store cannot answer fall back to the
+database.
+"""
+import datetime
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from . import traits
+from .fast_serializers import FastJSONRenderer, nft_values, serialize_rows
+from .models import NFTMetadata
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NFTMETA1'
+
+# magic, id index offset, id count, token index offset, token count, first appended record, end of data
+HEADER = struct.Struct('<8s6Q')
+DATA_END = struct.Struct('<Q')
+DATA_END_OFFSET = HEADER.size - DATA_END.size
+
+# nft id, token id (-1 = none), rendered at (ns), updated_at (us since epoch), contract,
+# metadata length, detail length; the two JSON documents follow
+RECORD = struct.Struct('<qqQq20sII')
+
+ID_ENTRY = struct.Struct('<qQ')  # nft id, record offset
+TOKEN_KEY = struct.Struct('>20sQ')  # contract, token id; big-endian so keys sort bytewise
+TOKEN_ENTRY = struct.Struct(f'>{TOKEN_KEY.size}sQ')  # key, record offset
+
+# NFTs rendered per query while building
+CHUNK_SIZE = 2000
+
+# Workers look for a rebuilt file at most this often
+REOPEN_INTERVAL = 1.0
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class StoredNFT(NamedTuple):
+    nft_id: int
+    token_id: Optional[int]
+    contract_address: str
+    updated_at: datetime.datetime
+    metadata: memoryview  # ERC-721 metadata JSON
+    detail: memoryview  # Detail endpoint JSON
+
+
+def token_key(contract_address: str, token_id: Optional[int]) -> Optional[bytes]:
+    if token_id is None or token_id < 0 or not contract_address:
+        return None
+    try:
+        contract = bytes.fromhex(contract_address.lower().removeprefix('0x'))
+    except ValueError:
+        return None
+    if len(contract) != 20:
+        return None
+    return TOKEN_KEY.pack(contract, token_id)
+
+
+def token_metadata_json(item: Dict) -> bytes:
+    """ERC-721 metadata of a serialized NFT, as FilebaseService uploads it (compact)"""
+    from .services import filebase_service
+
+    metadata = filebase_service.create_nft_metadata(
+        name=item['name'],
+        description=item['description'],
+        image_ipfs_url=item['image_ipfs_url'],
+        attributes=traits.token_attributes(item['attributes'])
+    )
+    return json.dumps(metadata, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_records(rows: Sequence[Dict]) -> Iterator[Tuple[int, Optional[bytes], bytes]]:
+    """(nft id, token key, record) for rows from ``nft_values``"""
+    renderer = FastJSONRenderer()
+    rendered_at = time.time_ns()
+    for row, item in zip(rows, serialize_rows(rows)):
+        metadata = token_metadata_json(item)
+        detail = renderer.render(item)
+        key = token_key(row['contract_address'], row['token_id'])
+        updated_at = (row['updated_at'] - EPOCH) // datetime.timedelta(microseconds=1)
+        contract = TOKEN_KEY.unpack(key)[0] if key else bytes(20)
+        header = RECORD.pack(row['id'], -1 if row['token_id'] is None else row['token_id'], rendered_at,
+                             updated_at, contract, len(metadata), len(detail))
+        yield row['id'], key, header + metadata + detail
+
+
+@contextmanager
+def locked(path: str):
+    """Store file descriptor under an exclusive lock, following a rebuild that replaced the file"""
+    while True:
+        fd = os.open(path, os.O_RDWR)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            replaced = os.fstat(fd).st_ino != os.stat(path).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if not replaced:
+            break
+        os.close(fd)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def append_nfts(path: str, nft_ids: Iterable[int]) -> int:
+    """Append freshly rendered records for ``nft_ids`` to an existing store"""
+    if not os.path.exists(path):
+        return 0
+    rows = list(nft_values(NFTMetadata.objects.filter(id__in=list(nft_ids))).order_by('id'))
+    if not rows:
+        return 0
+    data = b''.join(record for _, _, record in render_records(rows))
+    with locked(path) as fd:
+        data_end, = DATA_END.unpack(os.pread(fd, DATA_END.size, DATA_END_OFFSET))
+        os.pwrite(fd, data, data_end)
+        # Readers only look up to the recorded end, so the records become visible at once
+        os.pwrite(fd, DATA_END.pack(data_end + len(data)), DATA_END_OFFSET)
+    return len(rows)
+
+
+def build(path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """Write a store for every NFT to ``path``, replacing the file atomically"""
+    appended_from = None
+    if os.path.exists(path):
+        with open(path, 'rb') as current:
+            appended_from, = DATA_END.unpack(os.pread(current.fileno(), DATA_END.size, DATA_END_OFFSET))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    ids: List[Tuple[int, int]] = []
+    tokens: List[Tuple[bytes, int]] = []
+    try:
+        with open(temporary, 'wb') as output:
+            output.write(bytes(HEADER.size))
+            last_id = 0
+            while True:
+                rows = list(nft_values(NFTMetadata.objects.filter(id__gt=last_id)).order_by('id')[:chunk_size])
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                for nft_id, key, record in render_records(rows):
+                    offset = output.tell()
+                    output.write(record)
+                    ids.append((nft_id, offset))
+                    if key is not None:
+                        tokens.append((key, offset))
+
+            id_index = output.tell()
+            output.write(b''.join(ID_ENTRY.pack(nft_id, offset) for nft_id, offset in ids))
+            token_index = output.tell()
+            tokens.sort()
+            output.write(b''.join(TOKEN_ENTRY.pack(key, offset) for key, offset in tokens))
+            tail_start = output.tell()
+
+            def finish():
+                output.seek(0)
+                output.write(HEADER.pack(MAGIC, id_index, len(ids), token_index, len(tokens), tail_start, data_end))
+                output.flush()
+                os.fsync(output.fileno())
+                os.replace(temporary, path)
+
+            if appended_from is None:
+                data_end = tail_start
+                finish()
+            else:
+                # Carry over records appended while this build ran; appenders wait, then follow the new file
+                with locked(path) as fd:
+                    current_end, = DATA_END.unpack(os.pread(fd, DATA_END.size, DATA_END_OFFSET))
+                    if current_end > appended_from:
+                        output.write(os.pread(fd, current_end - appended_from, appended_from))
+                    data_end = output.tell()
+                    finish()
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    return len(ids)
+
+
+class MetadataStore:
+    """Read side of a store file, mapped once per process"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._inode = None
+        self._checked_at = float('-inf')
+
+    def _open(self):
+        self._map = None
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            self._inode = None
+            return
+        try:
+            stat = os.fstat(fd)
+            self._inode = stat.st_ino
+            if stat.st_size < HEADER.size:
+                logger.warning(f"{self.path} is truncated; serving from the database")
+                return
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+        magic, self.id_index, self.id_count, self.token_index, self.token_count, tail_start, _ = \
+            HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            logger.warning(f"{self.path} is not a metadata store; serving from the database")
+            return
+        self._map = mapped
+        self._scanned = tail_start
+        self._appended_ids: Dict[int, int] = {}
+        self._appended_tokens: Dict[bytes, int] = {}
+
+    def _remap(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            # Records handed out earlier keep the old mapping alive until they are dropped
+            self._map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+    def _refresh(self) -> bool:
+        """Follow rebuilds and appended records; False when there is no usable store"""
+        now = time.monotonic()
+        if now - self._checked_at >= REOPEN_INTERVAL:
+            self._checked_at = now
+            try:
+                inode = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                inode = None
+            if inode != self._inode:
+                self._open()
+        if self._map is None:
+            return False
+
+        data_end, = DATA_END.unpack_from(self._map, DATA_END_OFFSET)
+        if data_end > len(self._map):
+            self._remap()
+        while self._scanned < data_end:
+            offset = self._scanned
+            nft_id, token_id, _, _, contract, metadata_length, detail_length = RECORD.unpack_from(self._map, offset)
+            self._appended_ids[nft_id] = self._newer(self._appended_ids.get(nft_id), offset)
+            if token_id >= 0 and any(contract):
+                key = TOKEN_KEY.pack(contract, token_id)
+                self._appended_tokens[key] = self._newer(self._appended_tokens.get(key), offset)
+            self._scanned = offset + RECORD.size + metadata_length + detail_length
+        return True
+
+    def _rendered_at(self, offset: int) -> int:
+        return RECORD.unpack_from(self._map, offset)[2]
+
+    def _newer(self, first: Optional[int], second: Optional[int]) -> Optional[int]:
+        if first is None or second is None:
+            return second if first is None else first
+        return second if self._rendered_at(second) >= self._rendered_at(first) else first
+
+    def _search(self, entry: struct.Struct, index: int, count: int, key) -> Optional[int]:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            found, offset = entry.unpack_from(self._map, index + middle * entry.size)
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return offset
+        return None
+
+    def _offset_for_id(self, nft_id: int) -> Optional[int]:
+        return self._newer(self._search(ID_ENTRY, self.id_index, self.id_count, nft_id),
+                           self._appended_ids.get(nft_id))
+
+    def _record(self, offset: int) -> StoredNFT:
+        nft_id, token_id, _, updated_at, contract, metadata_length, detail_length = \
+            RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        view = memoryview(self._map)
+        return StoredNFT(
+            nft_id=nft_id,
+            token_id=None if token_id < 0 else token_id,
+            contract_address='0x' + contract.hex() if any(contract) else '',
+            updated_at=EPOCH + datetime.timedelta(microseconds=updated_at),
+            metadata=view[start:start + metadata_length],
+            detail=view[start + metadata_length:start + metadata_length + detail_length],
+        )
+
+    def get(self, nft_id: int) -> Optional[StoredNFT]:
+        """Newest record of an NFT"""
+        with self._lock:
+            if not self._refresh():
+                return None
+            offset = self._offset_for_id(nft_id)
+            return None if offset is None else self._record(offset)
+
+    def get_token(self, contract_address: str, token_id: int) -> Optional[StoredNFT]:
+        """Newest record of the NFT minted as ``token_id`` on ``contract_address``"""
+        key = token_key(contract_address, token_id)
+        if key is None:
+            return None
+        with self._lock:
+            if not self._refresh():
+                return None
+            offset = self._newer(self._search(TOKEN_ENTRY, self.token_index, self.token_count, key),
+                                 self._appended_tokens.get(key))
+            if offset is None:
+                return None
+            # A newer record of the same NFT may no longer carry this token (a reorg unlinked it)
+            current = self._offset_for_id(RECORD.unpack_from(self._map, offset)[0])
+            record = self._record(current)
+            if token_key(record.contract_address, record.token_id) != key:
+                return None
+            return record
+
+
+_store: Optional[MetadataStore] = None
+
+
+def get_metadata_store() -> Optional[MetadataStore]:
+    """Process-wide store reader, or None when METADATA_STORE_PATH is not set"""
+    global _store
+    path = settings.METADATA_STORE_PATH
+    if not path:
+        return None
+    if _store is None or _store.path != path:
+        _store = MetadataStore(path)
+    return _store
+
+
+def refresh_nfts(nft_ids: Iterable[int]):
+    """Append re-rendered records for changed NFTs once the current transaction commits"""
+    path = settings.METADATA_STORE_PATH
+    nft_ids = list(nft_ids)
+    if not path or not nft_ids:
+        return
+
+    def append():
+        try:
+            append_nfts(path, nft_ids)
+        except Exception as e:
+            # The store is a cache; readers fall back to the database
+            logger.warning(f"Failed to append {len(nft_ids)} NFTs to the metadata store: {e}")
+
+    transaction.on_commit(append)
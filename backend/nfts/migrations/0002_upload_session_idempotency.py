@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='request_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='response_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
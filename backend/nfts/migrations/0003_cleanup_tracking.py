@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0002_upload_session_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('state', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='image_object_key',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='metadata_object_key',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['upload_status', 'updated_at'], name='nfts_upload_upload__453664_idx'),
+        ),
+    ]
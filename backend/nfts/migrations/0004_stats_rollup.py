@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0003_cleanup_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NFTStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('all', 'All'), ('collection', 'Collection'), ('owner', 'Owner')], max_length=20)),
+                ('dimension_value', models.CharField(blank=True, max_length=42)),
+                ('nfts_created', models.BigIntegerField(default=0)),
+                ('bytes_stored', models.BigIntegerField(default=0)),
+                ('uploads_completed', models.BigIntegerField(default=0)),
+                ('uploads_failed', models.BigIntegerField(default=0)),
+                ('upload_seconds_total', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='owner_address',
+            field=models.CharField(blank=True, max_length=42),
+        ),
+        migrations.AlterField(
+            model_name='nftmetadata',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['created_at'], name='nfts_upload_created_89d854_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='nftstatsrollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'dimension_value', 'day'), name='unique_stats_rollup'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0004_stats_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='minted_block',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='nftmetadata',
+            name='metadata_ipfs_hash',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='nftmetadata',
+            index=models.Index(fields=['contract_address', 'token_id'], name='nfts_nftmet_contrac_b4df63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nftmetadata',
+            index=models.Index(fields=['contract_address', 'minted_block'], name='nfts_nftmet_contrac_5c8b1f_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0005_event_indexer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenOwnership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42)),
+                ('token_id', models.BigIntegerField()),
+                ('owner_address', models.CharField(max_length=42)),
+                ('block_number', models.BigIntegerField()),
+                ('log_index', models.IntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('nft', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='nfts.nftmetadata')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner_address', 'contract_address', 'token_id'], name='nfts_tokeno_owner_a_17074c_idx'), models.Index(fields=['contract_address', 'block_number'], name='nfts_tokeno_contrac_3eb076_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tokenownership',
+            constraint=models.UniqueConstraint(fields=('contract_address', 'token_id'), name='unique_token_ownership'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0006_token_ownership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftcollection',
+            name='metadata_car_key',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='nftcollection',
+            name='metadata_root_cid',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='nftcollection',
+            name='published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0007_collection_publish'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=16),
+        ),
+    ]
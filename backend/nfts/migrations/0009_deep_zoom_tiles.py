@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0008_perceptual_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='tile_pyramid',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
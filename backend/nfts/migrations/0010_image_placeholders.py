@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0009_deep_zoom_tiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='blurhash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='dominant_colors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
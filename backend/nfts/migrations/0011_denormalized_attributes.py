@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0010_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='attributes_json',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
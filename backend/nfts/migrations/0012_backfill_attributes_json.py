@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# NFTs filled per transaction; each chunk commits on its own so the
+# backfill never holds locks on the whole table
+CHUNK_SIZE = 2000
+
+GIN_INDEX = 'nfts_nftmetadata_attributes_json_gin'
+
+
+def backfill_attributes_json(apps, schema_editor):
+    NFTMetadata = apps.get_model('nfts', 'NFTMetadata')
+    NFTAttribute = apps.get_model('nfts', 'NFTAttribute')
+    db = schema_editor.connection.alias
+
+    last_id = 0
+    while True:
+        nft_ids = list(
+            NFTMetadata.objects.using(db).filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:CHUNK_SIZE]
+        )
+        if not nft_ids:
+            break
+        last_id = nft_ids[-1]
+
+        attributes = {nft_id: [] for nft_id in nft_ids}
+        for nft_id, trait_type, value, display_type in NFTAttribute.objects.using(db).filter(
+            nft_id__gte=nft_ids[0], nft_id__lte=last_id
+        ).order_by('id').values_list('nft_id', 'trait_type', 'value', 'display_type'):
+            attributes[nft_id].append({'trait_type': trait_type, 'value': value, 'display_type': display_type})
+
+        NFTMetadata.objects.using(db).bulk_update(
+            [NFTMetadata(id=nft_id, attributes_json=values) for nft_id, values in attributes.items()],
+            ['attributes_json'], batch_size=500
+        )
+
+
+def create_gin_index(apps, schema_editor):
+    # jsonb_path_ops serves the @> containment used by trait filters;
+    # other databases filter through NFTAttribute instead
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {GIN_INDEX} '
+        f'ON nfts_nftmetadata USING GIN (attributes_json jsonb_path_ops)'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('nfts', '0011_denormalized_attributes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_attributes_json, migrations.RunPython.noop),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
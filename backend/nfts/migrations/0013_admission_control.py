@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0012_backfill_attributes_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AdmissionLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_key', models.CharField(db_index=True, max_length=64)),
+                ('acquired_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0013_admission_control'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='nftmetadata',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
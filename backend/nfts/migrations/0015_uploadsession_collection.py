@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_collection_from_nft(apps, schema_editor):
+    # Sessions that completed already know their collection through the NFT
+    UploadSession = apps.get_model('nfts', 'UploadSession')
+    NFTMetadata = apps.get_model('nfts', 'NFTMetadata')
+    db = schema_editor.connection.alias
+    UploadSession.objects.using(db).filter(nft_metadata__collection__isnull=False).update(
+        collection_id=Subquery(
+            NFTMetadata.objects.using(db).filter(id=OuterRef('nft_metadata_id')).values('collection_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0014_nftmetadata_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='collection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='nfts.nftcollection'),
+        ),
+        migrations.RunPython(copy_collection_from_nft, migrations.RunPython.noop),
+    ]
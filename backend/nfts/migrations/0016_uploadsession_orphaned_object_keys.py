@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0015_uploadsession_collection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='orphaned_object_keys',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
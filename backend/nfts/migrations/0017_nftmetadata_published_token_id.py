@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfts', '0016_uploadsession_orphaned_object_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nftmetadata',
+            name='published_token_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='nftmetadata',
+            index=models.Index(fields=['collection', 'published_token_id'], name='nfts_nftmet_collect_ecbff0_idx'),
+        ),
+    ]
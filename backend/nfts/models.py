@@ -12,6 +12,11 @@ class NFTCollection(models.Model):
     creator = models.CharField(max_length=42)  # Wallet address
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Published metadata directory (base URI ipfs://<metadata_root_cid>/)
+    metadata_root_cid = models.CharField(max_length=100, blank=True)
+    metadata_car_key = models.CharField(max_length=300, blank=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    
     def __str__(self):
         return self.name
 
@@ -25,28 +30,47 @@ class NFTMetadata(models.Model):
     # IPFS URLs
     image_ipfs_hash = models.CharField(max_length=100)
     image_ipfs_url = models.URLField()
-    metadata_ipfs_hash = models.CharField(max_length=100)
+    metadata_ipfs_hash = models.CharField(max_length=100, db_index=True)  # Matched against on-chain tokenURIs
     metadata_ipfs_url = models.URLField()
     
+    # Filebase bucket keys (blank for rows created before keys were recorded)
+    image_object_key = models.CharField(max_length=300, blank=True)
+    metadata_object_key = models.CharField(max_length=300, blank=True)
+    
     # File information
     original_filename = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
     content_type = models.CharField(max_length=100)
+    perceptual_hash = models.CharField(max_length=16, blank=True, db_index=True)  # 64-bit dHash, hex
+    blurhash = models.CharField(max_length=64, blank=True)  # Placeholder, see nfts.placeholders
+    dominant_colors = models.JSONField(default=list, blank=True)  # ['#rrggbb', ...], most common first
+    tile_pyramid = models.JSONField(null=True, blank=True)  # Deep-zoom tiles, see nfts.tiles.new_pyramid
+    attributes_json = models.JSONField(default=list, blank=True)  # Copy of the NFTAttribute rows, see nfts.traits
     
     # Blockchain information
     contract_address = models.CharField(max_length=42, blank=True)
     owner_address = models.CharField(max_length=42)
     minted_at = models.DateTimeField(null=True, blank=True)
     transaction_hash = models.CharField(max_length=66, blank=True)
+    minted_block = models.BigIntegerField(null=True, blank=True)  # Set by the event indexer
     
     # Collection
     collection = models.ForeignKey(NFTCollection, on_delete=models.SET_NULL, null=True, blank=True)
+    # Token id the NFT's file is named in the collection's published directory; links batch mints
+    published_token_id = models.BigIntegerField(null=True, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Polled by the perceptual hash index
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Used by the event indexer to skip already linked tokens and rewind reorgs
+            models.Index(fields=['contract_address', 'token_id']),
+            models.Index(fields=['contract_address', 'minted_block']),
+            # Used by the event indexer to link batch mints to the published directory
+            models.Index(fields=['collection', 'published_token_id']),
+        ]
     
     def __str__(self):
         return f"{self.name} (Token #{self.token_id})"
@@ -77,6 +101,9 @@ class UploadSession(models.Model):
     original_filename = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
     content_type = models.CharField(max_length=100)
+    owner_address = models.CharField(max_length=42, blank=True)
+    # Collection the NFT is created in, so failed uploads count against it too
+    collection = models.ForeignKey(NFTCollection, on_delete=models.SET_NULL, null=True, blank=True)
     upload_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
     
     # Progress tracking
@@ -86,9 +113,112 @@ class UploadSession(models.Model):
     # Results
     nft_metadata = models.ForeignKey(NFTMetadata, on_delete=models.CASCADE, null=True, blank=True)
     error_message = models.TextField(blank=True)
+    response_data = models.JSONField(null=True, blank=True)
+    # Bucket keys uploaded by a job that then failed; cleanup_uploads deletes them
+    orphaned_object_keys = models.JSONField(default=list, blank=True)
+    
+    # Idempotency-Key support (key is released once it expires or the job fails)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    request_fingerprint = models.CharField(max_length=64, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Used by the cleanup_uploads janitor to find stale sessions
+            models.Index(fields=['upload_status', 'updated_at']),
+            # Used by the nft_stats backfill to scan one day at a time
+            models.Index(fields=['created_at']),
+        ]
+    
     def __str__(self):
         return f"Upload {self.session_id} - {self.upload_status}"
+
+
+class TaskCheckpoint(models.Model):
+    """Model for persisting progress of resumable background tasks"""
+    name = models.CharField(max_length=100, unique=True)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.state}"
+
+
+class NFTStatsRollup(models.Model):
+    """Model for pre-aggregated daily statistics, per collection and per owner"""
+    
+    DIMENSION_CHOICES = [
+        ('all', 'All'),
+        ('collection', 'Collection'),
+        ('owner', 'Owner'),
+    ]
+    
+    day = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    dimension_value = models.CharField(max_length=42, blank=True)  # Collection id or wallet address
+    
+    nfts_created = models.BigIntegerField(default=0)
+    bytes_stored = models.BigIntegerField(default=0)
+    uploads_completed = models.BigIntegerField(default=0)
+    uploads_failed = models.BigIntegerField(default=0)
+    upload_seconds_total = models.FloatField(default=0.0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'dimension_value', 'day'], name='unique_stats_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.dimension_value}"
+
+
+class TokenOwnership(models.Model):
+    """Model for the current owner of each on-chain token, maintained from Transfer events"""
+    contract_address = models.CharField(max_length=42)
+    token_id = models.BigIntegerField()
+    owner_address = models.CharField(max_length=42)
+    nft = models.ForeignKey(NFTMetadata, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    # Position of the Transfer that set the current owner
+    block_number = models.BigIntegerField()
+    log_index = models.IntegerField()
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['contract_address', 'token_id'], name='unique_token_ownership'),
+        ]
+        indexes = [
+            # Per-wallet holdings, paginated by (contract_address, token_id)
+            models.Index(fields=['owner_address', 'contract_address', 'token_id']),
+            # Used to rewind reorganised blocks
+            models.Index(fields=['contract_address', 'block_number']),
+        ]
+    
+    def __str__(self):
+        return f"{self.contract_address}#{self.token_id} -> {self.owner_address}"
+
+
+class AdmissionBucket(models.Model):
+    """Model for an upload rate-limit token bucket shared by all workers, see nfts.admission"""
+    key = models.CharField(max_length=64, unique=True)  # 'global', 'wallet:<address>' or 'ip:<address>'
+    tokens = models.FloatField()
+    refilled_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f} tokens"
+
+
+class AdmissionLease(models.Model):
+    """Model for an admitted upload in progress; expired leases (crashed workers) stop counting"""
+    client_key = models.CharField(max_length=64, db_index=True)
+    acquired_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.client_key} until {self.expires_at}"
@@ -0,0 +1,235 @@
+"""
+Perceptual image hashing and near-duplicate search.
+
+Images get a 64-bit difference hash (dHash), which survives re-encoding,
+resizing and small edits. Hashes are stored on NFTMetadata and loaded
+into a multi-index hash table. Each hash is split into ``blocks``
+substrings. By the pigeonhole principle, any hash within Hamming distance r
+of a query matches it in at least one substring within r // blocks bits.
+Only those buckets are probed, so lookups stay sub-linear in the number of
+stored images.
+
+After a full load, the index reads only rows whose updated_at changed, so
+hashes filled in later by backfill_phash are picked up too. Web workers
+load it at startup (PHASH_WARM_INDEX) rather than in their first search.
+"""
+import itertools
+import logging
+import os
+import threading
+from array import array
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.utils import timezone
+from PIL import Image
+
+from .models import NFTMetadata
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+# Changes re-read behind the updated_at high-water mark, to catch transactions
+# that commit after a row with a later timestamp
+RELOAD_OVERLAP = timedelta(seconds=60)
+
+
+class DuplicateImageError(Exception):
+    """Raised when an upload is a near-duplicate of an existing NFT image"""
+
+    def __init__(self, matches: List[Dict[str, Any]]):
+        self.matches = matches
+        super().__init__(f"Image is a near-duplicate of NFT {matches[0]['nft_id']}")
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash of an image as 16 hex digits"""
+    gray = image.convert('L').resize((9, 8), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            offset = row * 9 + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return f"{value:016x}"
+
+
+def image_hash(image_data: bytes) -> str:
+    """dHash of encoded image bytes"""
+    with Image.open(BytesIO(image_data)) as image:
+        return dhash(image)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class MultiIndexHashIndex:
+    """In-memory multi-index hashing over 64-bit hashes"""
+
+    def __init__(self, blocks: int = 4):
+        self.blocks = blocks
+        self.block_bits = HASH_BITS // blocks
+        self.block_mask = (1 << self.block_bits) - 1
+        # One table per substring position: substring value -> item ids
+        self.tables: List[Dict[int, array]] = [{} for _ in range(blocks)]
+        self.hashes: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _substrings(self, value: int) -> List[int]:
+        return [(value >> (position * self.block_bits)) & self.block_mask for position in range(self.blocks)]
+
+    def add(self, item_id: int, value: int):
+        with self._lock:
+            if item_id in self.hashes:
+                if self.hashes[item_id] == value:
+                    return
+                self.remove(item_id)
+            self.hashes[item_id] = value
+            for table, substring in zip(self.tables, self._substrings(value)):
+                table.setdefault(substring, array('q')).append(item_id)
+
+    def remove(self, item_id: int):
+        with self._lock:
+            value = self.hashes.pop(item_id, None)
+            if value is None:
+                return
+            for table, substring in zip(self.tables, self._substrings(value)):
+                bucket = table.get(substring)
+                if bucket is not None:
+                    table[substring] = array('q', (other for other in bucket if other != item_id))
+
+    def _neighbours(self, substring: int, radius: int):
+        """All substring values within ``radius`` bits of ``substring``"""
+        yield substring
+        for distance in range(1, radius + 1):
+            for positions in itertools.combinations(range(self.block_bits), distance):
+                flipped = substring
+                for position in positions:
+                    flipped ^= 1 << position
+                yield flipped
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(item id, distance) for every stored hash within ``max_distance``, nearest first"""
+        radius = max_distance // self.blocks
+        found: Dict[int, int] = {}
+        with self._lock:
+            for table, substring in zip(self.tables, self._substrings(value)):
+                for probe in self._neighbours(substring, radius):
+                    for item_id in table.get(probe, ()):
+                        if item_id not in found:
+                            found[item_id] = hamming(value, self.hashes[item_id])
+        matches = [(item_id, distance) for item_id, distance in found.items() if distance <= max_distance]
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+
+class PerceptualHashIndex:
+    """Near-duplicate index over NFTMetadata.perceptual_hash, loaded incrementally"""
+
+    def __init__(self, blocks: int = 4):
+        self.index = MultiIndexHashIndex(blocks)
+        self.loaded_until: Optional[datetime] = None
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """Load every hash on the first call, then the hashes of NFTs changed since the last refresh"""
+        with self._refresh_lock:
+            full = self.loaded_until is None
+            rows = NFTMetadata.objects.order_by('updated_at', 'id')
+            if full:
+                rows = rows.exclude(perceptual_hash='')
+            else:
+                rows = rows.filter(updated_at__gte=self.loaded_until - RELOAD_OVERLAP)
+            loaded = 0
+            for nft_id, hash_hex, updated_at in rows.values_list('id', 'perceptual_hash', 'updated_at').iterator(
+                chunk_size=10000
+            ):
+                if hash_hex:
+                    self.index.add(nft_id, int(hash_hex, 16))
+                else:
+                    self.index.remove(nft_id)
+                self.loaded_until = max(self.loaded_until or updated_at, updated_at)
+                loaded += 1
+            if self.loaded_until is None:
+                # Nothing hashed yet; later refreshes still only read recent changes
+                self.loaded_until = timezone.now()
+            if full:
+                logger.info(f"Loaded {loaded} perceptual hashes ({len(self.index)} indexed)")
+
+    def warm(self):
+        """Load the index in a background thread so the first search does not load it all"""
+        def load():
+            try:
+                self.refresh()
+            except Exception as e:
+                # The first search loads it instead
+                logger.warning(f"Failed to warm the perceptual hash index: {e}")
+            finally:
+                connection.close()
+
+        threading.Thread(target=load, name='phash-warm', daemon=True).start()
+
+    def find_similar(self, hash_hex: str, max_distance: int, limit: int = 20,
+                     exclude_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Existing NFTs whose image is within ``max_distance`` bits of ``hash_hex``"""
+        self.refresh()
+        matches = [
+            (nft_id, distance) for nft_id, distance in self.index.search(int(hash_hex, 16), max_distance)
+            if nft_id != exclude_id
+        ][:limit]
+        if not matches:
+            return []
+
+        rows = {
+            row['id']: row for row in NFTMetadata.objects.filter(id__in=[nft_id for nft_id, _ in matches]).values(
+                'id', 'name', 'image_ipfs_url', 'owner_address', 'token_id', 'perceptual_hash'
+            )
+        }
+        missing = {nft_id for nft_id, _ in matches} - rows.keys()
+        if missing:
+            # Deleted since it was indexed, unless a read replica has not caught up yet
+            existing = NFTMetadata.objects.using(DEFAULT_DB_ALIAS).filter(id__in=missing).values_list('id', flat=True)
+            for nft_id in missing - set(existing):
+                self.index.remove(nft_id)
+
+        results = []
+        for nft_id, distance in matches:
+            row = rows.get(nft_id)
+            if row is None:
+                continue
+            results.append({
+                'nft_id': nft_id,
+                'name': row['name'],
+                'distance': distance,
+                'perceptual_hash': row['perceptual_hash'],
+                'image_ipfs_url': row['image_ipfs_url'],
+                'owner_address': row['owner_address'],
+                'token_id': row['token_id'],
+            })
+        return results
+
+
+_index = None
+
+
+def get_phash_index() -> PerceptualHashIndex:
+    """Process-wide perceptual hash index"""
+    global _index
+    if _index is None:
+        _index = PerceptualHashIndex()
+    return _index
+
+
+def _discard_after_fork():
+    # A forked worker inherits neither the warming thread nor a usable refresh lock
+    global _index
+    _index = None
+
+
+os.register_at_fork(after_in_child=_discard_after_fork)
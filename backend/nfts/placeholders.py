@@ -0,0 +1,129 @@
+"""
+Image placeholders for gallery pages.
+
+While an NFT's IPFS image loads, clients can paint its BlurHash
+(https://blurha.sh, a ~30 character string decoding to a blurred preview)
+or a solid dominant color. Both are computed from a tiny copy of the
+processed image with NumPy, so they add a few milliseconds per upload.
+"""
+from io import BytesIO
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Horizontal x vertical BlurHash components (4x3 -> 28 characters)
+BLURHASH_COMPONENTS = (4, 3)
+
+# Longest side of the copy placeholders are computed from
+SAMPLE_SIZE = 32
+
+# Dominant colors kept, most common first
+PALETTE_SIZE = 5
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def sample(image: Image.Image) -> np.ndarray:
+    """The image as a small RGB float array (h, w, 3); transparency is flattened onto white"""
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+    if image.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    scale = SAMPLE_SIZE / max(image.size)
+    if scale < 1:
+        size = (max(round(image.width * scale), 1), max(round(image.height * scale), 1))
+        # reduce() first keeps the box filter cheap on large inputs
+        factor = min(image.width // size[0], image.height // size[1])
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.resize(size, Image.Resampling.BOX)
+    return np.asarray(image, dtype=np.float64)
+
+
+def srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    values = values / 255
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def base83(value: int, length: int) -> str:
+    return ''.join(BASE83[value // 83 ** (length - 1 - position) % 83] for position in range(length))
+
+
+def blurhash(pixels: np.ndarray, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """BlurHash of an RGB array from ``sample``"""
+    components_x, components_y = components
+    height, width = pixels.shape[:2]
+    linear = srgb_to_linear(pixels)
+
+    # factors[j, i] = mean of linear * cos(pi i x / w) * cos(pi j y / h), all components at once
+    basis_x = np.cos(np.pi * np.outer(np.arange(components_x), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(components_y), np.arange(height)) / height)
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+    dc, ac = factors[0], factors[1:]
+
+    result = base83((components_x - 1) + (components_y - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1
+    result += base83(quantised_max, 1)
+    result += base83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+
+    # Signed square root, quantised to 19 levels per channel
+    scaled = np.sign(ac) * np.abs(ac / maximum) ** 0.5
+    quantised = np.clip(np.floor(scaled * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quantised.tolist():
+        result += base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def dominant_colors(pixels: np.ndarray, count: int = PALETTE_SIZE) -> List[str]:
+    """Most common colors as ``#rrggbb``, from 4-bit-per-channel bins merged when they look alike"""
+    flat = pixels.reshape(-1, 3)
+    quantised = flat.astype(np.int64) >> 4
+    bins = (quantised[:, 0] << 8) | (quantised[:, 1] << 4) | quantised[:, 2]
+    counts = np.bincount(bins, minlength=4096)
+    sums = np.stack([np.bincount(bins, weights=flat[:, channel], minlength=4096) for channel in range(3)], axis=1)
+
+    occupied = np.flatnonzero(counts)
+    means = sums[occupied] / counts[occupied, None]
+    chosen: List[np.ndarray] = []
+    for index in np.argsort(-counts[occupied], kind='stable'):
+        color = means[index]
+        # Neighbouring bins often split one visible color
+        if any(np.abs(color - other).max() < 32 for other in chosen):
+            continue
+        chosen.append(color)
+        if len(chosen) == count:
+            break
+    return ['#%02x%02x%02x' % tuple(int(round(channel)) for channel in color) for color in chosen]
+
+
+def compute(image: Image.Image) -> Tuple[str, List[str]]:
+    """BlurHash and dominant colors of a decoded image"""
+    pixels = sample(image)
+    return blurhash(pixels), dominant_colors(pixels)
+
+
+def compute_from_bytes(data: bytes) -> Tuple[str, List[str]]:
+    """Placeholders of a stored image; JPEGs are decoded at a reduced scale"""
+    with Image.open(BytesIO(data)) as image:
+        image.draft('RGB', (SAMPLE_SIZE * 8, SAMPLE_SIZE * 8))
+        return compute(image)
@@ -0,0 +1,184 @@
+"""
+Opt-in request profiling for slow NFT mints.
+
+Sampled requests (and, when a latency threshold is configured, every slow
+request) are profiled with cProfile while their SQL queries are recorded.
+Captured profiles are kept in a bounded ring buffer on disk.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_RE = re.compile(r'^\d{20}-[0-9a-f]{8}$')
+
+
+class QueryRecorder:
+    """Database execute wrapper that records SQL statements and their timings"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queries: List[Dict[str, Any]] = []
+        self.dropped = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'many': many,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                })
+            else:
+                self.dropped += 1
+
+
+class ProfileStore:
+    """Bounded ring buffer of captured profiles on disk"""
+
+    def __init__(self, directory, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def save(self, profiler: cProfile.Profile, info: Dict[str, Any]) -> str:
+        """Persist a profile and its metadata, evicting the oldest entries"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(str(self.directory / f"{profile_id}.prof"))
+
+        # The JSON sidecar is written last so listings only see complete entries
+        info = {'id': profile_id, **info}
+        tmp_path = self.directory / f".{profile_id}.json.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(info, fh)
+        os.replace(tmp_path, self.directory / f"{profile_id}.json")
+
+        self._evict()
+        return profile_id
+
+    def _evict(self):
+        """Drop the oldest profiles beyond the configured capacity"""
+        entries = sorted(self.directory.glob('*.json'))
+        for stale in entries[:max(len(entries) - self.max_profiles, 0)]:
+            # Another worker may be evicting the same entry concurrently
+            stale.unlink(missing_ok=True)
+            stale.with_suffix('.prof').unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return metadata for captured profiles, newest first, without SQL logs"""
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob('*.json'), reverse=True):
+            info = self._read(path)
+            if info is not None:
+                info.pop('queries', None)
+                profiles.append(info)
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Return full metadata (including SQL log) for a profile"""
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        return self._read(self.directory / f"{profile_id}.json")
+
+    def profile_path(self, profile_id: str) -> Optional[Path]:
+        """Return the path of the pstats dump for a profile, if it still exists"""
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.prof"
+        return path if path.exists() else None
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the profile store configured in settings"""
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests, plus every request over the latency threshold"""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_threshold = settings.PROFILING_SLOW_THRESHOLD_MS / 1000
+        self.path_prefixes = tuple(settings.PROFILING_PATHS)
+        self.store = get_profile_store()
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefixes):
+            return self.get_response(request)
+
+        # Slow requests can only be recognised afterwards, so a latency
+        # threshold means every matching request runs under the profiler.
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_threshold:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder(settings.PROFILING_MAX_QUERIES)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                return self.get_response(request)
+
+            start = time.perf_counter()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - start
+
+        slow = bool(self.slow_threshold) and duration >= self.slow_threshold
+        if sampled or slow:
+            try:
+                profile_id = self.store.save(profiler, {
+                    'method': request.method,
+                    'path': request.path,
+                    'status_code': response.status_code,
+                    'duration_ms': round(duration * 1000, 3),
+                    'captured_at': time.time(),
+                    'reason': 'slow' if slow else 'sampled',
+                    'query_count': len(recorder.queries) + recorder.dropped,
+                    'query_time_ms': round(sum(q['duration_ms'] for q in recorder.queries), 3),
+                    'queries_dropped': recorder.dropped,
+                    'queries': recorder.queries,
+                })
+                logger.info(f"Captured profile {profile_id} for {request.path} ({duration:.2f}s)")
+            except OSError as e:
+                logger.warning(f"Failed to store request profile: {e}")
+
+        return response
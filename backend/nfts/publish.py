@@ -0,0 +1,121 @@
+"""
+Collection publishing.
+
+Builds every token's metadata JSON for an NFTCollection into one IPFS
+directory (file name = token id), packs it as a CAR while streaming rows
+from the database, and uploads it in a single request. The resulting root
+CID is the batch base URI passed to ownerBatchMint: ipfs://<root>/ makes
+tokenURI(id) resolve to the token's metadata. The token id each NFT was
+published as is recorded, and the event indexer links batch mints by it.
+"""
+import json
+import logging
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .car import CarDirectoryWriter, cid_to_str
+from . import traits
+from .models import NFTCollection, NFTMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class AlreadyPublishedError(ValueError):
+    """Re-publishing would replace a base URI that minted tokens still resolve through"""
+
+
+def collection_entries(collection: NFTCollection, start_token_id: Optional[int],
+                       assigned: Optional[Dict[int, int]] = None) -> Iterable[Tuple[str, bytes]]:
+    """(file name, metadata JSON) for each NFT in the collection
+
+    Minted NFTs keep their token id; unminted ones are numbered from
+    ``start_token_id`` in upload order, matching the batch-prepare endpoint.
+    The token id of every NFT is recorded in ``assigned`` (NFT id -> token id).
+    """
+    from .services import filebase_service
+
+    next_token_id = start_token_id
+    nfts = collection.nftmetadata_set.order_by('id')
+    for nft in nfts.iterator(chunk_size=500):
+        if nft.token_id is not None:
+            token_id = nft.token_id
+        elif next_token_id is None:
+            raise ValueError("start_token_id is required to publish unminted NFTs")
+        else:
+            token_id = next_token_id
+            next_token_id += 1
+        if assigned is not None:
+            assigned[nft.id] = token_id
+
+        metadata = filebase_service.create_nft_metadata(
+            name=nft.name,
+            description=nft.description,
+            image_ipfs_url=nft.image_ipfs_url,
+            attributes=traits.token_attributes(nft.attributes_json)
+        )
+        # Same serialization as FilebaseService.upload_metadata
+        yield str(token_id), json.dumps(metadata, indent=2).encode('utf-8')
+
+
+def has_minted_tokens(collection: NFTCollection) -> bool:
+    """Whether tokens were minted after the collection was published"""
+    return bool(collection.metadata_root_cid) and collection.nftmetadata_set.filter(token_id__isnull=False).exists()
+
+
+def publish_collection(collection: NFTCollection, start_token_id: Optional[int] = None,
+                       dry_run: bool = False, force: bool = False) -> Dict[str, Any]:
+    """Upload the collection's metadata directory as one CAR and record its root CID
+
+    A published collection with minted tokens is only published again with
+    ``force``: the new root replaces metadata_car_key, and cleanup_uploads
+    then deletes the CAR those tokens' URIs point into.
+    """
+    from .services import filebase_service
+
+    if not dry_run and not force and has_minted_tokens(collection):
+        raise AlreadyPublishedError(
+            f"Collection {collection.id} has minted tokens under ipfs://{collection.metadata_root_cid}/; "
+            f"publishing again needs force"
+        )
+
+    assigned: Dict[int, int] = {}
+    unminted = collection.nftmetadata_set.filter(token_id__isnull=True).count()
+    with tempfile.TemporaryFile() as car_file:
+        writer = CarDirectoryWriter(car_file)
+        for name, content in collection_entries(collection, start_token_id, assigned):
+            writer.add_file(name, content)
+        if not writer.links:
+            raise ValueError("Collection has no NFTs to publish")
+        root_cid = cid_to_str(writer.finish())
+        car_size = car_file.tell()
+
+        result = {
+            'collection_id': collection.id,
+            'metadata_root_cid': root_cid,
+            'base_uri': f"ipfs://{root_cid}/",
+            'start_token_id': start_token_id,
+            'quantity': unminted,
+            'files': len(writer.links),
+            'car_size': car_size,
+        }
+        if dry_run:
+            return result
+
+        car_file.seek(0)
+        key = f"collections/{collection.id}/metadata-{root_cid}.car"
+        filebase_service.upload_car(car_file, key, root_cid)
+
+    with transaction.atomic():
+        collection.metadata_root_cid = root_cid
+        collection.metadata_car_key = key
+        collection.published_at = timezone.now()
+        collection.save(update_fields=['metadata_root_cid', 'metadata_car_key', 'published_at'])
+        NFTMetadata.objects.bulk_update(
+            [NFTMetadata(id=nft_id, published_token_id=token_id) for nft_id, token_id in assigned.items()],
+            ['published_token_id'], batch_size=500
+        )
+    logger.info(f"Published collection {collection.id}: {result['files']} files, root {root_cid}")
+    return result
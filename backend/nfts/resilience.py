@@ -0,0 +1,215 @@
+"""
+Resilience layer for calls to Filebase's S3-compatible API.
+
+Wraps the boto3 client with classified retries (exponential backoff with
+jitter), a circuit breaker that fails fast while Filebase is unavailable,
+and optional hedged head_object requests to cut tail latency.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+logger = logging.getLogger(__name__)
+
+# S3 error codes that indicate a transient, service-side problem
+RETRYABLE_ERROR_CODES = {
+    'InternalError',
+    'RequestTimeout',
+    'RequestTimeoutException',
+    'ServiceUnavailable',
+    'SlowDown',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequests',
+    'RequestLimitExceeded',
+}
+
+TRANSIENT_EXCEPTIONS = (
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+
+class FilebaseUnavailableError(Exception):
+    """Raised without contacting Filebase while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Filebase is unavailable, retry after {retry_after:.0f}s")
+
+
+def is_retryable(error: Exception) -> bool:
+    """Classify an exception raised by the S3 client as transient or not"""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in RETRYABLE_ERROR_CODES or status_code == 429 or status_code >= 500
+    return isinstance(error, TRANSIENT_EXCEPTIONS)
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.25, max_delay: float = 4.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker counting consecutive calls that failed after their retries"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Raise FilebaseUnavailableError if the call should not be attempted"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if self._state == self.OPEN and remaining > 0:
+                raise FilebaseUnavailableError(remaining)
+
+            # Reset timeout elapsed: let exactly one probe call through
+            if self._probe_in_flight:
+                raise FilebaseUnavailableError(max(remaining, 1.0))
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+
+    def probing(self) -> bool:
+        """Whether the half-open probe is in flight"""
+        with self._lock:
+            return self._state == self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Filebase circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error(f"Filebase circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current breaker state for health reporting"""
+        with self._lock:
+            retry_after = 0.0
+            if self._state == self.OPEN:
+                retry_after = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'retry_after': round(retry_after, 1),
+            }
+
+
+class ResilientS3Client:
+    """Proxy around a boto3 S3 client that applies retries and the circuit breaker"""
+
+    # Attributes that are not API calls and are returned unwrapped
+    PASSTHROUGH = {'meta', 'exceptions', 'get_paginator', 'get_waiter', 'generate_presigned_url', 'can_paginate'}
+
+    def __init__(self, client, retry_policy: RetryPolicy, circuit_breaker: CircuitBreaker,
+                 hedge_delay: float = 0.0):
+        self.client = client
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.hedge_delay = hedge_delay
+        self._hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='filebase-hedge') if hedge_delay else None
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name in self.PASSTHROUGH or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.call(attr, *args, **kwargs)
+
+        return call
+
+    def call(self, operation, *args, **kwargs):
+        """Invoke a client operation with classified retries"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.circuit_breaker.before_call()
+            try:
+                result = operation(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Filebase answered (e.g. 404); the service itself is healthy
+                    self.circuit_breaker.record_success()
+                    raise
+                # One failure per call, once its retries are spent; a failed probe is not retried
+                if attempt >= self.retry_policy.max_attempts or self.circuit_breaker.probing():
+                    self.circuit_breaker.record_failure()
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                logger.warning(
+                    f"Transient Filebase error on {getattr(operation, '__name__', 'call')} "
+                    f"(attempt {attempt}/{self.retry_policy.max_attempts}), retrying in {delay:.2f}s: {e}"
+                )
+                time.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            return result
+
+    def head_object(self, **kwargs):
+        """head_object, hedged with a second request if the first is slow"""
+        if not self._hedge_executor:
+            return self.call(self.client.head_object, **kwargs)
+
+        primary = self._hedge_executor.submit(self.call, self.client.head_object, **kwargs)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        hedge = self._hedge_executor.submit(self.call, self.client.head_object, **kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+
+        # Both requests failed; surface the primary's error
+        return primary.result()
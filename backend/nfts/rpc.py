@@ -0,0 +1,320 @@
+"""
+Ethereum JSON-RPC client.
+
+Talks to the node configured by ETH_RPC_URL (a local Hardhat node by
+default) over a pooled HTTP connection. Several calls can be sent as one
+JSON-RPC batch, and contract view calls are cached per block height.
+"""
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import urllib3
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RPCError(Exception):
+    """Raised when the node is unreachable or returns a JSON-RPC error"""
+
+
+def to_hex(value: int) -> str:
+    return hex(value)
+
+
+def from_hex(value: Optional[str]) -> int:
+    return int(value, 16) if value else 0
+
+
+class JSONRPCClient:
+    """Minimal JSON-RPC 2.0 client over a pooled urllib3 connection"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self._ids = itertools.count(1)
+        self._http = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=8,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,
+            headers={'Content-Type': 'application/json'},
+        )
+
+    def _post(self, payload):
+        try:
+            response = self._http.request('POST', self.url, body=json.dumps(payload).encode())
+        except urllib3.exceptions.HTTPError as e:
+            raise RPCError(f"RPC request to {self.url} failed: {e}")
+        if response.status != 200:
+            raise RPCError(f"RPC request to {self.url} returned HTTP {response.status}")
+        try:
+            return json.loads(response.data)
+        except ValueError:
+            raise RPCError(f"RPC response from {self.url} is not valid JSON")
+
+    def call(self, method: str, params: Optional[List[Any]] = None) -> Any:
+        """Make a single JSON-RPC call and return its result"""
+        reply = self._post({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params or []})
+        if 'error' in reply:
+            raise RPCError(f"{method} failed: {reply['error'].get('message', reply['error'])}")
+        return reply.get('result')
+
+    def batch(self, calls: Sequence[Tuple[str, List[Any]]], raise_errors: bool = True) -> List[Any]:
+        """Send several calls in one JSON-RPC batch request, returning results in order
+
+        With ``raise_errors=False`` a failed call yields an RPCError in its slot
+        instead of failing the whole batch.
+        """
+        if not calls:
+            return []
+        ids = [next(self._ids) for _ in calls]
+        replies = self._post([
+            {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': params}
+            for call_id, (method, params) in zip(ids, calls)
+        ])
+        if not isinstance(replies, list):
+            # Nodes without batch support answer with a single error object
+            raise RPCError(f"Batch request failed: {replies.get('error', replies)}")
+
+        by_id = {reply.get('id'): reply for reply in replies}
+        results = []
+        for call_id, (method, _) in zip(ids, calls):
+            reply = by_id.get(call_id)
+            if reply is None or 'error' in reply:
+                message = reply['error'].get('message', reply['error']) if reply else 'no response'
+                error = RPCError(f"{method} failed: {message}")
+                if raise_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(reply.get('result'))
+        return results
+
+    def block_number(self) -> int:
+        return from_hex(self.call('eth_blockNumber'))
+
+    def get_block(self, number: int) -> Optional[dict]:
+        return self.call('eth_getBlockByNumber', [to_hex(number), False])
+
+    def get_blocks(self, numbers: Sequence[int]) -> List[Optional[dict]]:
+        return self.batch([('eth_getBlockByNumber', [to_hex(number), False]) for number in numbers])
+
+    def get_logs(self, address: str, from_block: int, to_block: int, topics: List[Any]) -> List[dict]:
+        return self.call('eth_getLogs', [{
+            'address': address,
+            'fromBlock': to_hex(from_block),
+            'toBlock': to_hex(to_block),
+            'topics': topics,
+        }])
+
+
+class BlockCache:
+    """Thread-safe TTL cache for results that are immutable at a given block height"""
+
+    def __init__(self, ttl: float = 60.0, head_ttl: float = 2.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.head_ttl = head_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, Tuple[float, Any]]' = OrderedDict()
+        self._head: Optional[Tuple[float, int]] = None
+
+    def head(self, fetch: Callable[[], int]) -> int:
+        """Latest block number, refetched at most every ``head_ttl`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._head and self._head[0] > now:
+                return self._head[1]
+        number = fetch()
+        with self._lock:
+            self._head = (now + self.head_ttl, number)
+        return number
+
+    def get(self, key: tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            return True, entry[1]
+
+    def set(self, key: tuple, value: Any):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                # Entries are kept in insertion order, so expired ones are at the front
+                while self._entries and (
+                    next(iter(self._entries.values()))[0] <= now or len(self._entries) > self.max_entries
+                ):
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._head = None
+
+
+# name -> (selector, argument types, return type) for NFTMinting's view functions
+CONTRACT_FUNCTIONS = {
+    'totalSupply': ('0x18160ddd', (), 'uint256'),
+    'remainingSupply': ('0xda0239a6', (), 'uint256'),
+    'MAX_SUPPLY': ('0x32cb6b0c', (), 'uint256'),
+    'mintPrice': ('0x6817c76c', (), 'uint256'),
+    'paused': ('0x5c975abb', (), 'bool'),
+    'canMint': ('0x0d5e34a4', ('address', 'uint256'), 'bool'),
+    'calculateCost': ('0x4af18f4f', ('uint256',), 'uint256'),
+    'tokenURI': ('0xc87b56dd', ('uint256',), 'string'),
+}
+
+
+def encode_call(name: str, *args) -> str:
+    selector, arg_types, _ = CONTRACT_FUNCTIONS[name]
+    if len(args) != len(arg_types):
+        raise ValueError(f"{name} takes {len(arg_types)} arguments")
+    words = []
+    for arg_type, value in zip(arg_types, args):
+        if arg_type == 'address':
+            words.append(value.lower().replace('0x', '').rjust(64, '0'))
+        else:
+            words.append(int(value).to_bytes(32, 'big').hex())
+    return selector + ''.join(words)
+
+
+def decode_result(name: str, data: str) -> Any:
+    return_type = CONTRACT_FUNCTIONS[name][2]
+    raw = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    if return_type == 'string':
+        offset = int.from_bytes(raw[0:32], 'big')
+        length = int.from_bytes(raw[offset:offset + 32], 'big')
+        return raw[offset + 32:offset + 32 + length].decode('utf-8', errors='replace')
+    value = int.from_bytes(raw[0:32], 'big')
+    return bool(value) if return_type == 'bool' else value
+
+
+class ContractReader:
+    """Reads NFTMinting view functions in batches, cached per block height"""
+
+    def __init__(self, rpc: JSONRPCClient, address: str, cache: BlockCache):
+        if not address:
+            raise ValueError("NFT contract address not configured")
+        self.rpc = rpc
+        self.address = address.lower()
+        self.cache = cache
+
+    def latest_block(self) -> int:
+        return self.cache.head(self.rpc.block_number)
+
+    def read(self, calls: Sequence[Tuple[Any, ...]], block: Optional[int] = None) -> Dict[str, Any]:
+        """Evaluate ``(name, *args)`` calls at one block; reverted calls yield RPCError values
+
+        Returns ``{'block_number': n, 'results': [...]}`` with results in call order.
+        """
+        block = self.latest_block() if block is None else block
+        results: List[Any] = [None] * len(calls)
+        missing = []
+        for index, (name, *args) in enumerate(calls):
+            key = (block, self.address, encode_call(name, *args))
+            hit, value = self.cache.get(key)
+            if hit:
+                results[index] = value
+            else:
+                missing.append((index, name, key))
+
+        if missing:
+            replies = self.rpc.batch([
+                ('eth_call', [{'to': self.address, 'data': key[2]}, to_hex(block)])
+                for _, _, key in missing
+            ], raise_errors=False)
+            for (index, name, key), reply in zip(missing, replies):
+                if isinstance(reply, RPCError):
+                    # Reverts are not cached; they may depend on a transient node error
+                    results[index] = reply
+                    continue
+                value = decode_result(name, reply)
+                self.cache.set(key, value)
+                results[index] = value
+
+        return {'block_number': block, 'results': results}
+
+    def status(self, minter: Optional[str] = None, quantity: int = 1) -> Dict[str, Any]:
+        """Supply, price and pause state, plus mint eligibility for ``minter``"""
+        calls = [
+            ('totalSupply',), ('remainingSupply',), ('MAX_SUPPLY',),
+            ('mintPrice',), ('paused',), ('calculateCost', quantity),
+        ]
+        if minter:
+            calls.append(('canMint', minter, quantity))
+        read = self.read(calls)
+        values = [None if isinstance(value, RPCError) else value for value in read['results']]
+        status = {
+            'block_number': read['block_number'],
+            'contract_address': self.address,
+            'total_supply': values[0],
+            'remaining_supply': values[1],
+            'max_supply': values[2],
+            'mint_price': values[3],
+            'paused': values[4],
+            'quantity': quantity,
+            'cost': values[5],
+        }
+        if minter:
+            status['can_mint'] = values[6]
+        return status
+
+    def token_uris(self, token_ids: Sequence[int]) -> Dict[int, Optional[str]]:
+        """tokenURI for each token id; None for tokens that do not exist"""
+        read = self.read([('tokenURI', token_id) for token_id in token_ids])
+        return {
+            token_id: None if isinstance(value, RPCError) else value
+            for token_id, value in zip(token_ids, read['results'])
+        }
+
+
+_client = None
+_reader = None
+
+
+def get_rpc_client() -> JSONRPCClient:
+    """Process-wide client for ETH_RPC_URL"""
+    global _client
+    if _client is None:
+        _client = JSONRPCClient(settings.ETH_RPC_URL, timeout=settings.ETH_RPC_TIMEOUT)
+    return _client
+
+
+def get_contract_reader() -> ContractReader:
+    """Process-wide cached reader for NFT_CONTRACT_ADDRESS"""
+    global _reader
+    if _reader is None:
+        _reader = ContractReader(
+            get_rpc_client(),
+            settings.NFT_CONTRACT_ADDRESS,
+            BlockCache(
+                ttl=settings.ETH_RPC_CACHE_TTL,
+                head_ttl=settings.ETH_RPC_HEAD_TTL,
+                max_entries=settings.ETH_RPC_CACHE_MAX_ENTRIES,
+            ),
+        )
+    return _reader
+
+
+def predict_next_token_id() -> Optional[int]:
+    """Token id the next mint will get, or None if the contract cannot be read
+
+    Mints assign ids from totalSupply; the prediction holds unless another mint lands first.
+    """
+    try:
+        total_supply = get_contract_reader().read([('totalSupply',)])['results'][0]
+    except (ValueError, RPCError) as e:
+        logger.warning(f"Could not predict the next token id: {e}")
+        return None
+    return None if isinstance(total_supply, RPCError) else total_supply
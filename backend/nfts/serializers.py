@@ -1,5 +1,27 @@
 from rest_framework import serializers
+from .imaging import ImageRejected, probe_image
 from .models import NFTMetadata, NFTAttribute, NFTCollection, UploadSession
+from . import traits
+
+
+class ProbedImageField(serializers.FileField):
+    """Image upload validated from its header only
+    
+    The probe (with the opened, undecoded image) is attached to the file as
+    ``image_probe`` so processing decodes the upload exactly once.
+    """
+    
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            probe = probe_image(file)
+        except ImageRejected as e:
+            raise serializers.ValidationError(str(e))
+        
+        # Like Django's ImageField, trust the detected format over the declared type
+        file.image_probe = probe
+        file.content_type = probe.content_type
+        return file
 
 
 class NFTAttributeSerializer(serializers.ModelSerializer):
@@ -10,9 +32,16 @@ class NFTAttributeSerializer(serializers.ModelSerializer):
         fields = ['trait_type', 'value', 'display_type']
 
 
+class DenormalizedAttributesField(serializers.ReadOnlyField):
+    """NFTMetadata.attributes_json, shaped like NFTAttributeSerializer output"""
+    
+    def to_representation(self, value):
+        return traits.ordered(value)
+
+
 class NFTMetadataSerializer(serializers.ModelSerializer):
     """Serializer for NFT metadata"""
-    attributes = NFTAttributeSerializer(many=True, read_only=True)
+    attributes = DenormalizedAttributesField(source='attributes_json')
     
     class Meta:
         model = NFTMetadata
@@ -20,7 +49,8 @@ class NFTMetadataSerializer(serializers.ModelSerializer):
             'id', 'token_id', 'name', 'description',
             'image_ipfs_hash', 'image_ipfs_url',
             'metadata_ipfs_hash', 'metadata_ipfs_url',
-            'original_filename', 'file_size', 'content_type',
+            'original_filename', 'file_size', 'content_type', 'perceptual_hash',
+            'blurhash', 'dominant_colors', 'tile_pyramid',
             'contract_address', 'owner_address', 'minted_at',
             'transaction_hash', 'collection', 'attributes',
             'created_at', 'updated_at'
@@ -32,7 +62,10 @@ class NFTCollectionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = NFTCollection
-        fields = ['id', 'name', 'description', 'symbol', 'contract_address', 'creator', 'created_at']
+        fields = [
+            'id', 'name', 'description', 'symbol', 'contract_address', 'creator', 'created_at',
+            'metadata_root_cid', 'published_at'
+        ]
 
 
 class UploadSessionSerializer(serializers.ModelSerializer):
@@ -49,17 +82,26 @@ class UploadSessionSerializer(serializers.ModelSerializer):
 
 class ImageUploadSerializer(serializers.Serializer):
     """Serializer for image upload validation"""
-    image = serializers.ImageField()
+    image = ProbedImageField()  # Size, type and dimensions are checked from the header
+
+
+class ChunkedUploadInitSerializer(serializers.Serializer):
+    """Serializer for starting a resumable chunked upload"""
+    filename = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100)
     
-    def validate_image(self, value):
-        """Validate image file"""
-        # Check file size (max 10MB)
-        if value.size > 10 * 1024 * 1024:
+    def validate_file_size(self, value):
+        """Validate declared file size (max 10MB)"""
+        if value > 10 * 1024 * 1024:
             raise serializers.ValidationError("Image file too large. Maximum size is 10MB.")
         
-        # Check content type
+        return value
+    
+    def validate_content_type(self, value):
+        """Validate declared content type"""
         allowed_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
-        if value.content_type not in allowed_types:
+        if value not in allowed_types:
             raise serializers.ValidationError("Invalid image type. Allowed: JPEG, PNG, GIF, WebP")
         
         return value
@@ -96,7 +138,7 @@ class CreateNFTSerializer(serializers.Serializer):
     """Serializer for complete NFT creation"""
     name = serializers.CharField(max_length=200)
     description = serializers.CharField()
-    image = serializers.ImageField()
+    image = ProbedImageField()
     attributes = serializers.ListField(
         child=serializers.DictField(),
         required=False,
@@ -104,19 +146,7 @@ class CreateNFTSerializer(serializers.Serializer):
     )
     collection_id = serializers.IntegerField(required=False)
     owner_address = serializers.CharField(max_length=42)
-    
-    def validate_image(self, value):
-        """Validate image file"""
-        # Check file size (max 10MB)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("Image file too large. Maximum size is 10MB.")
-        
-        # Check content type
-        allowed_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
-        if value.content_type not in allowed_types:
-            raise serializers.ValidationError("Invalid image type. Allowed: JPEG, PNG, GIF, WebP")
-        
-        return value
+    deep_zoom = serializers.BooleanField(required=False, default=False)  # Also build a tile pyramid
     
     def validate_attributes(self, value):
         """Validate attributes structure"""
@@ -6,16 +6,35 @@ import tempfile
 import uuid
 from PIL import Image
 from django.conf import settings
-from typing import Dict, Any, Optional, Tuple
-from botocore.exceptions import ClientError
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+from botocore.exceptions import ClientError, BotoCoreError
 from botocore.config import Config
 from io import BytesIO
 import base64
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .resilience import CircuitBreaker, FilebaseUnavailableError, ResilientS3Client, RetryPolicy
+from .phash import DuplicateImageError, dhash, get_phash_index
+from .imaging import (
+    MAX_OUTPUT_SIZE, ImageProbe, ImageRejected, decoded, encode_animation, fit_within, probe_image
+)
+from . import placeholders
+from . import tiles
 
 logger = logging.getLogger(__name__)
 
 
+class ProcessedImage(NamedTuple):
+    """Result of FilebaseService._process_image"""
+    content: bytes
+    content_type: str
+    perceptual_hash: str
+    blurhash: str
+    dominant_colors: List[str]
+
+
 class FilebaseService:
     """Service for uploading files to IPFS via Filebase S3-compatible API"""
     
@@ -23,22 +42,39 @@ class FilebaseService:
         self.access_key = settings.FILEBASE_ACCESS_KEY
         self.secret_key = settings.FILEBASE_SECRET_KEY
         self.bucket_name = settings.FILEBASE_BUCKET_NAME
-        self.endpoint_url = 'https://s3.filebase.com'
+        self.endpoint_url = settings.FILEBASE_ENDPOINT_URL
         
         if not self.access_key or not self.secret_key:
             raise ValueError("Filebase credentials not configured")
         
-        # Initialize S3 client for Filebase
-        self.s3_client = boto3.client(
+        # Initialize S3 client for Filebase. botocore's own retries are
+        # disabled; ResilientS3Client classifies and retries errors instead.
+        client = boto3.client(
             's3',
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.access_key,
             aws_secret_access_key=self.secret_key,
             config=Config(
                 region_name='us-east-1',  # Filebase uses us-east-1
-                s3={'addressing_style': 'path'}
+                s3={'addressing_style': 'path'},
+                connect_timeout=settings.FILEBASE_CONNECT_TIMEOUT,
+                read_timeout=settings.FILEBASE_READ_TIMEOUT,
+                retries={'max_attempts': 1, 'mode': 'standard'}
             )
         )
+        self.s3_client = ResilientS3Client(
+            client,
+            retry_policy=RetryPolicy(
+                max_attempts=settings.FILEBASE_MAX_ATTEMPTS,
+                base_delay=settings.FILEBASE_RETRY_BASE_DELAY,
+                max_delay=settings.FILEBASE_RETRY_MAX_DELAY
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=settings.FILEBASE_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.FILEBASE_BREAKER_RESET_SECONDS
+            ),
+            hedge_delay=settings.FILEBASE_HEAD_HEDGE_DELAY
+        )
         
         # Ensure bucket exists
         self._ensure_bucket_exists()
@@ -58,41 +94,73 @@ class FilebaseService:
                     logger.error(f"Failed to create bucket: {create_error}")
             else:
                 logger.error(f"Error checking bucket: {e}")
+        except (BotoCoreError, FilebaseUnavailableError) as e:
+            # Don't take the whole app down when Filebase is unreachable at startup
+            logger.error(f"Error checking bucket: {e}")
     
-    def _process_image(self, image_data: bytes, max_size: tuple = (2048, 2048)) -> bytes:
-        """Process and optimize image for NFT"""
-        try:
-            # Open image
-            image = Image.open(BytesIO(image_data))
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                if image.mode == 'RGBA':
-                    background.paste(image, mask=image.split()[-1])
-                image = background
-            
-            # Resize if too large
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Save optimized image
-            output = BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            return output.getvalue()
-            
-        except Exception as e:
-            logger.error(f"Image processing error: {e}")
-            return image_data  # Return original if processing fails
+    def _process_image(self, probe: ImageProbe, max_size: tuple = MAX_OUTPUT_SIZE,
+                       on_decoded: Optional[Callable[[Image.Image], None]] = None) -> ProcessedImage:
+        """Decode a probed upload once and optimize it for NFT
+        
+        ``on_decoded`` is called with the full decode before it is resized.
+        Returns the processed bytes with their content type, perceptual hash
+        and placeholders.
+        """
+        with decoded(probe) as image:
+            if on_decoded:
+                on_decoded(image)
+            try:
+                # Hash the decoded image before resizing/re-encoding
+                perceptual_hash = dhash(image)
+                
+                # Keep animations animated, re-encoded as WebP frame by frame
+                if probe.is_animated:
+                    # Placeholders come from the first frame
+                    blurhash, dominant_colors = placeholders.compute(image)
+                    return ProcessedImage(
+                        encode_animation(probe, fit_within(image.size, max_size)), 'image/webp',
+                        perceptual_hash, blurhash, dominant_colors
+                    )
+                
+                # Convert to RGB if necessary
+                if image.mode in ('RGBA', 'P'):
+                    background = Image.new('RGB', image.size, (255, 255, 255))
+                    if image.mode == 'P':
+                        image = image.convert('RGBA')
+                    if image.mode == 'RGBA':
+                        background.paste(image, mask=image.split()[-1])
+                    image = background
+                
+                # Resize if too large
+                if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+                    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+                
+                # Placeholders shown by clients while the image loads
+                blurhash, dominant_colors = placeholders.compute(image)
+                
+                # Save optimized image
+                output = BytesIO()
+                image.save(output, format='JPEG', quality=85, optimize=True)
+                return ProcessedImage(output.getvalue(), 'image/jpeg', perceptual_hash, blurhash, dominant_colors)
+                
+            except ImageRejected:
+                raise
+            except Exception as e:
+                logger.error(f"Image processing error: {e}")
+                # Return original if processing fails
+                return ProcessedImage(probe.original_bytes(), probe.content_type, '', '', [])
     
-    def upload_file_to_filebase(self, file_content: bytes, filename: str, content_type: str) -> str:
+    def object_key(self, file_content: bytes, filename: str) -> str:
+        """Bucket key for a file (content hash prefix avoids conflicts)"""
+        file_hash = hashlib.sha256(file_content).hexdigest()[:16]
+        return f"{file_hash}_{filename}"
+    
+    def upload_file_to_filebase(self, file_content: bytes, filename: str, content_type: str,
+                                key: Optional[str] = None) -> str:
         """Upload file to Filebase and return IPFS CID"""
         try:
             # Generate unique key to avoid conflicts
-            file_hash = hashlib.sha256(file_content).hexdigest()[:16]
-            key = f"{file_hash}_{filename}"
+            key = key or self.object_key(file_content, filename)
             
             # Upload to Filebase
             response = self.s3_client.put_object(
@@ -131,28 +199,50 @@ class FilebaseService:
             logger.info(f"Successfully uploaded {filename} to Filebase with CID: {ipfs_cid}")
             return ipfs_cid
             
-        except ClientError as e:
+        except FilebaseUnavailableError:
+            raise
+        except (ClientError, BotoCoreError) as e:
             logger.error(f"Failed to upload to Filebase: {e}")
             raise Exception(f"Failed to upload to Filebase: {str(e)}")
     
-    def upload_image(self, image_file) -> Dict[str, Any]:
-        """Upload and optimize image, return IPFS URLs and metadata"""
+    def upload_image(self, image_file, deep_zoom: bool = False) -> Dict[str, Any]:
+        """Upload and optimize image, return IPFS URLs and metadata
+        
+        With ``deep_zoom``, images larger than the NFT image also get a tile
+        pyramid, cut from the same decode.
+        """
         try:
-            # Read image data
-            image_data = image_file.read()
+            # Serializers attach the header probe; other callers are probed here
+            probe = getattr(image_file, 'image_probe', None) or probe_image(image_file)
+            
+            tile_pyramid = None
+            on_decoded = None
+            if deep_zoom and tiles.wants_pyramid(probe):
+                tiles.plan_full_decode(probe)
+                
+                def on_decoded(image):
+                    nonlocal tile_pyramid
+                    tile_pyramid = self.upload_tile_pyramid(image, self.file_sha256(probe.file))
             
-            # Validate image size (max 10MB)
-            if len(image_data) > 10 * 1024 * 1024:
-                raise ValueError("Image file too large. Maximum size is 10MB.")
+            # Process image (the only full decode)
+            processed = self._process_image(probe, on_decoded=on_decoded)
+            processed_image, content_type, perceptual_hash = processed.content, processed.content_type, processed.perceptual_hash
             
-            # Process image
-            processed_image = self._process_image(image_data)
+            # Optionally refuse near-duplicates before paying for storage
+            if perceptual_hash and settings.PHASH_BLOCK_DUPLICATES:
+                matches = get_phash_index().find_similar(
+                    perceptual_hash, settings.PHASH_DUPLICATE_DISTANCE, limit=5
+                )
+                if matches:
+                    raise DuplicateImageError(matches)
             
             # Upload to Filebase
+            object_key = self.object_key(processed_image, image_file.name)
             ipfs_cid = self.upload_file_to_filebase(
                 processed_image,
                 image_file.name,
-                'image/jpeg'
+                content_type,
+                key=object_key
             )
             
             return {
@@ -161,13 +251,86 @@ class FilebaseService:
                 'gateway_url': f"https://ipfs.filebase.io/ipfs/{ipfs_cid}",
                 'original_filename': image_file.name,
                 'file_size': len(processed_image),
-                'content_type': 'image/jpeg'
+                'content_type': content_type,
+                'object_key': object_key,
+                'perceptual_hash': perceptual_hash,
+                'blurhash': processed.blurhash,
+                'dominant_colors': processed.dominant_colors,
+                'tile_pyramid': tile_pyramid
             }
             
+        except (FilebaseUnavailableError, DuplicateImageError, ImageRejected):
+            raise
         except Exception as e:
             logger.error(f"Image upload failed: {e}")
             raise Exception(f"Image upload failed: {str(e)}")
     
+    def file_sha256(self, file) -> str:
+        """Hex SHA-256 of an uploaded file's content"""
+        file.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+    
+    def upload_tile_pyramid(self, image: Image.Image, source_hash: str) -> Dict[str, Any]:
+        """Cut a full-resolution decode into a DZI tile pyramid and upload it
+        
+        Tiles are encoded and uploaded by a few threads while the pyramid is
+        being cut; the descriptor is written last and marks a complete pyramid.
+        """
+        pyramid = tiles.new_pyramid(source_hash, image.size)
+        descriptor_key = tiles.descriptor_key(pyramid)
+        try:
+            try:
+                self.s3_client.head_object(Bucket=self.bucket_name, Key=descriptor_key)
+                logger.info(f"Reusing tile pyramid {pyramid['prefix']}")
+                return pyramid
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+                    raise
+            
+            workers = settings.DEEP_ZOOM_UPLOAD_WORKERS
+            pending = deque()
+            
+            def put_tile(key, tile):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=tiles.encode_tile(tile),
+                    ContentType=tiles.TILE_CONTENT_TYPE,
+                    CacheControl=tiles.IMMUTABLE_CACHE_CONTROL,
+                    Metadata={'upload-type': 'nft-tile'}
+                )
+            
+            def sink(level, column, row, tile):
+                pending.append(executor.submit(put_tile, tiles.tile_key(pyramid, level, column, row), tile))
+                # Bound the tiles waiting in memory
+                while len(pending) > workers * 4:
+                    pending.popleft().result()
+            
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='filebase-tiles') as executor:
+                tiles.build_pyramid(image, pyramid, sink)
+                while pending:
+                    pending.popleft().result()
+            
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=descriptor_key,
+                Body=tiles.descriptor_xml(pyramid),
+                ContentType='application/xml',
+                CacheControl=tiles.IMMUTABLE_CACHE_CONTROL,
+                Metadata={'upload-type': 'nft-tile'}
+            )
+            logger.info(f"Uploaded tile pyramid {pyramid['prefix']} for {image.size[0]}x{image.size[1]} image")
+            return pyramid
+            
+        except FilebaseUnavailableError:
+            raise
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to upload tile pyramid to Filebase: {e}")
+            raise Exception(f"Failed to upload tile pyramid to Filebase: {str(e)}")
+    
     def upload_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Upload NFT metadata JSON to IPFS"""
         try:
@@ -179,23 +342,64 @@ class FilebaseService:
             filename = f"metadata_{uuid.uuid4().hex}.json"
             
             # Upload to Filebase
+            object_key = self.object_key(metadata_bytes, filename)
             ipfs_cid = self.upload_file_to_filebase(
                 metadata_bytes,
                 filename,
-                'application/json'
+                'application/json',
+                key=object_key
             )
             
             return {
                 'ipfs_hash': ipfs_cid,
                 'ipfs_url': f"ipfs://{ipfs_cid}",
                 'gateway_url': f"https://ipfs.filebase.io/ipfs/{ipfs_cid}",
-                'metadata': metadata
+                'metadata': metadata,
+                'object_key': object_key
             }
             
+        except FilebaseUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Metadata upload failed: {e}")
             raise Exception(f"Metadata upload failed: {str(e)}")
     
+    def upload_car(self, car_file, key: str, root_cid: str) -> Dict[str, Any]:
+        """Upload a CAR file in one request; Filebase imports and pins its DAG"""
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=car_file,
+                ContentType='application/vnd.ipld.car',
+                Metadata={
+                    'import': 'car',
+                    'upload-type': 'nft-collection'
+                }
+            )
+            
+            # The root CID is computed locally, so no need to wait for Filebase;
+            # a mismatch means the import produced a different DAG.
+            obj_info = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            ipfs_cid = obj_info.get('Metadata', {}).get('cid', '') or \
+                obj_info.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('x-amz-meta-cid', '')
+            if ipfs_cid and ipfs_cid != root_cid:
+                logger.warning(f"Filebase reported CID {ipfs_cid} for CAR {key}, expected {root_cid}")
+            
+            logger.info(f"Successfully uploaded CAR {key} with root CID: {root_cid}")
+            return {
+                'ipfs_hash': root_cid,
+                'ipfs_url': f"ipfs://{root_cid}/",
+                'gateway_url': f"https://ipfs.filebase.io/ipfs/{root_cid}/",
+                'object_key': key
+            }
+            
+        except FilebaseUnavailableError:
+            raise
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to upload CAR to Filebase: {e}")
+            raise Exception(f"Failed to upload CAR to Filebase: {str(e)}")
+    
     def create_nft_metadata(self, name: str, description: str, image_ipfs_url: str, 
                            attributes: Optional[list] = None) -> Dict[str, Any]:
         """Create NFT metadata in OpenSea standard format"""
@@ -209,11 +413,18 @@ class FilebaseService:
         return metadata
     
     def upload_complete_nft(self, name: str, description: str, attributes: list, 
-                           image_file) -> Dict[str, Any]:
-        """Complete NFT upload process: image + metadata"""
+                           image_file, deep_zoom: bool = False,
+                           uploaded_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Complete NFT upload process: image + metadata
+        
+        Each object key is appended to ``uploaded_keys`` once stored, so a
+        caller whose job fails afterwards knows what it left in the bucket.
+        """
+        uploaded_keys = [] if uploaded_keys is None else uploaded_keys
         try:
             # Step 1: Upload image
-            image_result = self.upload_image(image_file)
+            image_result = self.upload_image(image_file, deep_zoom=deep_zoom)
+            uploaded_keys.append(image_result['object_key'])
             
             # Step 2: Create metadata
             metadata = self.create_nft_metadata(
@@ -225,6 +436,7 @@ class FilebaseService:
             
             # Step 3: Upload metadata
             metadata_result = self.upload_metadata(metadata)
+            uploaded_keys.append(metadata_result['object_key'])
             
             return {
                 'image_ipfs_hash': image_result['ipfs_hash'],
@@ -235,9 +447,18 @@ class FilebaseService:
                 'metadata_gateway_url': metadata_result['gateway_url'],
                 'metadata': metadata,
                 'original_filename': image_result['original_filename'],
-                'file_size': image_result['file_size']
+                'file_size': image_result['file_size'],
+                'content_type': image_result['content_type'],
+                'image_object_key': image_result['object_key'],
+                'metadata_object_key': metadata_result['object_key'],
+                'perceptual_hash': image_result['perceptual_hash'],
+                'blurhash': image_result['blurhash'],
+                'dominant_colors': image_result['dominant_colors'],
+                'tile_pyramid': image_result['tile_pyramid']
             }
             
+        except (FilebaseUnavailableError, DuplicateImageError, ImageRejected):
+            raise
         except Exception as e:
             logger.error(f"Complete NFT upload failed: {e}")
             raise Exception(f"Complete NFT upload failed: {str(e)}")
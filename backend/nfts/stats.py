@@ -0,0 +1,171 @@
+"""
+Incrementally maintained NFT statistics.
+
+Counts, bytes, success/failure totals and upload latency are rolled up per
+day into NFTStatsRollup rows (overall, per collection and per owner), so
+reading statistics never scans NFTMetadata or UploadSession.
+"""
+import logging
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import NFTMetadata, NFTStatsRollup, UploadSession
+
+logger = logging.getLogger(__name__)
+
+METRICS = ['nfts_created', 'bytes_stored', 'uploads_completed', 'uploads_failed', 'upload_seconds_total']
+
+
+def _dimensions(owner_address: str = '', collection_id: Optional[int] = None):
+    yield 'all', ''
+    if owner_address:
+        yield 'owner', owner_address
+    if collection_id:
+        yield 'collection', str(collection_id)
+
+
+def _bump(day: date, dimension: str, value: str, **deltas):
+    row, _ = NFTStatsRollup.objects.get_or_create(day=day, dimension=dimension, dimension_value=value)
+    NFTStatsRollup.objects.filter(pk=row.pk).update(
+        **{metric: F(metric) + delta for metric, delta in deltas.items()}
+    )
+
+
+def record_upload_completed(nft: NFTMetadata, duration: float):
+    """Count a successful mint in today's rollups"""
+    try:
+        day = timezone.now().date()
+        for dimension, value in _dimensions(nft.owner_address, nft.collection_id):
+            _bump(
+                day, dimension, value,
+                nfts_created=1,
+                bytes_stored=nft.file_size,
+                uploads_completed=1,
+                upload_seconds_total=duration
+            )
+    except Exception as e:
+        # Statistics must never fail a mint
+        logger.error(f"Failed to record upload stats: {e}")
+
+
+def record_upload_failed(upload_session: UploadSession):
+    """Count a failed upload in today's rollups"""
+    try:
+        day = timezone.now().date()
+        for dimension, value in _dimensions(upload_session.owner_address, upload_session.collection_id):
+            _bump(day, dimension, value, uploads_failed=1)
+    except Exception as e:
+        logger.error(f"Failed to record upload stats: {e}")
+
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def backfill_day(day: date) -> int:
+    """Recompute all rollups for one day from the source tables"""
+    start, end = _day_bounds(day)
+    rows: Dict[tuple, Dict[str, Any]] = {}
+
+    def row(dimension, value):
+        return rows.setdefault((dimension, value), dict.fromkeys(METRICS, 0))
+
+    nfts = NFTMetadata.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    totals = nfts.aggregate(count=Count('id'), size=Sum('file_size'))
+    if totals['count']:
+        row('all', '').update(nfts_created=totals['count'], bytes_stored=totals['size'] or 0)
+    for item in nfts.values('owner_address').annotate(count=Count('id'), size=Sum('file_size')):
+        row('owner', item['owner_address']).update(nfts_created=item['count'], bytes_stored=item['size'] or 0)
+    for item in nfts.exclude(collection=None).values('collection_id').annotate(count=Count('id'), size=Sum('file_size')):
+        row('collection', str(item['collection_id'])).update(nfts_created=item['count'], bytes_stored=item['size'] or 0)
+
+    duration = ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField())
+    sessions = UploadSession.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    session_stats = sessions.values(
+        'owner_address', 'collection_id'
+    ).annotate(
+        completed=Count('id', filter=Q(upload_status='completed')),
+        failed=Count('id', filter=Q(upload_status='failed')),
+        seconds=Sum(duration, filter=Q(upload_status='completed'))
+    )
+    for item in session_stats:
+        seconds = item['seconds'].total_seconds() if item['seconds'] else 0.0
+        for dimension, value in _dimensions(item['owner_address'], item['collection_id']):
+            metrics = row(dimension, value)
+            metrics['uploads_completed'] += item['completed']
+            metrics['uploads_failed'] += item['failed']
+            metrics['upload_seconds_total'] += seconds
+
+    with transaction.atomic():
+        NFTStatsRollup.objects.filter(day=day).delete()
+        NFTStatsRollup.objects.bulk_create([
+            NFTStatsRollup(day=day, dimension=dimension, dimension_value=value, **metrics)
+            for (dimension, value), metrics in rows.items()
+        ])
+    return len(rows)
+
+
+def backfill(since: Optional[date] = None, until: Optional[date] = None) -> Iterable[tuple]:
+    """Recompute rollups one day at a time, yielding (day, rows written)"""
+    until = until or timezone.now().date()
+    if since is None:
+        first = NFTMetadata.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        first_session = UploadSession.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        candidates = [value.date() for value in (first, first_session) if value]
+        if not candidates:
+            return
+        since = min(candidates)
+
+    day = since
+    while day <= until:
+        yield day, backfill_day(day)
+        day += timedelta(days=1)
+
+
+def summarize(days: int = 30, dimension: str = 'all', value: str = '') -> Dict[str, Any]:
+    """Totals and daily series for one dimension value, read from the rollups only"""
+    since = timezone.now().date() - timedelta(days=days - 1)
+    rows = NFTStatsRollup.objects.filter(
+        dimension=dimension, dimension_value=value, day__gte=since
+    ).order_by('day').values('day', *METRICS)
+
+    daily: List[Dict[str, Any]] = []
+    totals = dict.fromkeys(METRICS, 0)
+    for item in rows:
+        for metric in METRICS:
+            totals[metric] += item[metric]
+        daily.append(_with_rates({**item, 'day': item['day'].isoformat()}))
+
+    return {
+        'dimension': dimension,
+        'value': value,
+        'days': days,
+        'totals': _with_rates(totals),
+        'daily': daily,
+    }
+
+
+def top(days: int, dimension: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Largest collections/owners by NFTs created over the window"""
+    since = timezone.now().date() - timedelta(days=days - 1)
+    return list(
+        NFTStatsRollup.objects.filter(dimension=dimension, day__gte=since)
+        .values('dimension_value')
+        .annotate(nfts_created=Sum('nfts_created'), bytes_stored=Sum('bytes_stored'))
+        .order_by('-nfts_created')[:limit]
+    )
+
+
+def _with_rates(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    attempts = metrics['uploads_completed'] + metrics['uploads_failed']
+    metrics['success_rate'] = round(metrics['uploads_completed'] / attempts, 4) if attempts else None
+    metrics['mean_upload_seconds'] = (
+        round(metrics['upload_seconds_total'] / metrics['uploads_completed'], 3)
+        if metrics['uploads_completed'] else None
+    )
+    return metrics
@@ -0,0 +1,8 @@
+"""
+Tests for the nfts app.
+
+Importing nfts.services builds the Filebase client, so run them with any
+credentials set; no test talks to Filebase:
+
+    FILEBASE_ACCESS_KEY=test FILEBASE_SECRET_KEY=test python manage.py test nfts
+"""
@@ -0,0 +1,149 @@
+"""Stand-ins for the external services the app talks to"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from botocore.exceptions import ClientError
+
+
+class StubS3:
+    """In-memory bucket answering the S3 calls the janitor makes"""
+
+    def __init__(self, objects: Dict[str, str], age: timedelta = timedelta(days=30)):
+        # key -> cid
+        self.objects = dict(objects)
+        # key -> LastModified
+        self.modified = dict.fromkeys(self.objects, datetime.now(timezone.utc) - age)
+        self.deleted: List[str] = []
+
+    def head_object(self, Bucket: str, Key: str):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}, 'ResponseMetadata': {'HTTPStatusCode': 404}}, 'HeadObject')
+        return {'Metadata': {'cid': self.objects[Key]}, 'LastModified': self.modified[Key]}
+
+    def delete_objects(self, Bucket: str, Delete: Dict):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        for key in keys:
+            self.objects.pop(key, None)
+        self.deleted.extend(keys)
+        return {'Errors': []}
+
+
+def nft_fields(index: int, **overrides) -> Dict:
+    """Field values for an NFTMetadata row"""
+    fields = {
+        'name': f"NFT {index}",
+        'description': 'Test NFT',
+        'image_ipfs_hash': f"bafyimage{index}",
+        'image_ipfs_url': f"https://ipfs.filebase.io/ipfs/bafyimage{index}",
+        'metadata_ipfs_hash': f"bafymeta{index}",
+        'metadata_ipfs_url': f"https://ipfs.filebase.io/ipfs/bafymeta{index}",
+        'original_filename': f"nft_{index}.png",
+        'file_size': 1000,
+        'content_type': 'image/png',
+        'owner_address': '0x' + f"{index:040x}",
+    }
+    fields.update(overrides)
+    return fields
+
+
+def abi_string(value: str) -> str:
+    """ABI encoding of a single ``string`` return value"""
+    raw = value.encode('utf-8')
+    padded = raw + bytes(-len(raw) % 32)
+    return '0x' + (32).to_bytes(32, 'big').hex() + len(raw).to_bytes(32, 'big').hex() + padded.hex()
+
+
+def word(value: int) -> str:
+    return value.to_bytes(32, 'big').hex()
+
+
+def address_topic(address: str) -> str:
+    return '0x' + address.lower().removeprefix('0x').rjust(64, '0')
+
+
+def log_entry(topics: List[str], data: str, block: int, index: int, transaction_hash: str = '') -> Dict:
+    return {
+        'topics': topics,
+        'data': data,
+        'blockNumber': hex(block),
+        'logIndex': hex(index),
+        'transactionHash': transaction_hash or '0x' + f"{block:032x}{index:032x}",
+    }
+
+
+class StubChain:
+    """JSON-RPC node with canned logs, block hashes and tokenURI results
+
+    ``client()`` is a JSONRPCClient whose ``_post`` this node answers. With
+    ``max_log_range`` set, eth_getLogs refuses ranges of more blocks.
+    """
+
+    def __init__(self, head: int, logs: List[Dict] = (), token_uris: Dict[int, str] = None,
+                 max_log_range: int = None):
+        self.head = head
+        self.logs = list(logs)
+        self.token_uris = dict(token_uris or {})
+        self.hashes: Dict[int, str] = {}
+        self.max_log_range = max_log_range
+
+    def client(self):
+        from nfts.rpc import JSONRPCClient
+
+        client = JSONRPCClient('http://node.invalid')
+        client._post = self.reply
+        return client
+
+    def reply(self, payload):
+        if isinstance(payload, list):
+            return [self.reply(request) for request in payload]
+        try:
+            return {'jsonrpc': '2.0', 'id': payload['id'], 'result': self.handle(payload['method'], payload['params'])}
+        except LookupError as e:
+            return {'jsonrpc': '2.0', 'id': payload['id'], 'error': {'code': 3, 'message': str(e)}}
+
+    def handle(self, method: str, params: List):
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'eth_getBlockByNumber':
+            return self.block(int(params[0], 16))
+        if method == 'eth_getLogs':
+            query = params[0]
+            from_block, to_block = int(query['fromBlock'], 16), int(query['toBlock'], 16)
+            if self.max_log_range and to_block - from_block + 1 > self.max_log_range:
+                raise LookupError(f"block range is too wide (limit {self.max_log_range})")
+            return self.matching_logs(from_block, to_block, query['topics'])
+        if method == 'eth_call':
+            token_id = int(params[0]['data'][10:], 16)
+            if token_id not in self.token_uris:
+                raise LookupError('execution reverted: URI query for nonexistent token')
+            return abi_string(self.token_uris[token_id])
+        raise LookupError(f"the method {method} does not exist")
+
+    def block(self, number: int):
+        if number > self.head:
+            return None
+        return {
+            'number': hex(number),
+            'hash': self.hashes.get(number, '0x' + f"{number:064x}"),
+            'timestamp': hex(1_700_000_000 + number * 12),
+        }
+
+    def matching_logs(self, from_block: int, to_block: int, topics: List) -> List[Dict]:
+        def matches(log):
+            for position, wanted in enumerate(topics):
+                if wanted is None:
+                    continue
+                if position >= len(log['topics']):
+                    return False
+                allowed = wanted if isinstance(wanted, list) else [wanted]
+                if log['topics'][position] not in allowed:
+                    return False
+            return True
+
+        return [log for log in self.logs if from_block <= int(log['blockNumber'], 16) <= to_block and matches(log)]
+
+    def reorganize(self, from_block: int, logs: List[Dict] = ()):
+        """Replace every block from ``from_block`` on with a fork carrying ``logs``"""
+        self.logs = [log for log in self.logs if int(log['blockNumber'], 16) < from_block] + list(logs)
+        for number in range(from_block, self.head + 1):
+            self.hashes[number] = '0x' + f"f{number:063x}"
@@ -0,0 +1,37 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from nfts.admission import GLOBAL_KEY, admit
+from nfts.models import AdmissionBucket, AdmissionLease
+
+WALLET = '0x' + 'a' * 40
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=True, ADMISSION_CLIENT_RATE=1, ADMISSION_CLIENT_BURST=2,
+                   ADMISSION_GLOBAL_RATE=600, ADMISSION_GLOBAL_BURST=60)
+class AdmissionTests(TestCase):
+    def post_invalid(self):
+        # Admitted, then refused by serializer validation: there is no image
+        return self.client.post(reverse('nfts:upload-image'), {'owner_address': WALLET})
+
+    def test_invalid_uploads_get_their_tokens_back(self):
+        for _ in range(5):
+            self.assertEqual(self.post_invalid().status_code, 400)
+
+        self.assertEqual(AdmissionBucket.objects.get(key=f"wallet:{WALLET}").tokens, 2)
+        self.assertEqual(AdmissionBucket.objects.get(key=GLOBAL_KEY).tokens, 60)
+        self.assertFalse(AdmissionLease.objects.exists())
+
+    def test_spent_burst_is_refused_with_retry_after(self):
+        for _ in range(2):
+            AdmissionLease.objects.filter(pk=admit(f"wallet:{WALLET}").pk).delete()
+
+        response = self.post_invalid()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(ADMISSION_CONTROL_ENABLED=False)
+    def test_disabled(self):
+        self.assertIsNone(admit(f"wallet:{WALLET}"))
+        self.assertEqual(self.post_invalid().status_code, 400)
+        self.assertFalse(AdmissionBucket.objects.exists())
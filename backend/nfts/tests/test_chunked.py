@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import uuid
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from nfts import chunked
+from nfts.models import UploadSession
+
+
+class ChunkUploadTests(TestCase):
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        overrides = override_settings(CHUNKED_UPLOAD_DIR=upload_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def start(self) -> str:
+        response = self.client.post(
+            reverse('nfts:upload-init'),
+            {'filename': 'art.png', 'file_size': 8, 'content_type': 'image/png'},
+            content_type='application/json'
+        )
+        return response.json()['session_id']
+
+    def put_chunk(self, session_id, body: bytes, offset: int = 0):
+        return self.client.put(
+            reverse('nfts:upload-chunk', args=[session_id]), body,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_chunks_are_written_at_their_offset(self):
+        session_id = self.start()
+        self.assertEqual(self.put_chunk(session_id, b'abcd').json()['bytes_uploaded'], 4)
+        response = self.put_chunk(session_id, b'efgh', offset=4)
+        self.assertTrue(response.json()['complete'])
+        with open(chunked.partial_path(session_id), 'rb') as fh:
+            self.assertEqual(fh.read(), b'abcdefgh')
+
+    def test_session_without_partial_file_is_409(self):
+        # As created by create-nft/, which never writes chunks
+        session = UploadSession.objects.create(original_filename='art.png', file_size=8, content_type='image/png')
+        response = self.put_chunk(session.session_id, b'abcd')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {
+            'success': False, 'error': 'Upload session has no chunked upload in progress'
+        })
+
+    def test_removed_partial_file_is_409(self):
+        session_id = self.start()
+        chunked.discard_partial(session_id)
+        self.assertEqual(self.put_chunk(session_id, b'abcd').status_code, 409)
+        UploadSession.objects.filter(session_id=session_id).update(bytes_uploaded=8)
+        response = self.client.post(reverse('nfts:upload-finalize', args=[session_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(UploadSession.objects.get(session_id=session_id).upload_status, 'uploading')
+
+    def test_unknown_session_is_404(self):
+        self.assertEqual(self.put_chunk(uuid.uuid4(), b'abcd').status_code, 404)
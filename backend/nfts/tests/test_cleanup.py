@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from nfts import tiles
+from nfts.views import run_create_nft_pipeline
+from nfts.models import NFTMetadata, UploadSession
+from nfts.services import filebase_service
+
+from .stubs import StubS3, nft_fields
+
+
+class CleanupObjectsTests(TestCase):
+    def run_cleanup(self, s3: StubS3, **options):
+        with mock.patch.object(filebase_service, 's3_client', s3):
+            call_command('cleanup_uploads', skip_sessions=True, rate=0, stdout=StringIO(), **options)
+
+    def failed_session(self, *keys, age: timedelta = timedelta(days=2)) -> UploadSession:
+        session = UploadSession.objects.create(
+            original_filename='art.png', file_size=1000, content_type='image/png', upload_status='failed',
+            orphaned_object_keys=list(keys)
+        )
+        UploadSession.objects.filter(id=session.id).update(updated_at=timezone.now() - age)
+        return session
+
+    def test_only_keys_of_failed_uploads_are_deleted(self):
+        pyramid = tiles.new_pyramid('a' * 64, (4096, 4096))
+        session = self.failed_session('1111_art.png')
+        s3 = StubS3({
+            '1111_art.png': 'bafyorphan',
+            # A standalone upload-image/ result and an unlinked pyramid: never recorded, never deleted
+            '2222_standalone.png': 'bafystandalone',
+            tiles.descriptor_key(pyramid): 'bafydzi',
+        })
+
+        self.run_cleanup(s3)
+
+        self.assertEqual(s3.deleted, ['1111_art.png'])
+        self.assertEqual(UploadSession.objects.get(id=session.id).orphaned_object_keys, [])
+
+    def test_keys_still_in_use_are_kept(self):
+        # A retry of the same image succeeded under the same content-addressed key
+        NFTMetadata.objects.create(**nft_fields(1, image_object_key='1111_art.png'))
+        s3 = StubS3({'1111_art.png': 'bafyimage1', '3333_meta.json': 'bafymeta1', '4444_new.png': 'bafynew'})
+        # Stored again after the cutoff
+        s3.modified['4444_new.png'] = timezone.now()
+        self.failed_session('1111_art.png', '3333_meta.json', '4444_new.png', '5555_gone.png')
+
+        self.run_cleanup(s3)
+
+        # 3333_meta.json carries the CID of an NFT recorded before object keys were
+        self.assertEqual(s3.deleted, [])
+
+    def test_recent_failures_and_dry_runs_leave_objects(self):
+        recent = self.failed_session('1111_art.png', age=timedelta(hours=1))
+        old = self.failed_session('2222_art.png')
+        s3 = StubS3({'1111_art.png': 'bafyrecent', '2222_art.png': 'bafyold'})
+
+        self.run_cleanup(s3, dry_run=True)
+        self.assertEqual(s3.deleted, [])
+        self.assertEqual(UploadSession.objects.get(id=old.id).orphaned_object_keys, ['2222_art.png'])
+
+        self.run_cleanup(s3)
+        self.assertEqual(s3.deleted, ['2222_art.png'])
+        self.assertEqual(UploadSession.objects.get(id=recent.id).orphaned_object_keys, ['1111_art.png'])
+
+
+class OrphanedKeysTests(TestCase):
+    def test_failed_job_records_what_it_uploaded(self):
+        session = UploadSession.objects.create(
+            original_filename='art.png', file_size=1000, content_type='image/png', upload_status='uploading'
+        )
+        data = {'name': 'Art', 'description': '', 'owner_address': '0x' + 'b' * 40,
+                'image': SimpleUploadedFile('art.png', b'png', content_type='image/png')}
+        image_result = {'object_key': '1111_art.png', 'ipfs_url': 'ipfs://bafyimage'}
+        with mock.patch.object(filebase_service, 'upload_image', return_value=image_result), \
+                mock.patch.object(filebase_service, 'upload_metadata', side_effect=Exception('timed out')):
+            response = run_create_nft_pipeline(session, data, time.time())
+
+        self.assertEqual(response.status_code, 500)
+        session.refresh_from_db()
+        self.assertEqual((session.upload_status, session.orphaned_object_keys), ('failed', ['1111_art.png']))
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from nfts.db_router import ReplicaRouter
+from nfts.models import NFTMetadata
+
+from .stubs import nft_fields
+
+REPLICA = 'replica_1'
+
+
+class ReadYourWritesTests(TransactionTestCase):
+    """Replica routing with a second SQLite alias mirroring the primary's test database
+
+    The replica connection is a separate connection, so which alias served a
+    query shows up in that alias's captured queries. TransactionTestCase
+    commits the rows so both connections see them.
+    """
+
+    def setUp(self):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        settings.DATABASES[REPLICA] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': DEFAULT_DB_ALIAS}}
+        self.addCleanup(self.remove_replica)
+
+        replica_router = next(r for r in router.routers if isinstance(r, ReplicaRouter))
+        replicas, replica_router.replicas = replica_router.replicas, [REPLICA]
+        self.addCleanup(setattr, replica_router, 'replicas', replicas)
+
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        overrides = override_settings(CHUNKED_UPLOAD_DIR=upload_dir, DATABASE_REPLICA_STICKY_SECONDS=15)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.nft = NFTMetadata.objects.create(**nft_fields(1))
+
+    def remove_replica(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del settings.DATABASES[REPLICA]
+
+    def get(self, url):
+        """GET ``url``; the number of queries each alias served"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        for url in (reverse('nfts:nft-list'), reverse('nfts:nft-detail', args=[self.nft.id])):
+            primary, replica = self.get(url)
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+        self.assertNotIn(settings.DATABASE_REPLICA_STICKY_COOKIE, self.client.cookies)
+
+    def test_client_reads_from_primary_after_writing(self):
+        response = self.client.post(
+            reverse('nfts:upload-init'),
+            {'filename': 'art.png', 'file_size': 1000, 'content_type': 'image/png'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies[settings.DATABASE_REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 15)
+
+        primary, replica = self.get(reverse('nfts:nft-detail', args=[self.nft.id]))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
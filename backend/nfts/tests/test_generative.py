@@ -0,0 +1,114 @@
+import itertools
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from PIL import Image
+
+from nfts import generative, traits
+from nfts.generative import LayerSet, LayerStack, Trait, TraitValue, draw_combinations, existing_combinations
+from nfts.models import NFTCollection, NFTMetadata
+
+from .stubs import nft_fields
+
+
+def layer_set(*weights) -> LayerSet:
+    """LayerSet with one trait per weight list; the layer paths are never read"""
+    return LayerSet([
+        Trait(f"trait{position}", [TraitValue(f"v{index}", weight, '') for index, weight in enumerate(values)])
+        for position, values in enumerate(weights)
+    ])
+
+
+class ParseLayerNameTests(SimpleTestCase):
+    def test_names_and_weights(self):
+        self.assertEqual(generative.parse_layer_name('Red#5.png'), ('Red', 5.0))
+        self.assertEqual(generative.parse_layer_name('Blue.png'), ('Blue', 1.0))
+        self.assertEqual(generative.parse_layer_name('Gold#Rare#0.5.png'), ('Gold#Rare', 0.5))
+
+    def test_bad_weights(self):
+        for name in ('Red#heavy.png', 'Red#0.png', 'Red#-2.png'):
+            with self.assertRaises(ValueError, msg=name):
+                generative.parse_layer_name(name)
+
+
+class DrawCombinationsTests(SimpleTestCase):
+    def test_draws_are_unique_and_skip_taken(self):
+        layers = layer_set([1, 2, 3], [1, 1, 1, 1])
+        taken = {(0, 0), (1, 1), (2, 2), (2, 3)}
+        before = set(taken)
+
+        drawn = draw_combinations(layers, 6, taken, seed=7)
+        self.assertEqual(len(set(drawn)), 6)
+        self.assertFalse(before & set(drawn))
+        self.assertEqual(taken, before | set(drawn))
+
+        with self.assertRaisesMessage(ValueError, 'Only 2 unused trait combinations remain'):
+            draw_combinations(layers, 3, taken, seed=7)
+
+    def test_exhaustion_falls_back_to_sampling_the_rest(self):
+        # Rejection sampling almost never draws the rare values, so the last ones come from sample_remaining
+        layers = layer_set([1_000_000, 1, 1], [1_000_000, 1])
+        with mock.patch('nfts.generative.sample_remaining', wraps=generative.sample_remaining) as fallback:
+            drawn = draw_combinations(layers, layers.capacity, set(), seed=1)
+        fallback.assert_called_once()
+        self.assertEqual(sorted(drawn), list(itertools.product(range(3), range(2))))
+
+
+class CompositeTests(SimpleTestCase):
+    size = (24, 16)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        rng = np.random.default_rng(3)
+        self.images = []
+        for position in range(2):
+            pixels = rng.integers(0, 256, size=(self.size[1], self.size[0], 4), dtype=np.uint8)
+            if position == 0:
+                pixels[..., 3] = 255  # An opaque background under one translucent layer
+            image = Image.fromarray(pixels)
+            trait_dir = f"{self.directory}/{position}_trait"
+            os.makedirs(trait_dir)
+            image.save(f"{trait_dir}/value.png")
+            self.images.append(image)
+
+    def test_matches_pillow_alpha_composite(self):
+        stack = LayerStack(LayerSet.from_directory(self.directory))
+        rendered = stack.render((0, 0))
+
+        expected = Image.new('RGBA', self.size, (255, 255, 255, 255))
+        for image in self.images:
+            expected = Image.alpha_composite(expected, image)
+        difference = np.abs(rendered.astype(np.int16) - np.asarray(expected.convert('RGB')).astype(np.int16))
+        self.assertLessEqual(difference.max(), 1)
+
+        with Image.open(BytesIO(stack.render_png((0, 0)))) as png:
+            self.assertEqual(png.mode, 'RGB')
+            np.testing.assert_array_equal(np.asarray(png), rendered)
+
+
+class ExistingCombinationsTests(TestCase):
+    def test_only_matching_nfts_count(self):
+        collection = NFTCollection.objects.create(name='Drop', creator='0x' + 'b' * 40)
+        layers = layer_set([1, 1], [1, 1, 1])
+
+        def nft(index, attributes, **fields):
+            fields.setdefault('collection', collection)
+            NFTMetadata.objects.create(**nft_fields(index, attributes_json=traits.normalize(attributes), **fields))
+
+        nft(1, [{'trait_type': 'trait0', 'value': 'v1'}, {'trait_type': 'trait1', 'value': 'v2'}])
+        # Extra traits are ignored
+        nft(2, [{'trait_type': 'trait0', 'value': 'v0'}, {'trait_type': 'trait1', 'value': 'v0'},
+                {'trait_type': 'Edition', 'value': '2'}])
+        # Not a value of this set, or a trait missing
+        nft(3, [{'trait_type': 'trait0', 'value': 'v9'}, {'trait_type': 'trait1', 'value': 'v0'}])
+        nft(4, [{'trait_type': 'trait0', 'value': 'v0'}])
+        # Another collection
+        nft(5, [{'trait_type': 'trait0', 'value': 'v1'}, {'trait_type': 'trait1', 'value': 'v1'}], collection=None)
+
+        self.assertEqual(existing_combinations(collection, layers), {(1, 2), (0, 0)})
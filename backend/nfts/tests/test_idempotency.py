@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from nfts.idempotency import claim_key, request_fingerprint
+from nfts.models import UploadSession
+
+SESSION_FIELDS = {'original_filename': 'art.png', 'file_size': 1000, 'content_type': 'image/png',
+                  'upload_status': 'uploading'}
+
+
+@override_settings(IDEMPOTENCY_IN_FLIGHT_LEASE=300)
+class ClaimKeyTests(TestCase):
+    def claim(self):
+        return claim_key('key-1', 'fingerprint', **SESSION_FIELDS)
+
+    def test_in_flight_claim_is_kept(self):
+        first, created = self.claim()
+        UploadSession.objects.filter(pk=first.pk).update(upload_status='processing')
+
+        session, created = self.claim()
+        self.assertFalse(created)
+        self.assertEqual(session.pk, first.pk)
+
+    def test_abandoned_claim_is_taken_over(self):
+        first, _ = self.claim()
+        UploadSession.objects.filter(pk=first.pk).update(
+            upload_status='processing', updated_at=timezone.now() - timedelta(seconds=301)
+        )
+
+        session, created = self.claim()
+        self.assertTrue(created)
+        self.assertNotEqual(session.pk, first.pk)
+        first.refresh_from_db()
+        self.assertIsNone(first.idempotency_key)
+        self.assertEqual(first.upload_status, 'failed')
+
+    def test_completed_claim_is_replayed_however_old(self):
+        first, _ = self.claim()
+        UploadSession.objects.filter(pk=first.pk).update(
+            upload_status='completed', updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        session, created = self.claim()
+        self.assertFalse(created)
+        self.assertEqual(session.pk, first.pk)
+
+
+class FingerprintTests(SimpleTestCase):
+    def fingerprint(self, content: bytes) -> str:
+        image = SimpleUploadedFile('art.png', content, content_type='image/png')
+        fingerprint = request_fingerprint({'name': 'Art', 'description': '', 'owner_address': '0x1', 'image': image})
+        self.assertEqual(image.tell(), 0)
+        return fingerprint
+
+    def test_image_content_is_hashed(self):
+        # Same name and size, different pixels
+        self.assertNotEqual(self.fingerprint(b'\x89PNG-a'), self.fingerprint(b'\x89PNG-b'))
+        self.assertEqual(self.fingerprint(b'\x89PNG-a'), self.fingerprint(b'\x89PNG-a'))
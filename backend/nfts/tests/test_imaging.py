@@ -0,0 +1,79 @@
+import struct
+import zlib
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from nfts.imaging import ImageRejected, decoded, jpeg_draft_scale, probe_image
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def png_header_only(width: int, height: int, bit_depth: int = 1, color_type: int = 0) -> bytes:
+    """PNG declaring ``width``x``height`` pixels with (almost) no pixel data behind it"""
+    ihdr = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', ihdr)
+            + png_chunk(b'IDAT', zlib.compress(b'\x00' * 64)) + png_chunk(b'IEND', b''))
+
+
+def encoded(image: Image.Image, image_format: str, **params) -> bytes:
+    output = BytesIO()
+    image.save(output, format=image_format, **params)
+    return output.getvalue()
+
+
+def upload(name: str, content: bytes, content_type: str = 'image/png') -> SimpleUploadedFile:
+    return SimpleUploadedFile(name, content, content_type=content_type)
+
+
+class ProbeTests(SimpleTestCase):
+    def test_huge_png_rejected_from_header(self):
+        with mock.patch.object(ImageFile.ImageFile, 'load', side_effect=AssertionError('decoded')):
+            with self.assertRaises(ImageRejected):
+                probe_image(upload('huge.png', png_header_only(20000, 20000)))
+
+    @override_settings(IMAGE_DECODE_PIXEL_BUDGET=1_000_000)
+    def test_large_jpeg_is_decoded_at_draft_scale(self):
+        probe = probe_image(upload('big.jpg', encoded(Image.new('L', (4096, 4096), 128), 'JPEG'), 'image/jpeg'))
+        self.assertEqual(probe.draft_size, (2048, 2048))
+        self.assertEqual(probe.decode_pixels, 2048 * 2048)
+
+        with decoded(probe) as image:
+            self.assertEqual(image.size, (2048, 2048))
+
+    def test_draft_scale(self):
+        self.assertEqual(jpeg_draft_scale((16384, 16384), (2048, 2048)), 8)
+        self.assertEqual(jpeg_draft_scale((6000, 4000), (2048, 1365)), 2)
+        self.assertEqual(jpeg_draft_scale((3000, 3000), (2048, 2048)), 1)
+
+    @override_settings(IMAGE_MAX_ANIMATION_PIXELS=25_000)
+    def test_animation_frame_pixel_cap(self):
+        frames = [Image.new('RGB', (100, 100), (80 * index, 0, 0)) for index in range(3)]
+        gif = encoded(frames[0], 'GIF', save_all=True, append_images=frames[1:], duration=100, loop=0)
+
+        with self.assertRaisesMessage(ImageRejected, '3 frames'):
+            probe_image(upload('anim.gif', gif, 'image/gif'))
+        self.assertEqual(probe_image(upload('still.gif', encoded(frames[0], 'GIF'), 'image/gif')).frames, 1)
+
+
+class UploadImageValidationTests(TestCase):
+    def post(self, content: bytes):
+        with mock.patch('nfts.views.filebase_service.upload_file_to_filebase', side_effect=AssertionError('uploaded')):
+            return self.client.post(reverse('nfts:upload-image'), {'image': upload('image.png', content)})
+
+    def test_huge_png_is_400(self):
+        response = self.post(png_header_only(20000, 20000))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+    def test_truncated_png_is_400(self):
+        content = encoded(Image.effect_noise((256, 256), 64), 'PNG')
+        response = self.post(content[:len(content) // 2])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
@@ -0,0 +1,155 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from nfts.indexer import BATCH_MINTED_TOPIC, NFT_MINTED_TOPIC, TRANSFER_TOPIC, ZERO_ADDRESS, EventIndexer
+from nfts.models import NFTCollection, NFTMetadata, TokenOwnership
+
+from .stubs import StubChain, abi_string, address_topic, log_entry, nft_fields, word
+
+CONTRACT = '0x' + 'c' * 40
+BUYER = '0x' + 'b' * 40
+COLLECTOR = '0x' + 'd' * 40
+
+
+def batch_minted(to: str, start_token_id: int, quantity: int, block: int, index: int = 0):
+    return log_entry(
+        [BATCH_MINTED_TOPIC, address_topic(to)], '0x' + word(start_token_id) + word(quantity), block, index
+    )
+
+
+def nft_minted(to: str, token_id: int, cid: str, block: int, index: int = 0):
+    return log_entry(
+        [NFT_MINTED_TOPIC, address_topic(to), '0x' + word(token_id)], abi_string(f"ipfs://{cid}"), block, index
+    )
+
+
+def transfer(sender: str, to: str, token_id: int, block: int, index: int):
+    return log_entry(
+        [TRANSFER_TOPIC, address_topic(sender), address_topic(to), '0x' + word(token_id)], '0x', block, index
+    )
+
+
+def sync(chain: StubChain, batch_size: int = 100) -> EventIndexer:
+    """Index ``chain`` until caught up"""
+    indexer = EventIndexer(chain.client(), CONTRACT, confirmations=2, batch_size=batch_size)
+    while indexer.sync_once():
+        pass
+    return indexer
+
+
+class BatchMintedTests(TestCase):
+    def setUp(self):
+        self.collection = NFTCollection.objects.create(name='Drop', creator=BUYER, metadata_root_cid='bafyroot')
+        # Published token ids need not follow row order
+        self.rows = [
+            NFTMetadata.objects.create(**nft_fields(index, collection=self.collection), published_token_id=token_id)
+            for index, token_id in enumerate((6, 5, 7))
+        ]
+        # Added after publishing, so not in the root the batch resolves to
+        self.unpublished = NFTMetadata.objects.create(**nft_fields(8, collection=self.collection))
+        # Not in the collection, so never linked to its batch
+        self.loose = NFTMetadata.objects.create(**nft_fields(9))
+
+    def test_batch_mint_links_rows_by_published_token_id(self):
+        logs = [batch_minted(BUYER, 5, 2, block=10)]
+        logs += [transfer(ZERO_ADDRESS, BUYER, token_id, block=10, index=1 + token_id) for token_id in (5, 6)]
+        sync(StubChain(head=20, logs=logs, token_uris={5: 'ipfs://bafyroot/5', 6: 'ipfs://bafyroot/6'}))
+
+        linked = NFTMetadata.objects.filter(token_id__isnull=False).order_by('token_id')
+        self.assertEqual([(nft.id, nft.token_id) for nft in linked], [(self.rows[1].id, 5), (self.rows[0].id, 6)])
+        self.assertTrue(all(nft.contract_address == CONTRACT and nft.minted_block == 10 for nft in linked))
+        self.assertIsNotNone(linked[0].minted_at)
+        self.assertEqual(
+            dict(TokenOwnership.objects.values_list('token_id', 'nft_id')),
+            {5: self.rows[1].id, 6: self.rows[0].id}
+        )
+
+        response = self.client.get(reverse('nfts:collection-batch-prepare', args=[self.collection.id])).json()
+        self.assertEqual([(item['nft_id'], item['token_id']) for item in response['items']], [(self.rows[2].id, 7)])
+        self.assertEqual((response['start_token_id'], response['base_uri']), (7, 'ipfs://bafyroot/'))
+
+    def test_tokens_outside_the_published_ids_stay_unlinked(self):
+        chain = StubChain(head=20, logs=[batch_minted(BUYER, 7, 3, block=10)], token_uris={7: 'ipfs://bafyroot/7'})
+        sync(chain)
+
+        self.assertEqual(list(NFTMetadata.objects.filter(token_id__isnull=False).values_list('id', 'token_id')),
+                         [(self.rows[2].id, 7)])
+        self.assertIsNone(NFTMetadata.objects.get(id=self.unpublished.id).token_id)
+
+    def test_reindexing_does_not_link_twice(self):
+        chain = StubChain(head=20, logs=[batch_minted(BUYER, 5, 2, block=10)], token_uris={5: 'ipfs://bafyroot/5'})
+        indexer = sync(chain)
+        indexer.reset(0)
+        sync(chain)
+
+        self.assertEqual(NFTMetadata.objects.filter(token_id__isnull=False).count(), 2)
+        self.assertIsNone(NFTMetadata.objects.get(id=self.rows[2].id).token_id)
+
+    def test_batch_outside_any_collection_is_skipped(self):
+        chain = StubChain(head=20, logs=[batch_minted(BUYER, 5, 2, block=10)], token_uris={5: 'ipfs://bafyother/5'})
+        sync(chain)
+
+        self.assertFalse(NFTMetadata.objects.filter(token_id__isnull=False).exists())
+
+
+class ReorgTests(TestCase):
+    def setUp(self):
+        self.first, self.second = [NFTMetadata.objects.create(**nft_fields(index)) for index in range(2)]
+        self.chain = StubChain(head=30, logs=[
+            nft_minted(BUYER, 0, 'bafymeta0', block=3),
+            transfer(ZERO_ADDRESS, BUYER, 0, block=3, index=1),
+            nft_minted(BUYER, 1, 'bafymeta1', block=12),
+            transfer(ZERO_ADDRESS, BUYER, 1, block=12, index=1),
+            transfer(BUYER, COLLECTOR, 0, block=13, index=0),
+        ])
+        # Small batches leave a checkpointed block hash every 5 blocks
+        sync(self.chain, batch_size=5)
+
+    def test_reorg_rewinds_mints_and_owners(self):
+        self.assertEqual(NFTMetadata.objects.get(id=self.second.id).minted_block, 12)
+        self.assertEqual(TokenOwnership.objects.get(token_id=0).owner_address, COLLECTOR)
+
+        # Blocks 11 on are replaced by a fork in which the second mint and the transfer never happened
+        self.chain.reorganize(11)
+        sync(self.chain, batch_size=5)
+
+        second = NFTMetadata.objects.get(id=self.second.id)
+        self.assertIsNone(second.token_id)
+        self.assertIsNone(second.minted_block)
+        self.assertEqual(second.transaction_hash, '')
+        first = NFTMetadata.objects.get(id=self.first.id)
+        self.assertEqual((first.token_id, first.minted_block), (0, 3))
+
+        ownership = TokenOwnership.objects.get()
+        self.assertEqual((ownership.token_id, ownership.owner_address, ownership.block_number), (0, BUYER, 3))
+        self.assertEqual(ownership.nft_id, self.first.id)
+
+    def test_forked_mint_is_relinked(self):
+        self.chain.reorganize(11, [
+            nft_minted(COLLECTOR, 1, 'bafymeta1', block=15),
+            transfer(ZERO_ADDRESS, COLLECTOR, 1, block=15, index=1),
+        ])
+        sync(self.chain, batch_size=5)
+
+        second = NFTMetadata.objects.get(id=self.second.id)
+        self.assertEqual((second.token_id, second.minted_block), (1, 15))
+        self.assertEqual(TokenOwnership.objects.get(token_id=1).owner_address, COLLECTOR)
+        self.assertEqual(TokenOwnership.objects.get(token_id=0).owner_address, BUYER)
+
+
+class NarrowedRangeTests(TestCase):
+    def test_rewind_scans_every_block_when_node_narrows_range(self):
+        chain = StubChain(head=30, max_log_range=4, logs=[
+            nft_minted(BUYER, 0, 'bafymeta0', block=1),
+            transfer(ZERO_ADDRESS, BUYER, 0, block=1, index=1),
+            transfer(BUYER, COLLECTOR, 0, block=8, index=0),
+            transfer(COLLECTOR, BUYER, 0, block=13, index=0),
+        ])
+        sync(chain, batch_size=10)
+        self.assertEqual(TokenOwnership.objects.get(token_id=0).owner_address, BUYER)
+
+        # The backward scan from the fork point is narrowed from its top, so block 8 is not skipped
+        chain.reorganize(11)
+        sync(chain, batch_size=10)
+        ownership = TokenOwnership.objects.get(token_id=0)
+        self.assertEqual((ownership.owner_address, ownership.block_number), (COLLECTOR, 8))
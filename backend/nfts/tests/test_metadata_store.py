@@ -0,0 +1,114 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from nfts import metadata_store
+from nfts.metadata_store import MetadataStore, append_nfts, build
+from nfts.models import NFTMetadata
+
+from .stubs import nft_fields
+
+CONTRACT = '0x' + 'c' * 40
+
+
+class MetadataStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f"{directory}/metadata.store"
+        # Follow rebuilds on every lookup
+        patcher = mock.patch('nfts.metadata_store.REOPEN_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.minted = NFTMetadata.objects.create(**nft_fields(1, contract_address=CONTRACT, token_id=7))
+        self.unminted = NFTMetadata.objects.create(**nft_fields(2))
+        self.assertEqual(build(self.path), 2)
+        self.store = MetadataStore(self.path)
+
+    def name(self, stored) -> str:
+        return json.loads(bytes(stored.metadata))['name']
+
+    def rename(self, nft: NFTMetadata, name: str):
+        NFTMetadata.objects.filter(id=nft.id).update(name=name)
+        self.assertEqual(append_nfts(self.path, [nft.id]), 1)
+
+    def test_build_serves_ids_and_tokens(self):
+        stored = self.store.get(self.minted.id)
+        self.assertEqual((stored.nft_id, stored.token_id, stored.contract_address), (self.minted.id, 7, CONTRACT))
+        self.assertEqual(self.name(stored), 'NFT 1')
+        self.assertEqual(json.loads(bytes(stored.detail))['id'], self.minted.id)
+
+        self.assertIsNone(self.store.get(self.unminted.id).token_id)
+        self.assertEqual(self.store.get_token(CONTRACT.upper().replace('0X', '0x'), 7).nft_id, self.minted.id)
+        self.assertIsNone(self.store.get_token(CONTRACT, 8))
+        self.assertIsNone(self.store.get(999))
+
+    def test_appended_rendering_wins(self):
+        self.assertEqual(self.name(self.store.get(self.minted.id)), 'NFT 1')
+        self.rename(self.minted, 'Renamed')
+        added = NFTMetadata.objects.create(**nft_fields(3, contract_address=CONTRACT, token_id=8))
+        append_nfts(self.path, [added.id])
+
+        self.assertEqual(self.name(self.store.get(self.minted.id)), 'Renamed')
+        self.assertEqual(self.name(self.store.get_token(CONTRACT, 7)), 'Renamed')
+        self.assertEqual(self.store.get_token(CONTRACT, 8).nft_id, added.id)
+
+    def test_rebuild_folds_in_appended_records(self):
+        self.assertIsNotNone(self.store.get(self.minted.id))
+        self.rename(self.minted, 'Renamed')
+        added = NFTMetadata.objects.create(**nft_fields(3))
+        append_nfts(self.path, [added.id])
+
+        self.assertEqual(build(self.path), 3)
+        self.assertEqual(self.name(self.store.get(self.minted.id)), 'Renamed')
+        self.assertEqual(self.store.get(added.id).nft_id, added.id)
+        self.assertEqual(self.store.id_count, 3)
+        # Appending to the rebuilt file still works
+        self.rename(self.minted, 'Renamed again')
+        self.assertEqual(self.name(self.store.get_token(CONTRACT, 7)), 'Renamed again')
+
+    def test_reorg_unlinked_token_is_not_served(self):
+        self.assertIsNotNone(self.store.get_token(CONTRACT, 7))
+        NFTMetadata.objects.filter(id=self.minted.id).update(token_id=None, contract_address='')
+        append_nfts(self.path, [self.minted.id])
+
+        self.assertIsNone(self.store.get_token(CONTRACT, 7))
+        self.assertIsNone(self.store.get(self.minted.id).token_id)
+
+
+class FallbackTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f"{directory}/metadata.store"
+        overrides = override_settings(METADATA_STORE_PATH=self.path)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(setattr, metadata_store, '_store', None)
+
+        self.nft = NFTMetadata.objects.create(**nft_fields(1, contract_address=CONTRACT, token_id=7))
+
+    def assert_served_from_database(self):
+        response = self.client.get(reverse('nfts:nft-detail', args=[self.nft.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'NFT 1')
+        response = self.client.get(reverse('nfts:token-metadata', args=[CONTRACT, 7]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['name'], 'NFT 1')
+
+    def test_missing_file(self):
+        self.assertIsNone(MetadataStore(self.path).get(self.nft.id))
+        self.assert_served_from_database()
+
+    def test_corrupt_file(self):
+        for content in (b'', b'garbage', b'NOTMETA!' + bytes(64)):
+            with open(self.path, 'wb') as corrupt:
+                corrupt.write(content)
+            metadata_store._store = None
+            self.assertIsNone(MetadataStore(self.path).get(self.nft.id))
+            self.assert_served_from_database()
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from nfts.models import NFTMetadata
+from nfts.phash import RELOAD_OVERLAP, PerceptualHashIndex
+
+from .stubs import nft_fields
+
+
+class RefreshTests(TestCase):
+    def setUp(self):
+        self.hashed = [NFTMetadata.objects.create(**nft_fields(index, perceptual_hash=f"{index:016x}"))
+                       for index in range(1, 4)]
+        self.index = PerceptualHashIndex()
+        self.index.refresh()
+
+    def similar(self, hash_hex: str):
+        return [match['nft_id'] for match in self.index.find_similar(hash_hex, 0)]
+
+    def test_backfilled_hash_of_old_row_is_loaded(self):
+        # Created before the index loaded, hashed much later (as backfill_phash does)
+        old = NFTMetadata.objects.create(**nft_fields(9))
+        NFTMetadata.objects.filter(id=old.id).update(updated_at=timezone.now() - timedelta(days=30))
+        self.index.refresh()
+
+        NFTMetadata.objects.filter(id=old.id).update(perceptual_hash='00000000000000ff', updated_at=timezone.now())
+        self.assertEqual(self.similar('00000000000000ff'), [old.id])
+
+    def test_cleared_hash_is_removed(self):
+        NFTMetadata.objects.filter(id=self.hashed[0].id).update(perceptual_hash='', updated_at=timezone.now())
+        self.assertEqual(self.similar(self.hashed[0].perceptual_hash), [])
+        self.assertEqual(len(self.index.index), 2)
+
+    def test_refresh_reads_only_recent_changes(self):
+        NFTMetadata.objects.update(updated_at=timezone.now() - RELOAD_OVERLAP * 2)
+        self.index.loaded_until = timezone.now()
+        with self.assertNumQueries(1):
+            self.index.refresh()
+        # Rows older than the overlap window are not read again
+        NFTMetadata.objects.filter(id=self.hashed[1].id).update(perceptual_hash='00000000000000ff')
+        self.assertEqual(self.similar('00000000000000ff'), [])
@@ -0,0 +1,53 @@
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from nfts.services import filebase_service
+
+
+class PlainS3:
+    """S3 stand-in that stores objects but never reports an IPFS CID"""
+
+    def __init__(self):
+        self.objects = {}
+        self.heads = 0
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+
+    def head_object(self, Bucket, Key):
+        self.heads += 1
+        return {'Metadata': {}, 'ResponseMetadata': {'HTTPHeaders': {}}}
+
+    def get_object(self, Bucket, Key):
+        return {'Body': BytesIO(self.objects[Key])}
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete['Objects']:
+            self.objects.pop(obj['Key'], None)
+
+
+class ProbeCommandTests(SimpleTestCase):
+    def probe(self, s3: PlainS3, **options) -> str:
+        stdout = StringIO()
+        with mock.patch.object(filebase_service, 's3_client', mock.Mock(client=s3)):
+            call_command('test_filebase', sizes='64B', concurrency=1, max_ops=2, stdout=stdout, stderr=StringIO(),
+                         **options)
+        return stdout.getvalue()
+
+    def test_no_cid_heads_once(self):
+        s3 = PlainS3()
+        output = self.probe(s3, no_cid=True)
+        self.assertEqual(s3.heads, 2)
+        self.assertIn('Not measured (--no-cid)', output)
+        self.assertEqual(s3.objects, {})
+
+    def test_timed_out_polls_are_reported_apart_from_head_latency(self):
+        s3 = PlainS3()
+        output = self.probe(s3, cid_timeout=0.05, cid_poll_interval=0.01)
+        self.assertGreater(s3.heads, 2)
+        head_row = next(line for line in output.splitlines() if line.strip().startswith('HEAD'))
+        self.assertEqual(head_row.split()[1], '0')
+        self.assertIn(f"2 objects timed out waiting for a CID after 0.05s; their {s3.heads} HEAD polls", output)
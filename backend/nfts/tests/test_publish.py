@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from nfts.models import NFTCollection, NFTMetadata
+
+from .stubs import nft_fields
+
+
+class CollectionPublishViewTests(TestCase):
+    def setUp(self):
+        self.collection = NFTCollection.objects.create(
+            name='Drop', creator='0x' + 'b' * 40, metadata_root_cid='bafyold',
+            metadata_car_key='collections/1/metadata-bafyold.car'
+        )
+        self.minted = NFTMetadata.objects.create(**nft_fields(0, collection=self.collection, token_id=0))
+        NFTMetadata.objects.create(**nft_fields(1, collection=self.collection))
+        self.url = reverse('nfts:collection-publish', args=[self.collection.id])
+        admin = get_user_model().objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(admin)
+
+        patcher = mock.patch('nfts.services.filebase_service.upload_car')
+        self.upload_car = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requires_admin(self):
+        self.client.logout()
+        response = self.client.post(self.url, {'start_token_id': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.upload_car.assert_not_called()
+
+    def test_minted_collection_is_not_republished(self):
+        response = self.client.post(self.url, {'start_token_id': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.upload_car.assert_not_called()
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.metadata_root_cid, 'bafyold')
+
+    def test_force_republishes(self):
+        response = self.client.post(self.url, {'start_token_id': 1, 'force': True}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.upload_car.assert_called_once()
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.metadata_root_cid, response.json()['metadata_root_cid'])
+        self.assertNotEqual(self.collection.metadata_root_cid, 'bafyold')
+        # The minted NFT keeps its token id; the unminted one is published as the next
+        self.assertEqual(list(self.collection.nftmetadata_set.order_by('id').values_list('published_token_id', flat=True)),
+                         [0, 1])
+        self.assertEqual(response.json()['quantity'], 1)
+
+    def test_unminted_collection_is_republished(self):
+        NFTMetadata.objects.filter(id=self.minted.id).update(token_id=None)
+        response = self.client.post(self.url, {'start_token_id': 0}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
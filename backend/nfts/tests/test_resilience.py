@@ -0,0 +1,172 @@
+import threading
+import time
+from unittest import mock
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+from django.test import SimpleTestCase
+
+from nfts.resilience import CircuitBreaker, FilebaseUnavailableError, ResilientS3Client, RetryPolicy, is_retryable
+
+
+def client_error(code: str, status_code: int, operation: str = 'HeadObject') -> ClientError:
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status_code}}, operation)
+
+
+class FlakyS3:
+    """S3 client whose head_object answers from a script of results and exceptions"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def head_object(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            result = self.script.pop(0) if self.script else {'Metadata': {}}
+        if isinstance(result, Exception):
+            raise result
+        if callable(result):
+            return result()
+        return result
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def resilient(client, attempts: int = 4, threshold: int = 5, hedge_delay: float = 0.0) -> ResilientS3Client:
+    # No backoff delay: full jitter over [0, 0]
+    return ResilientS3Client(client, RetryPolicy(max_attempts=attempts, base_delay=0, max_delay=0),
+                             CircuitBreaker(failure_threshold=threshold, reset_timeout=30), hedge_delay=hedge_delay)
+
+
+class RetryTests(SimpleTestCase):
+    def test_classification(self):
+        self.assertFalse(is_retryable(client_error('404', 404)))
+        self.assertFalse(is_retryable(client_error('AccessDenied', 403)))
+        self.assertTrue(is_retryable(client_error('ServiceUnavailable', 503)))
+        self.assertTrue(is_retryable(client_error('SlowDown', 200)))
+        self.assertTrue(is_retryable(EndpointConnectionError(endpoint_url='https://s3.filebase.com')))
+
+    def test_not_found_is_not_retried(self):
+        s3 = FlakyS3(client_error('404', 404))
+        with self.assertRaises(ClientError):
+            resilient(s3).head_object(Bucket='b', Key='k')
+        self.assertEqual(s3.calls, 1)
+
+    def test_unavailable_and_slow_down_are_retried(self):
+        s3 = FlakyS3(client_error('ServiceUnavailable', 503), client_error('SlowDown', 503), {'Metadata': {'cid': 'bafy'}})
+        self.assertEqual(resilient(s3).head_object(Bucket='b', Key='k'), {'Metadata': {'cid': 'bafy'}})
+        self.assertEqual(s3.calls, 3)
+
+    def test_gives_up_after_max_attempts(self):
+        s3 = FlakyS3(*[EndpointConnectionError(endpoint_url='https://s3.filebase.com')] * 5)
+        with self.assertRaises(EndpointConnectionError):
+            resilient(s3, attempts=3).head_object(Bucket='b', Key='k')
+        self.assertEqual(s3.calls, 3)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('nfts.resilience.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_threshold(self):
+        s3 = FlakyS3(*[client_error('ServiceUnavailable', 503)] * 6)
+        client = resilient(s3, attempts=2, threshold=3)
+        for _ in range(3):
+            with self.assertRaises(ClientError):
+                client.head_object(Bucket='b', Key='k')
+
+        self.clock.now += 10
+        with self.assertRaises(FilebaseUnavailableError) as raised:
+            client.head_object(Bucket='b', Key='k')
+        self.assertEqual(s3.calls, 6)
+        self.assertAlmostEqual(raised.exception.retry_after, 20)
+        self.assertEqual(client.circuit_breaker.snapshot()['state'], CircuitBreaker.OPEN)
+
+    def test_retries_count_as_one_failure(self):
+        s3 = FlakyS3(*[client_error('ServiceUnavailable', 503)] * 8)
+        client = resilient(s3, attempts=4, threshold=5)
+        for _ in range(2):
+            with self.assertRaises(ClientError):
+                client.head_object(Bucket='b', Key='k')
+        self.assertEqual(client.circuit_breaker.snapshot(),
+                         {'state': CircuitBreaker.CLOSED, 'consecutive_failures': 2, 'retry_after': 0.0})
+
+    def test_failed_probe_is_not_retried(self):
+        s3 = FlakyS3(*[client_error('ServiceUnavailable', 503)] * 3)
+        client = resilient(s3, attempts=2, threshold=1)
+        with self.assertRaises(ClientError):
+            client.head_object(Bucket='b', Key='k')
+        self.clock.now += 31
+
+        with self.assertRaises(ClientError):
+            client.head_object(Bucket='b', Key='k')
+        self.assertEqual(s3.calls, 3)
+        self.assertEqual(client.circuit_breaker.snapshot()['state'], CircuitBreaker.OPEN)
+
+    def test_not_found_does_not_count_as_failure(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        client = ResilientS3Client(FlakyS3(*[client_error('404', 404)] * 3), RetryPolicy(base_delay=0), breaker)
+        for _ in range(3):
+            with self.assertRaises(ClientError):
+                client.head_object(Bucket='b', Key='k')
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.CLOSED)
+
+    def test_single_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        self.clock.now += 31
+
+        breaker.before_call()
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(FilebaseUnavailableError):
+            breaker.before_call()
+
+        breaker.record_success()
+        breaker.before_call()
+        self.assertEqual(breaker.snapshot()['state'], CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        for _ in range(5):
+            breaker.record_failure()
+        self.clock.now += 31
+        breaker.before_call()
+        breaker.record_failure()
+
+        with self.assertRaises(FilebaseUnavailableError) as raised:
+            breaker.before_call()
+        self.assertAlmostEqual(raised.exception.retry_after, 30)
+
+
+class HedgedHeadTests(SimpleTestCase):
+    def test_faster_response_wins(self):
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return {'Metadata': {'cid': 'primary'}}
+
+        s3 = FlakyS3(slow, {'Metadata': {'cid': 'hedge'}})
+        client = resilient(s3, hedge_delay=0.05)
+        start = time.monotonic()
+        try:
+            self.assertEqual(client.head_object(Bucket='b', Key='k'), {'Metadata': {'cid': 'hedge'}})
+            self.assertLess(time.monotonic() - start, 2)
+        finally:
+            release.set()
+        self.assertEqual(s3.calls, 2)
+
+    def test_fast_primary_is_not_hedged(self):
+        s3 = FlakyS3({'Metadata': {'cid': 'primary'}})
+        self.assertEqual(resilient(s3, hedge_delay=1).head_object(Bucket='b', Key='k'), {'Metadata': {'cid': 'primary'}})
+        self.assertEqual(s3.calls, 1)
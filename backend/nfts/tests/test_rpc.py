@@ -0,0 +1,157 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from nfts.rpc import BlockCache, ContractReader, JSONRPCClient, RPCError, encode_call
+
+from .stubs import abi_string, word
+
+
+class ScriptedNode:
+    """Stand-in for JSONRPCClient._post answering each request with a function of its payload"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.payloads = []
+
+    def __call__(self, payload):
+        self.payloads.append(payload)
+        return self.respond(payload)
+
+
+def scripted_client(respond) -> JSONRPCClient:
+    client = JSONRPCClient('http://node.invalid')
+    client._post = ScriptedNode(respond)
+    return client
+
+
+def result(request, value):
+    return {'jsonrpc': '2.0', 'id': request['id'], 'result': value}
+
+
+def error(request, message):
+    return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': 3, 'message': message}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BatchTests(SimpleTestCase):
+    calls = [('eth_getBlockByNumber', ['0x1', False]), ('eth_getBlockByNumber', ['0x2', False]),
+             ('eth_getBlockByNumber', ['0x3', False])]
+
+    def test_out_of_order_replies_are_matched_by_id(self):
+        client = scripted_client(lambda batch: [result(request, request['params'][0]) for request in reversed(batch)])
+        self.assertEqual(client.batch(self.calls), ['0x1', '0x2', '0x3'])
+        self.assertEqual(len(client._post.payloads), 1)
+
+    def test_missing_reply(self):
+        client = scripted_client(lambda batch: [result(request, request['params'][0]) for request in batch[::2]])
+        with self.assertRaisesMessage(RPCError, 'no response'):
+            client.batch(self.calls)
+
+        results = client.batch(self.calls, raise_errors=False)
+        self.assertEqual(results[0], '0x1')
+        self.assertIsInstance(results[1], RPCError)
+        self.assertEqual(results[2], '0x3')
+
+    def test_per_slot_errors(self):
+        def respond(batch):
+            return [error(request, 'execution reverted') if request['params'][0] == '0x2' else result(request, 'ok')
+                    for request in batch]
+
+        client = scripted_client(respond)
+        results = client.batch(self.calls, raise_errors=False)
+        self.assertEqual(results[0], 'ok')
+        self.assertIn('execution reverted', str(results[1]))
+        self.assertEqual(results[2], 'ok')
+        with self.assertRaisesMessage(RPCError, 'execution reverted'):
+            client.batch(self.calls)
+
+    def test_node_without_batch_support(self):
+        client = scripted_client(lambda batch: {'jsonrpc': '2.0', 'id': None, 'error': {'message': 'batch unsupported'}})
+        with self.assertRaisesMessage(RPCError, 'batch unsupported'):
+            client.batch(self.calls)
+
+
+class BlockCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('nfts.rpc.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_expire_after_ttl(self):
+        cache = BlockCache(ttl=60)
+        cache.set((1, 'a'), 'value')
+        self.clock.now += 59
+        self.assertEqual(cache.get((1, 'a')), (True, 'value'))
+        self.clock.now += 1
+        self.assertEqual(cache.get((1, 'a')), (False, None))
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_expired_and_oldest_entries_are_evicted(self):
+        cache = BlockCache(ttl=60, max_entries=3)
+        cache.set((1, 'a'), 'a')
+        cache.set((1, 'b'), 'b')
+        self.clock.now += 61
+        cache.set((2, 'c'), 'c')
+        cache.set((2, 'd'), 'd')
+        cache.set((2, 'e'), 'e')
+        # Both expired entries went when the cache overflowed; then the bound holds
+        self.assertEqual(list(cache._entries), [(2, 'c'), (2, 'd'), (2, 'e')])
+        cache.set((2, 'f'), 'f')
+        self.assertEqual(list(cache._entries), [(2, 'd'), (2, 'e'), (2, 'f')])
+
+    def test_head_is_refetched_after_head_ttl(self):
+        cache = BlockCache(head_ttl=2)
+        heights = iter([100, 101])
+        self.assertEqual(cache.head(lambda: next(heights)), 100)
+        self.clock.now += 1
+        self.assertEqual(cache.head(lambda: next(heights)), 100)
+        self.clock.now += 1
+        self.assertEqual(cache.head(lambda: next(heights)), 101)
+
+
+class ContractReaderTests(SimpleTestCase):
+    address = '0x' + 'c' * 40
+
+    def test_reverts_are_returned_and_not_cached(self):
+        def respond(payload):
+            if isinstance(payload, dict):
+                return result(payload, hex(50))
+            replies = []
+            for request in payload:
+                data = request['params'][0]['data']
+                if data == encode_call('tokenURI', 2):
+                    replies.append(error(request, 'execution reverted: nonexistent token'))
+                elif data == encode_call('tokenURI', 1):
+                    replies.append(result(request, abi_string('ipfs://bafyroot/1')))
+                else:
+                    replies.append(result(request, '0x' + word(7)))
+            return replies
+
+        client = scripted_client(respond)
+        reader = ContractReader(client, self.address, BlockCache())
+        self.assertEqual(reader.token_uris([1, 2]), {1: 'ipfs://bafyroot/1', 2: None})
+        self.assertEqual(reader.read([('totalSupply',)])['results'], [7])
+
+        reader.token_uris([1, 2])
+        last_batch = client._post.payloads[-1]
+        self.assertEqual([request['params'][0]['data'] for request in last_batch], [encode_call('tokenURI', 2)])
+
+
+class ContractStatusViewTests(SimpleTestCase):
+    def test_quantity_must_be_at_least_one(self):
+        reader = mock.Mock()
+        with mock.patch('nfts.views.get_contract_reader', return_value=reader):
+            for quantity in ('0', '-1'):
+                response = self.client.get(reverse('nfts:contract-status'), {'quantity': quantity})
+                self.assertEqual(response.status_code, 400)
+        reader.status.assert_not_called()
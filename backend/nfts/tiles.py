@@ -0,0 +1,233 @@
+"""
+Deep-zoom tile pyramids for high-resolution uploads.
+
+Uploads are scaled down to MAX_OUTPUT_SIZE for the NFT image. With
+``deep_zoom`` the full-resolution decode is also cut into a Deep Zoom (DZI)
+pyramid, so viewers fetch only the tiles on screen.
+
+The pyramid is built in one pass over the decoded image, one tile row at a
+time. Full-resolution tiles are cut from the decode itself; every lower
+level keeps just the rows of its current tile row, fed by halving the rows
+of the level above, so memory beyond the decode is about one tile row per
+level instead of a copy of every level.
+
+Tiles are stored under ``tiles/<sha256 of the upload>/`` in the standard
+layout (``image.dzi`` next to ``image_files/<level>/<col>_<row>.jpeg``).
+A key's content never changes, so tiles are served as immutable, and
+identical uploads share one pyramid, so the cleanup_uploads janitor never
+deletes them.
+"""
+import math
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+from django.conf import settings
+from PIL import Image
+
+from .imaging import MAX_OUTPUT_SIZE, ImageProbe, ImageRejected
+
+# Bucket namespace of every pyramid; a pyramid is uploaded before the NFT row linking it exists
+TILES_PREFIX = 'tiles/'
+
+TILE_FORMAT = 'jpeg'
+TILE_CONTENT_TYPE = 'image/jpeg'
+DZI_NAMESPACE = 'http://schemas.microsoft.com/deepzoom/2008'
+
+# Tile keys are content-addressed, so their responses never change
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# (level, column, row, tile image)
+TileSink = Callable[[int, int, int, Image.Image], None]
+
+
+def wants_pyramid(probe: ImageProbe) -> bool:
+    """Whether a pyramid adds anything over the scaled-down NFT image"""
+    return not probe.is_animated and (probe.width > MAX_OUTPUT_SIZE[0] or probe.height > MAX_OUTPUT_SIZE[1])
+
+
+def plan_full_decode(probe: ImageProbe):
+    """Replace a reduced-scale JPEG decode plan with a full-resolution one"""
+    probe.draft_size = None
+    probe.decode_pixels = probe.pixels
+    if probe.decode_pixels > settings.IMAGE_MAX_PIXELS:
+        raise ImageRejected(
+            f"Image is {probe.width}x{probe.height}; deep zoom is limited to "
+            f"{settings.IMAGE_MAX_PIXELS / 1e6:.0f} megapixels."
+        )
+
+
+def new_pyramid(source_hash: str, size: Tuple[int, int]) -> Dict[str, Any]:
+    """Pyramid description stored on the NFT"""
+    return {
+        'prefix': f"{TILES_PREFIX}{source_hash}/",
+        'width': size[0],
+        'height': size[1],
+        'tile_size': settings.DEEP_ZOOM_TILE_SIZE,
+        'overlap': settings.DEEP_ZOOM_TILE_OVERLAP,
+        'format': TILE_FORMAT,
+    }
+
+
+def level_count(pyramid: Dict[str, Any]) -> int:
+    """Levels from 1x1 (level 0) up to full resolution"""
+    return math.ceil(math.log2(max(pyramid['width'], pyramid['height']))) + 1
+
+
+def level_size(pyramid: Dict[str, Any], level: int) -> Tuple[int, int]:
+    scale = 2 ** (level_count(pyramid) - 1 - level)
+    return -(-pyramid['width'] // scale), -(-pyramid['height'] // scale)
+
+
+def tile_grid(pyramid: Dict[str, Any], level: int) -> Tuple[int, int]:
+    """Columns and rows of tiles at a level"""
+    width, height = level_size(pyramid, level)
+    return -(-width // pyramid['tile_size']), -(-height // pyramid['tile_size'])
+
+
+def has_tile(pyramid: Dict[str, Any], level: int, column: int, row: int) -> bool:
+    if not 0 <= level < level_count(pyramid):
+        return False
+    columns, rows = tile_grid(pyramid, level)
+    return column < columns and row < rows
+
+
+def descriptor_key(pyramid: Dict[str, Any]) -> str:
+    return f"{pyramid['prefix']}image.dzi"
+
+
+def tile_key(pyramid: Dict[str, Any], level: int, column: int, row: int) -> str:
+    return f"{pyramid['prefix']}image_files/{level}/{column}_{row}.{pyramid['format']}"
+
+
+def descriptor_xml(pyramid: Dict[str, Any]) -> bytes:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns={quoteattr(DZI_NAMESPACE)} Format={quoteattr(pyramid["format"])} '
+        f'Overlap="{pyramid["overlap"]}" TileSize="{pyramid["tile_size"]}">'
+        f'<Size Width="{pyramid["width"]}" Height="{pyramid["height"]}"/></Image>\n'
+    ).encode('utf-8')
+
+
+def encode_tile(tile: Image.Image) -> bytes:
+    output = BytesIO()
+    tile.save(output, format='JPEG', quality=settings.DEEP_ZOOM_TILE_QUALITY)
+    return output.getvalue()
+
+
+def flatten_rgb(strip: Image.Image) -> Image.Image:
+    """Part of the source as RGB, with transparency flattened onto white like the NFT image"""
+    if strip.mode == 'P':
+        strip = strip.convert('RGBA')
+    if strip.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', strip.size, (255, 255, 255))
+        background.paste(strip, mask=strip.getchannel('A'))
+        return background
+    return strip if strip.mode == 'RGB' else strip.convert('RGB')
+
+
+def stack_rows(upper: Image.Image, lower: Image.Image) -> Image.Image:
+    combined = Image.new(upper.mode, (upper.width, upper.height + lower.height))
+    combined.paste(upper, (0, 0))
+    combined.paste(lower, (0, upper.height))
+    return combined
+
+
+class PyramidLevel:
+    """Rows of one level, cut into tiles one tile row at a time and halved for the level below"""
+
+    def __init__(self, pyramid: Dict[str, Any], level: int, sink: TileSink, below: Optional['PyramidLevel']):
+        self.level = level
+        self.width, self.height = level_size(pyramid, level)
+        self.tile_size = pyramid['tile_size']
+        self.overlap = pyramid['overlap']
+        self.columns, _ = tile_grid(pyramid, level)
+        self.sink = sink
+        self.below = below
+        self.rows: Optional[Image.Image] = None  # level rows [self.top, self.top + rows.height)
+        self.top = 0
+        self.next_row = 0
+        self.carry: Optional[Image.Image] = None  # odd row waiting for its pair
+
+    def push(self, strip: Image.Image):
+        """Append the next rows of this level"""
+        self.rows = strip if self.rows is None else stack_rows(self.rows, strip)
+        while self.next_row * self.tile_size < self.height:
+            bottom = min((self.next_row + 1) * self.tile_size + self.overlap, self.height)
+            if bottom > self.top + self.rows.height:
+                break
+            self.cut_tile_row(bottom)
+        self.pass_down(strip)
+
+    def cut_tile_row(self, bottom: int):
+        top = max(self.next_row * self.tile_size - self.overlap, 0)
+        for column in range(self.columns):
+            left = max(column * self.tile_size - self.overlap, 0)
+            right = min((column + 1) * self.tile_size + self.overlap, self.width)
+            self.sink(self.level, column, self.next_row,
+                      self.rows.crop((left, top - self.top, right, bottom - self.top)))
+        self.next_row += 1
+        if self.next_row * self.tile_size >= self.height:
+            self.rows = None
+            return
+
+        # Drop the rows the next tile row (with its overlap) no longer needs
+        keep_from = self.next_row * self.tile_size - self.overlap
+        if keep_from > self.top:
+            self.rows = self.rows.crop((0, keep_from - self.top, self.width, self.rows.height))
+            self.top = keep_from
+
+    def pass_down(self, strip: Image.Image):
+        if self.below is None:
+            return
+        if self.carry is not None:
+            strip = stack_rows(self.carry, strip)
+            self.carry = None
+        if strip.height % 2:
+            self.carry = strip.crop((0, strip.height - 1, strip.width, strip.height))
+            strip = strip.crop((0, 0, strip.width, strip.height - 1))
+        if strip.height:
+            # 2x2 box filter; odd widths keep ceil(width / 2) columns, as level_size expects
+            self.below.push(strip.reduce(2))
+
+    def finish(self):
+        if self.carry is not None:
+            self.below.push(self.carry.reduce(2))
+            self.carry = None
+        if self.below is not None:
+            self.below.finish()
+
+
+class SourceLevel(PyramidLevel):
+    """Full-resolution level: the decode is already in memory, so tiles are cut from it directly"""
+
+    def __init__(self, image: Image.Image, pyramid: Dict[str, Any], sink: TileSink,
+                 below: Optional[PyramidLevel]):
+        super().__init__(pyramid, level_count(pyramid) - 1, sink, below)
+        self.image = image
+
+    def run(self):
+        for row in range(-(-self.height // self.tile_size)):
+            top = row * self.tile_size
+            for column in range(self.columns):
+                left = column * self.tile_size
+                self.sink(self.level, column, row, flatten_rgb(self.image.crop((
+                    max(left - self.overlap, 0), max(top - self.overlap, 0),
+                    min(left + self.tile_size + self.overlap, self.width),
+                    min(top + self.tile_size + self.overlap, self.height),
+                ))))
+            box = (0, top, self.width, min(top + self.tile_size, self.height))
+            if self.image.mode == 'RGB' and self.below is not None and self.tile_size % 2 == 0:
+                # Halve straight from the decode; only the last strip can have an odd height
+                self.below.push(self.image.reduce(2, box))
+            else:
+                self.pass_down(flatten_rgb(self.image.crop(box)))
+        self.finish()
+
+
+def build_pyramid(image: Image.Image, pyramid: Dict[str, Any], sink: TileSink):
+    """Cut a decoded full-resolution image into every tile of ``pyramid``, in one pass"""
+    below = None
+    for level in range(level_count(pyramid) - 1):
+        below = PyramidLevel(pyramid, level, sink, below)
+    SourceLevel(image, pyramid, sink, below).run()
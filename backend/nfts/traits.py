@@ -0,0 +1,99 @@
+"""
+Denormalized NFT attributes.
+
+NFTAttribute rows remain the normalized record, but every NFT also carries
+its attributes in ``NFTMetadata.attributes_json``, in NFTAttributeSerializer's
+shape, so reads need no join and a trait filter is a single JSON
+containment test (``@>`` on a GIN-indexed jsonb column in PostgreSQL).
+The jsonb_path_ops index hashes trait types and values separately, so a
+value shared by several trait types (say "None") narrows less and leaves
+more rows to recheck. Write attributes with ``normalize`` + ``create_attribute_rows``, or call
+``sync_attributes_json`` after editing rows directly; both keep the two in
+step and move ``updated_at`` so cached responses are revalidated.
+"""
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from django.db import connections
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from . import metadata_store
+from .models import NFTAttribute, NFTMetadata
+
+# Keys of each stored attribute, in serializer output order
+ATTRIBUTE_FIELDS = ('trait_type', 'value', 'display_type')
+
+
+def normalize(attributes: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Request attributes as stored: string values, empty display_type when absent"""
+    return [{
+        'trait_type': attribute['trait_type'],
+        'value': str(attribute['value']),
+        'display_type': attribute.get('display_type', '') or '',
+    } for attribute in attributes]
+
+
+def ordered(attributes: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Stored attributes with their keys in output order (jsonb does not keep key order)"""
+    return [{field: attribute.get(field, '') for field in ATTRIBUTE_FIELDS} for attribute in attributes]
+
+
+def token_attributes(attributes: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Stored attributes as in uploaded token metadata, with display_type only when set"""
+    result = []
+    for attribute in attributes:
+        trait = {'trait_type': attribute['trait_type'], 'value': attribute['value']}
+        if attribute.get('display_type'):
+            trait['display_type'] = attribute['display_type']
+        result.append(trait)
+    return result
+
+
+def create_attribute_rows(nft: NFTMetadata) -> List[NFTAttribute]:
+    """NFTAttribute rows for an NFT created with ``attributes_json`` already set"""
+    return NFTAttribute.objects.bulk_create([
+        NFTAttribute(nft=nft, **attribute) for attribute in nft.attributes_json
+    ])
+
+
+def sync_attributes_json(nft_ids: Sequence[int]) -> int:
+    """Rebuild ``attributes_json`` of the given NFTs from their NFTAttribute rows"""
+    attributes: Dict[int, List[Dict[str, str]]] = {nft_id: [] for nft_id in nft_ids}
+    for nft_id, *values in NFTAttribute.objects.filter(
+        nft_id__in=nft_ids
+    ).order_by('id').values_list('nft_id', *ATTRIBUTE_FIELDS):
+        attributes[nft_id].append(dict(zip(ATTRIBUTE_FIELDS, values)))
+
+    now = timezone.now()
+    nfts = [NFTMetadata(id=nft_id, attributes_json=values, updated_at=now) for nft_id, values in attributes.items()]
+    NFTMetadata.objects.bulk_update(nfts, ['attributes_json', 'updated_at'], batch_size=500)
+    metadata_store.refresh_nfts(attributes)
+    return len(nfts)
+
+
+def parse_trait_filters(raw: Iterable[str]) -> List[Tuple[str, str]]:
+    """``trait=<trait_type>:<value>`` query parameters as (trait_type, value) pairs"""
+    traits = []
+    for item in raw:
+        trait_type, separator, value = item.partition(':')
+        if not separator or not trait_type:
+            raise ValueError(f"Invalid trait filter {item!r}; expected trait_type:value")
+        traits.append((trait_type, value))
+    return traits
+
+
+def filter_traits(queryset: QuerySet, traits: Sequence[Tuple[str, str]]) -> QuerySet:
+    """NFTs having every (trait_type, value) in ``traits``"""
+    if not traits:
+        return queryset
+    if connections[queryset.db].features.supports_json_field_contains:
+        # One containment test for all traits, answered by the GIN index on PostgreSQL
+        return queryset.filter(attributes_json__contains=[
+            {'trait_type': trait_type, 'value': value} for trait_type, value in traits
+        ])
+    # SQLite/Oracle cannot test JSON containment; fall back to the attribute rows
+    for trait_type, value in traits:
+        queryset = queryset.filter(Exists(
+            NFTAttribute.objects.filter(nft=OuterRef('pk'), trait_type=trait_type, value=value)
+        ))
+    return queryset
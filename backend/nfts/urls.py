@@ -12,6 +12,27 @@ urlpatterns = [
     # Main NFT endpoints
     path('create-nft/', views.CreateNFTView.as_view(), name='create-nft'),
     path('upload-image/', views.UploadImageView.as_view(), name='upload-image'),
+    
+    # Resumable chunked uploads
+    path('uploads/', views.ChunkedUploadInitView.as_view(), name='upload-init'),
+    path('uploads/<uuid:session_id>/', views.UploadSessionStatusView.as_view(), name='upload-status'),
+    path('uploads/<uuid:session_id>/chunk/', views.ChunkedUploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:session_id>/finalize/', views.ChunkedUploadFinalizeView.as_view(), name='upload-finalize'),
     path('nfts/', views.NFTMetadataListView.as_view(), name='nft-list'),
     path('nfts/<int:id>/', views.NFTMetadataDetailView.as_view(), name='nft-detail'),
+    path('nfts/<int:id>/tiles.dzi', views.NFTTileDescriptorView.as_view(), name='nft-tiles-descriptor'),
+    path('nfts/<int:id>/tiles_files/<int:level>/<int:column>_<int:row>.<str:extension>',
+         views.NFTTileView.as_view(), name='nft-tile'),
+    path('tokens/<str:contract_address>/<int:token_id>/', views.TokenMetadataView.as_view(), name='token-metadata'),
+    path('stats/', views.StatsView.as_view(), name='stats'),
+    path('images/similar/', views.SimilarImagesView.as_view(), name='similar-images'),
+    path('wallets/<str:address>/nfts/', views.WalletNFTsView.as_view(), name='wallet-nfts'),
+    path('contract/status/', views.ContractStatusView.as_view(), name='contract-status'),
+    path('collections/<int:collection_id>/batch-prepare/', views.CollectionBatchPrepareView.as_view(), name='collection-batch-prepare'),
+    path('collections/<int:collection_id>/publish/', views.CollectionPublishView.as_view(), name='collection-publish'),
+
+    # Admin-only profiling endpoints
+    path('profiles/', views.ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', views.ProfileDetailView.as_view(), name='profile-detail'),
+    path('profiles/<str:profile_id>/download/', views.ProfileDownloadView.as_view(), name='profile-download'),
 ]
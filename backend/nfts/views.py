@@ -1,26 +1,49 @@
 from rest_framework import views, status, generics
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.permissions import IsAdminUser
 from django.conf import settings
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from botocore.exceptions import ClientError
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import connection
+from django.db.models import Q
+import re
 import uuid
 import time
 import logging
 import json
 
-from .models import NFTMetadata, NFTAttribute, UploadSession, NFTCollection
+from .models import NFTMetadata, UploadSession, NFTCollection, TokenOwnership
 from .services import filebase_service
+from .resilience import FilebaseUnavailableError
+from .phash import DuplicateImageError, dhash, get_phash_index
+from .imaging import ImageRejected, decoded
+from .rpc import RPCError, get_contract_reader, predict_next_token_id
+from . import idempotency
+from . import chunked
+from . import stats
+from . import conditional
+from . import tiles
+from . import traits
+from .publish import AlreadyPublishedError, publish_collection
+from .admission import AdmissionControlMixin
+from .db_router import ReplicaReadMixin
+from .fast_serializers import NFT_FIELDS, FastJSONRenderer, nft_values, parse_fields, serialize_rows
+from .metadata_store import get_metadata_store, refresh_nfts, token_metadata_json
+from .profiling import get_profile_store
 from .serializers import (
     ImageUploadSerializer,
     MetadataUploadSerializer, 
     NFTMetadataSerializer,
     NFTCollectionSerializer,
     UploadSessionSerializer,
-    CreateNFTSerializer
+    CreateNFTSerializer,
+    ChunkedUploadInitSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -45,11 +68,15 @@ def health_check(request):
             settings.FILEBASE_BUCKET_NAME
         ])
         
+        # Circuit breaker state is per worker process
+        ipfs_circuit = filebase_service.s3_client.circuit_breaker.snapshot()
+        
         return JsonResponse({
-            'status': 'healthy',
+            'status': 'degraded' if ipfs_circuit['state'] == 'open' else 'healthy',
             'timestamp': timezone.now().isoformat(),
             'services': {
-                'ipfs': 'configured' if ipfs_configured else 'not_configured'
+                'ipfs': 'configured' if ipfs_configured else 'not_configured',
+                'ipfs_circuit': ipfs_circuit
             },
             'environment': 'production' if not settings.DEBUG else 'development'
         })
@@ -61,6 +88,38 @@ def health_check(request):
             'timestamp': timezone.now().isoformat()
         }, status=500)
 
+def filebase_unavailable_response(error, **extra):
+    """503 response telling the client when Filebase may be retried"""
+    response = Response({
+        'success': False,
+        **extra,
+        'error': 'IPFS storage temporarily unavailable',
+        'details': str(error)
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(max(int(error.retry_after), 1))
+    return response
+
+
+def duplicate_image_response(error, **extra):
+    """409 for an upload refused as a near-duplicate of existing NFT images"""
+    return Response({
+        'success': False,
+        'error': 'Image is a near-duplicate of an existing NFT',
+        'details': str(error),
+        'matches': error.matches,
+        **extra
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def invalid_image_response(error, **extra):
+    """400 for an upload whose pixel data could not be decoded"""
+    return Response({
+        'success': False,
+        **extra,
+        'error': 'Invalid image data',
+        'details': str(error)
+    }, status=status.HTTP_400_BAD_REQUEST)
+
 # Simple image upload test view  
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -90,7 +149,7 @@ def upload_image_test(request):
         }, status=500)
 
 
-class UploadImageView(views.APIView):
+class UploadImageView(AdmissionControlMixin, views.APIView):
     """API endpoint for uploading images to IPFS via Filebase"""
     parser_classes = [MultiPartParser, FormParser]
     
@@ -119,6 +178,18 @@ class UploadImageView(views.APIView):
                     **upload_result
                 }, status=status.HTTP_201_CREATED)
                 
+            except FilebaseUnavailableError as e:
+                logger.warning(f"Image upload rejected, Filebase unavailable: {str(e)}")
+                return filebase_unavailable_response(e)
+                
+            except DuplicateImageError as e:
+                logger.info(f"Image upload rejected as duplicate: {str(e)}")
+                return duplicate_image_response(e)
+                
+            except ImageRejected as e:
+                logger.info(f"Image upload rejected: {str(e)}")
+                return invalid_image_response(e)
+                
             except Exception as e:
                 logger.error(f"Image upload failed: {str(e)}")
                 
@@ -138,7 +209,121 @@ class UploadImageView(views.APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CreateNFTView(views.APIView):
+def run_create_nft_pipeline(upload_session, data, start_time):
+    """Upload image + metadata to IPFS and record the NFT for an upload session"""
+    session_id = str(upload_session.session_id)
+    uploaded_keys = []
+    
+    try:
+        # Upload complete NFT (image + metadata)
+        upload_result = filebase_service.upload_complete_nft(
+            name=data['name'],
+            description=data['description'],
+            attributes=data.get('attributes', []),
+            image_file=data['image'],
+            deep_zoom=data.get('deep_zoom', False),
+            uploaded_keys=uploaded_keys
+        )
+        
+        # Create NFT metadata record
+        nft_metadata = NFTMetadata.objects.create(
+            name=data['name'],
+            description=data['description'],
+            image_ipfs_hash=upload_result['image_ipfs_hash'],
+            image_ipfs_url=upload_result['image_ipfs_url'],
+            metadata_ipfs_hash=upload_result['metadata_ipfs_hash'],
+            metadata_ipfs_url=upload_result['metadata_ipfs_url'],
+            original_filename=upload_result['original_filename'],
+            file_size=upload_result['file_size'],
+            content_type=upload_result['content_type'],
+            perceptual_hash=upload_result['perceptual_hash'],
+            blurhash=upload_result['blurhash'],
+            dominant_colors=upload_result['dominant_colors'],
+            tile_pyramid=upload_result['tile_pyramid'],
+            attributes_json=traits.normalize(data.get('attributes', [])),
+            owner_address=data['owner_address'],
+            collection_id=data.get('collection_id'),
+            image_object_key=upload_result['image_object_key'],
+            metadata_object_key=upload_result['metadata_object_key']
+        )
+        
+        # Create attributes
+        traits.create_attribute_rows(nft_metadata)
+        refresh_nfts([nft_metadata.id])
+        
+        execution_time = time.time() - start_time
+        logger.info(f"NFT creation completed in {execution_time:.2f}s")
+        
+        response_data = {
+            'success': True,
+            'session_id': session_id,
+            'nft_id': nft_metadata.id,
+            'execution_time': execution_time,
+            **upload_result
+        }
+        if nft_metadata.tile_pyramid:
+            response_data['deep_zoom_url'] = reverse('nfts:nft-tiles-descriptor', args=[nft_metadata.id])
+        
+        # Update upload session
+        upload_session.upload_status = 'completed'
+        upload_session.nft_metadata = nft_metadata
+        upload_session.progress_percentage = 100.0
+        upload_session.response_data = response_data
+        upload_session.save()
+        
+        stats.record_upload_completed(nft_metadata, execution_time)
+        
+        return Response(response_data, status=status.HTTP_201_CREATED)
+        
+    except FilebaseUnavailableError as e:
+        upload_session.upload_status = 'failed'
+        upload_session.orphaned_object_keys = uploaded_keys
+        upload_session.error_message = str(e)
+        upload_session.save()
+        stats.record_upload_failed(upload_session)
+        
+        logger.warning(f"NFT creation rejected, Filebase unavailable: {str(e)}")
+        return filebase_unavailable_response(e, session_id=session_id)
+        
+    except DuplicateImageError as e:
+        upload_session.upload_status = 'failed'
+        upload_session.orphaned_object_keys = uploaded_keys
+        upload_session.error_message = str(e)
+        upload_session.save()
+        stats.record_upload_failed(upload_session)
+        
+        logger.info(f"NFT creation rejected as duplicate: {str(e)}")
+        return duplicate_image_response(e, session_id=session_id)
+        
+    except ImageRejected as e:
+        upload_session.upload_status = 'failed'
+        upload_session.orphaned_object_keys = uploaded_keys
+        upload_session.error_message = str(e)
+        upload_session.save()
+        stats.record_upload_failed(upload_session)
+        
+        logger.info(f"NFT creation rejected, invalid image: {str(e)}")
+        return invalid_image_response(e, session_id=session_id)
+        
+    except Exception as e:
+        # Update upload session with error
+        upload_session.upload_status = 'failed'
+        upload_session.orphaned_object_keys = uploaded_keys
+        upload_session.error_message = str(e)
+        upload_session.save()
+        stats.record_upload_failed(upload_session)
+        
+        logger.error(f"NFT creation failed: {str(e)}")
+        
+        return Response({
+            'success': False,
+            'session_id': session_id,
+            'error': 'Failed to create NFT',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CreateNFTView(AdmissionControlMixin, views.APIView):
     """API endpoint for creating complete NFT (image + metadata) in one request"""
     parser_classes = [MultiPartParser, FormParser]
     
@@ -171,80 +356,35 @@ class CreateNFTView(views.APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             data = serializer.validated_data
+            session_fields = {
+                'session_id': session_id,
+                'original_filename': data['image'].name,
+                'file_size': data['image'].size,
+                'content_type': data['image'].content_type,
+                'owner_address': data['owner_address'],
+                'collection_id': data.get('collection_id'),
+                'upload_status': 'uploading'
+            }
             
-            # Create upload session
-            upload_session = UploadSession.objects.create(
-                session_id=session_id,
-                original_filename=data['image'].name,
-                file_size=data['image'].size,
-                content_type=data['image'].content_type,
-                upload_status='uploading'
-            )
-            
-            try:
-                # Upload complete NFT (image + metadata)
-                upload_result = filebase_service.upload_complete_nft(
-                    name=data['name'],
-                    description=data['description'],
-                    attributes=data.get('attributes', []),
-                    image_file=data['image']
-                )
+            # Create upload session, or attach to the one owning the Idempotency-Key
+            idempotency_key = request.META.get(idempotency.IDEMPOTENCY_HEADER, '').strip()
+            if idempotency_key:
+                if len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+                    return Response({
+                        'success': False,
+                        'error': f'Idempotency-Key must be at most {idempotency.MAX_KEY_LENGTH} characters'
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 
-                # Create NFT metadata record
-                nft_metadata = NFTMetadata.objects.create(
-                    name=data['name'],
-                    description=data['description'],
-                    image_ipfs_hash=upload_result['image_ipfs_hash'],
-                    image_ipfs_url=upload_result['image_ipfs_url'],
-                    metadata_ipfs_hash=upload_result['metadata_ipfs_hash'],
-                    metadata_ipfs_url=upload_result['metadata_ipfs_url'],
-                    original_filename=upload_result['original_filename'],
-                    file_size=upload_result['file_size'],
-                    content_type='image/jpeg',
-                    owner_address=data['owner_address'],
-                    collection_id=data.get('collection_id')
+                fingerprint = idempotency.request_fingerprint(data)
+                upload_session, created = idempotency.claim_key(
+                    idempotency_key, fingerprint, **session_fields
                 )
-                
-                # Create attributes
-                for attr in data.get('attributes', []):
-                    NFTAttribute.objects.create(
-                        nft=nft_metadata,
-                        trait_type=attr['trait_type'],
-                        value=str(attr['value']),
-                        display_type=attr.get('display_type', '')
-                    )
-                
-                # Update upload session
-                upload_session.upload_status = 'completed'
-                upload_session.nft_metadata = nft_metadata
-                upload_session.progress_percentage = 100.0
-                upload_session.save()
-                
-                execution_time = time.time() - start_time
-                logger.info(f"NFT creation completed in {execution_time:.2f}s")
-                
-                return Response({
-                    'success': True,
-                    'session_id': session_id,
-                    'nft_id': nft_metadata.id,
-                    'execution_time': execution_time,
-                    **upload_result
-                }, status=status.HTTP_201_CREATED)
-                
-            except Exception as e:
-                # Update upload session with error
-                upload_session.upload_status = 'failed'
-                upload_session.error_message = str(e)
-                upload_session.save()
-                
-                logger.error(f"NFT creation failed: {str(e)}")
-                
-                return Response({
-                    'success': False,
-                    'session_id': session_id,
-                    'error': 'Failed to create NFT',
-                    'details': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                if not created:
+                    return self._replay(upload_session, fingerprint)
+            else:
+                upload_session = UploadSession.objects.create(**session_fields)
+            
+            return run_create_nft_pipeline(upload_session, data, start_time)
                 
         except Exception as e:
             logger.error(f"Unexpected error in NFT creation: {str(e)}")
@@ -255,15 +395,807 @@ class CreateNFTView(views.APIView):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _replay(self, upload_session, fingerprint):
+        """Answer a repeated Idempotency-Key from the session that owns it"""
+        if upload_session.request_fingerprint != fingerprint:
+            return Response({
+                'success': False,
+                'error': 'Idempotency-Key was already used with a different request'
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        
+        upload_session = idempotency.wait_for_completion(upload_session)
+        session_id = str(upload_session.session_id)
+        
+        if upload_session.upload_status == 'completed' and upload_session.response_data:
+            response = Response(upload_session.response_data, status=status.HTTP_201_CREATED)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        
+        if upload_session.upload_status == 'failed':
+            return Response({
+                'success': False,
+                'session_id': session_id,
+                'error': 'Failed to create NFT',
+                'details': upload_session.error_message
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        response = Response({
+            'success': False,
+            'session_id': session_id,
+            'error': 'A request with this Idempotency-Key is still in progress'
+        }, status=status.HTTP_409_CONFLICT)
+        response['Retry-After'] = str(max(int(settings.IDEMPOTENCY_POLL_INTERVAL), 1))
+        return response
+
+
+class ChunkedUploadInitView(views.APIView):
+    """API endpoint for starting a resumable chunked upload"""
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    
+    def post(self, request):
+        """Create an upload session that chunks can be sent to"""
+        serializer = ChunkedUploadInitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'error': 'Invalid upload data',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        upload_session = UploadSession.objects.create(
+            original_filename=data['filename'],
+            file_size=data['file_size'],
+            content_type=data['content_type'],
+            upload_status='uploading'
+        )
+        chunked.create_partial(upload_session.session_id)
+        
+        return Response({
+            'success': True,
+            'session_id': str(upload_session.session_id),
+            'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+            'max_chunk_size': settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE,
+            'bytes_uploaded': 0
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionStatusView(generics.RetrieveAPIView):
+    """API endpoint for checking upload progress (and the offset to resume from)"""
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    lookup_field = 'session_id'
 
-class NFTMetadataListView(generics.ListAPIView):
-    """API endpoint for listing NFT metadata"""
+
+class ChunkedUploadChunkView(views.APIView):
+    """API endpoint for writing one chunk of a resumable upload at a byte offset"""
+    
+    def put(self, request, session_id):
+        """Append raw request body at the offset given by the Upload-Offset header"""
+        upload_session = UploadSession.objects.filter(session_id=session_id).first()
+        if upload_session is None:
+            return Response({
+                'success': False,
+                'error': 'Upload session not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if upload_session.upload_status != 'uploading':
+            return Response({
+                'success': False,
+                'error': f'Upload session is {upload_session.upload_status}'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        # Sessions of one-shot create-nft/ uploads have no partial file, and the janitor removes abandoned ones
+        if not chunked.has_partial(session_id):
+            return self._not_chunked()
+        
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'Upload-Offset and Content-Length headers are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Resuming clients must continue exactly where the server left off
+        if offset != upload_session.bytes_uploaded:
+            return self._offset_conflict(upload_session)
+        
+        if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({
+                'success': False,
+                'error': f'Chunk size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if offset + length > upload_session.file_size:
+            return Response({
+                'success': False,
+                'error': 'Chunk extends past the declared file size'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            received = chunked.write_chunk(session_id, offset, request.stream, length)
+        except FileNotFoundError:
+            return self._not_chunked()
+        
+        # Only advance if no concurrent request moved the offset meanwhile
+        bytes_uploaded = offset + received
+        updated = UploadSession.objects.filter(
+            pk=upload_session.pk,
+            upload_status='uploading',
+            bytes_uploaded=offset
+        ).update(
+            bytes_uploaded=bytes_uploaded,
+            progress_percentage=round(bytes_uploaded * 100.0 / upload_session.file_size, 2),
+            updated_at=timezone.now()
+        )
+        if not updated:
+            upload_session.refresh_from_db()
+            return self._offset_conflict(upload_session)
+        
+        return Response({
+            'success': True,
+            'session_id': str(session_id),
+            'bytes_uploaded': bytes_uploaded,
+            'complete': bytes_uploaded == upload_session.file_size
+        })
+    
+    def _not_chunked(self):
+        return Response({
+            'success': False,
+            'error': 'Upload session has no chunked upload in progress'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    def _offset_conflict(self, upload_session):
+        response = Response({
+            'success': False,
+            'error': 'Upload offset mismatch',
+            'bytes_uploaded': upload_session.bytes_uploaded
+        }, status=status.HTTP_409_CONFLICT)
+        response['Upload-Offset'] = str(upload_session.bytes_uploaded)
+        return response
+
+
+class ChunkedUploadFinalizeView(AdmissionControlMixin, views.APIView):
+    """API endpoint for turning a fully uploaded file into an NFT"""
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    
+    def post(self, request, session_id):
+        """Run the NFT pipeline (image processing + IPFS upload) on the assembled file"""
+        start_time = time.time()
+        upload_session = UploadSession.objects.filter(session_id=session_id).first()
+        if upload_session is None:
+            return Response({
+                'success': False,
+                'error': 'Upload session not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if upload_session.upload_status == 'completed' and upload_session.response_data:
+            return Response(upload_session.response_data, status=status.HTTP_201_CREATED)
+        
+        if upload_session.bytes_uploaded != upload_session.file_size:
+            return Response({
+                'success': False,
+                'error': 'Upload is incomplete',
+                'bytes_uploaded': upload_session.bytes_uploaded,
+                'file_size': upload_session.file_size
+            }, status=status.HTTP_409_CONFLICT)
+        
+        if not chunked.has_partial(session_id):
+            return Response({
+                'success': False,
+                'error': 'Upload session has no chunked upload to finalize'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        # Claim the session so a duplicate finalize can't run the pipeline twice;
+        # failed sessions keep their file and may be finalized again
+        claimed = UploadSession.objects.filter(
+            pk=upload_session.pk,
+            upload_status__in=['uploading', 'failed']
+        ).update(upload_status='processing', error_message='', updated_at=timezone.now())
+        if not claimed:
+            return Response({
+                'success': False,
+                'session_id': str(session_id),
+                'error': 'Upload session is already being processed'
+            }, status=status.HTTP_409_CONFLICT)
+        upload_session.refresh_from_db()
+        
+        data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+        if isinstance(data.get('attributes'), str):
+            try:
+                data['attributes'] = json.loads(data['attributes']) if data['attributes'] else []
+            except json.JSONDecodeError:
+                upload_session.upload_status = 'uploading'
+                upload_session.save()
+                return Response({
+                    'success': False,
+                    'error': 'Invalid attributes JSON'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        image_file = chunked.open_upload(upload_session)
+        try:
+            data['image'] = image_file
+            serializer = CreateNFTSerializer(data=data)
+            if not serializer.is_valid():
+                upload_session.upload_status = 'uploading'
+                upload_session.save()
+                return Response({
+                    'success': False,
+                    'error': 'Invalid request data',
+                    'details': serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            upload_session.owner_address = serializer.validated_data['owner_address']
+            upload_session.collection_id = serializer.validated_data.get('collection_id')
+            response = run_create_nft_pipeline(upload_session, serializer.validated_data, start_time)
+        finally:
+            image_file.close()
+        
+        if upload_session.upload_status == 'completed':
+            chunked.discard_partial(session_id)
+        return response
+
+
+def invalid_trait_response(error):
+    """400 response for a malformed trait filter"""
+    return Response({
+        'success': False,
+        'error': 'Invalid trait parameter',
+        'details': str(error)
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def invalid_fields_response(error):
+    """400 response for an unknown sparse fieldset"""
+    return Response({
+        'success': False,
+        'error': 'Invalid fields parameter',
+        'details': str(error)
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NFTMetadataListView(ReplicaReadMixin, generics.ListAPIView):
+    """API endpoint for listing NFT metadata
+    
+    Rows are serialized from values() by the fast path, which matches
+    NFTMetadataSerializer; ``fields=id,name,...`` trims the payload.
+    ``trait=Background:Blue`` (repeatable, all must match) filters on the
+    denormalized attributes. Unchanged pages are answered with 304 before any rows are fetched.
+    """
     queryset = NFTMetadata.objects.all()
     serializer_class = NFTMetadataSerializer
+    renderer_classes = [FastJSONRenderer]
+    
+    def list(self, request, *args, **kwargs):
+        try:
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return invalid_fields_response(e)
+        try:
+            trait_filters = traits.parse_trait_filters(request.query_params.getlist('trait'))
+        except ValueError as e:
+            return invalid_trait_response(e)
+        
+        queryset = traits.filter_traits(self.filter_queryset(self.get_queryset()), trait_filters)
+        validators = conditional.list_validators(request, queryset)
+        not_modified = conditional.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        queryset = nft_values(queryset, fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(serialize_rows(page, fields))
+        else:
+            response = Response(serialize_rows(queryset, fields))
+        return conditional.set_validators(response, validators)
 
 
-class NFTMetadataDetailView(generics.RetrieveAPIView):
-    """API endpoint for retrieving specific NFT metadata"""
+class NFTMetadataDetailView(ReplicaReadMixin, generics.RetrieveAPIView):
+    """API endpoint for retrieving specific NFT metadata
+    
+    Full responses come from the metadata store when one is configured.
+    """
     queryset = NFTMetadata.objects.all()
     serializer_class = NFTMetadataSerializer
+    renderer_classes = [FastJSONRenderer]
     lookup_field = 'id'
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return invalid_fields_response(e)
+        
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        store = get_metadata_store()
+        if store is not None and fields == NFT_FIELDS:
+            stored = store.get(int(kwargs[lookup_url_kwarg]))
+            if stored is not None:
+                return self.stored_response(request, stored)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = {self.lookup_field: kwargs[lookup_url_kwarg]}
+        updated_at = generics.get_object_or_404(queryset.values_list('updated_at', flat=True), **lookup)
+        validators = conditional.object_validators(request, updated_at)
+        not_modified = conditional.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        row = generics.get_object_or_404(nft_values(queryset, fields), **lookup)
+        self.check_object_permissions(request, row)
+        return conditional.set_validators(Response(serialize_rows([row], fields)[0]), validators)
+    
+    def stored_response(self, request, stored):
+        """The pre-rendered detail JSON from the metadata store, without touching the database"""
+        validators = conditional.object_validators(request, stored.updated_at)
+        not_modified = conditional.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        self.check_object_permissions(request, stored)
+        return conditional.set_validators(HttpResponse(stored.detail, content_type='application/json'), validators)
+
+
+class TokenMetadataView(ReplicaReadMixin, views.APIView):
+    """API endpoint serving a minted token's ERC-721 metadata JSON, from the metadata store when built"""
+    
+    def get(self, request, contract_address, token_id):
+        store = get_metadata_store()
+        stored = store.get_token(contract_address, token_id) if store is not None else None
+        if stored is not None:
+            return HttpResponse(stored.metadata, content_type='application/json')
+        
+        row = nft_values(NFTMetadata.objects.filter(
+            contract_address=contract_address.lower(), token_id=token_id
+        )).first()
+        if row is None:
+            return Response({
+                'success': False,
+                'error': 'Token not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(token_metadata_json(serialize_rows([row])[0]), content_type='application/json')
+
+
+def tile_not_found_response():
+    return Response({
+        'success': False,
+        'error': 'Tile not found'
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+class NFTTileDescriptorView(views.APIView):
+    """API endpoint serving an NFT's Deep Zoom (DZI) descriptor; tiles are under tiles_files/"""
+    
+    def get(self, request, id):
+        """DZI XML for OpenSeadragon-style viewers"""
+        row = NFTMetadata.objects.filter(id=id).values_list('tile_pyramid', 'updated_at').first()
+        if row is None or not row[0]:
+            return Response({
+                'success': False,
+                'error': 'NFT has no deep-zoom tiles'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        pyramid, updated_at = row
+        validators = conditional.object_validators(request, updated_at)
+        not_modified = conditional.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        response = HttpResponse(tiles.descriptor_xml(pyramid), content_type='application/xml')
+        return conditional.set_validators(response, validators)
+
+
+class NFTTileView(views.APIView):
+    """API endpoint serving one deep-zoom tile
+    
+    Tile keys are content-addressed, so responses are cached as immutable and
+    a conditional request is answered without fetching the tile.
+    """
+    
+    def get(self, request, id, level, column, row, extension):
+        """Tile image bytes from Filebase"""
+        pyramid = NFTMetadata.objects.filter(id=id).values_list('tile_pyramid', flat=True).first()
+        if not pyramid or extension != pyramid['format'] or not tiles.has_tile(pyramid, level, column, row):
+            return tile_not_found_response()
+        
+        key = tiles.tile_key(pyramid, level, column, row)
+        etag = conditional.make_etag(key)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                body = filebase_service.s3_client.get_object(
+                    Bucket=filebase_service.bucket_name, Key=key
+                )['Body'].read()
+            except FilebaseUnavailableError as e:
+                return filebase_unavailable_response(e)
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                    return tile_not_found_response()
+                logger.error(f"Failed to fetch tile {key}: {e}")
+                return Response({
+                    'success': False,
+                    'error': 'Failed to fetch tile',
+                    'details': str(e)
+                }, status=status.HTTP_502_BAD_GATEWAY)
+            response = HttpResponse(body, content_type=tiles.TILE_CONTENT_TYPE)
+        
+        response['ETag'] = etag
+        response['Cache-Control'] = tiles.IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class StatsView(views.APIView):
+    """API endpoint for NFT statistics served from the daily rollups"""
+    
+    def get(self, request):
+        """Totals and daily series, optionally for one collection or owner"""
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'days must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if 'collection' in request.query_params:
+            dimension, value = 'collection', request.query_params['collection']
+        elif 'owner' in request.query_params:
+            dimension, value = 'owner', request.query_params['owner'].lower()
+        else:
+            dimension, value = 'all', ''
+        
+        return Response({
+            'success': True,
+            **stats.summarize(days=days, dimension=dimension, value=value)
+        })
+
+
+ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+
+
+class WalletNFTsView(views.APIView):
+    """API endpoint for the tokens a wallet currently holds, from indexed Transfer events"""
+    
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+    
+    def get(self, request, address):
+        """Holdings ordered by (contract, token id), paginated with an ``after`` cursor"""
+        if not ADDRESS_PATTERN.match(address):
+            return Response({
+                'success': False,
+                'error': 'Invalid wallet address'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        holdings = TokenOwnership.objects.filter(owner_address=address.lower())
+        contract = request.query_params.get('contract', '').lower()
+        if contract:
+            holdings = holdings.filter(contract_address=contract)
+        
+        # Keyset pagination: the cursor is the last (contract, token id) returned
+        after = request.query_params.get('after', '')
+        if after:
+            after_contract, _, after_token = after.rpartition(':')
+            if not ADDRESS_PATTERN.match(after_contract) or not after_token.isdigit():
+                return Response({
+                    'success': False,
+                    'error': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            holdings = holdings.filter(
+                Q(contract_address__gt=after_contract.lower()) |
+                Q(contract_address=after_contract.lower(), token_id__gt=int(after_token))
+            )
+        
+        rows = list(
+            holdings.order_by('contract_address', 'token_id').values(
+                'contract_address', 'token_id', 'block_number',
+                'nft_id', 'nft__name', 'nft__image_ipfs_url', 'nft__metadata_ipfs_url'
+            )[:limit + 1]
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        tokens = [{
+            'contract_address': row['contract_address'],
+            'token_id': row['token_id'],
+            'acquired_block': row['block_number'],
+            'nft': {
+                'id': row['nft_id'],
+                'name': row['nft__name'],
+                'image_ipfs_url': row['nft__image_ipfs_url'],
+                'metadata_ipfs_url': row['nft__metadata_ipfs_url'],
+            } if row['nft_id'] else None,
+        } for row in rows]
+        
+        return Response({
+            'success': True,
+            'owner_address': address.lower(),
+            'tokens': tokens,
+            'next_cursor': f"{rows[-1]['contract_address']}:{rows[-1]['token_id']}" if has_more else None,
+        })
+
+
+class ContractStatusView(views.APIView):
+    """API endpoint for the NFT contract's on-chain state, read through the cached RPC client"""
+    
+    def get(self, request):
+        """Supply, price and pause state; mint eligibility with ?address= and tokenURIs with ?token_ids="""
+        try:
+            reader = get_contract_reader()
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        minter = request.query_params.get('address', '')
+        if minter and not ADDRESS_PATTERN.match(minter):
+            return Response({
+                'success': False,
+                'error': 'Invalid wallet address'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            quantity = int(request.query_params.get('quantity', 1))
+            token_ids = [int(token_id) for token_id in request.query_params.get('token_ids', '').split(',') if token_id]
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'quantity and token_ids must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1 or len(token_ids) > 100 or any(token_id < 0 for token_id in token_ids):
+            return Response({
+                'success': False,
+                'error': 'quantity must be positive and at most 100 token_ids may be requested'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            contract_status = reader.status(minter=minter or None, quantity=quantity)
+            if token_ids:
+                contract_status['token_uris'] = {
+                    str(token_id): uri for token_id, uri in reader.token_uris(token_ids).items()
+                }
+        except RPCError as e:
+            logger.error(f"Contract status read failed: {e}")
+            return Response({
+                'success': False,
+                'error': 'Blockchain node unavailable',
+                'details': str(e)
+            }, status=status.HTTP_502_BAD_GATEWAY)
+        
+        # Wei amounts exceed JavaScript's safe integer range
+        for field in ('mint_price', 'cost'):
+            if contract_status[field] is not None:
+                contract_status[field] = str(contract_status[field])
+        
+        return Response({
+            'success': True,
+            **contract_status
+        })
+
+
+class CollectionBatchPrepareView(views.APIView):
+    """API endpoint that prepares a collection's next unminted NFTs for ownerBatchMint"""
+    
+    # NFTMinting.MAX_BATCH_SIZE
+    MAX_BATCH_SIZE = 500
+    
+    def get(self, request, collection_id):
+        """Metadata CIDs in mint order, with published (or predicted) token ids and the batch base URI"""
+        collection = NFTCollection.objects.filter(id=collection_id).first()
+        if collection is None:
+            return Response({
+                'success': False,
+                'error': 'Collection not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.MAX_BATCH_SIZE)), 1), self.MAX_BATCH_SIZE)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        unminted = NFTMetadata.objects.filter(collection_id=collection_id, token_id__isnull=True)
+        fields = ('id', 'name', 'metadata_ipfs_hash', 'metadata_ipfs_url', 'published_token_id')
+        if collection.metadata_root_cid:
+            # Published: the token ids are the file names under the collection's root
+            rows = list(
+                unminted.filter(published_token_id__isnull=False).order_by('published_token_id').values(*fields)[:limit]
+            )
+            start_token_id = rows[0]['published_token_id'] if rows else None
+            base_uri = f"ipfs://{collection.metadata_root_cid}/"
+        else:
+            rows = list(unminted.order_by('id').values(*fields)[:limit])
+            start_token_id = predict_next_token_id()
+            base_uri = None
+        
+        items = [{
+            'nft_id': row['id'],
+            'name': row['name'],
+            'token_id': (
+                row['published_token_id'] if base_uri
+                else start_token_id + position if start_token_id is not None else None
+            ),
+            'metadata_cid': row['metadata_ipfs_hash'],
+            'metadata_uri': row['metadata_ipfs_url'],
+        } for position, row in enumerate(rows)]
+        
+        return Response({
+            'success': True,
+            'collection_id': collection_id,
+            'quantity': len(items),
+            'start_token_id': start_token_id,
+            'base_uri': base_uri,
+            'metadata_cids': [item['metadata_cid'] for item in items],
+            'items': items,
+        })
+
+
+class CollectionPublishView(views.APIView):
+    """API endpoint that publishes a collection's metadata as one IPFS directory (CAR upload)"""
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request, collection_id):
+        """Upload every token's metadata JSON in one request and return the base URI"""
+        collection = NFTCollection.objects.filter(id=collection_id).first()
+        if collection is None:
+            return Response({
+                'success': False,
+                'error': 'Collection not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        start_token_id = request.data.get('start_token_id')
+        force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+        try:
+            start_token_id = predict_next_token_id() if start_token_id is None else int(start_token_id)
+            result = publish_collection(collection, start_token_id=start_token_id, force=force)
+        except FilebaseUnavailableError as e:
+            return filebase_unavailable_response(e)
+        except AlreadyPublishedError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Collection publish failed: {e}")
+            return Response({
+                'success': False,
+                'error': 'Collection publish failed',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'success': True,
+            **result
+        }, status=status.HTTP_201_CREATED)
+
+
+class SimilarImagesView(ReplicaReadMixin, views.APIView):
+    """API endpoint for near-duplicate image search over the perceptual hash index"""
+    parser_classes = [MultiPartParser, FormParser]
+    replica_methods = ('GET', 'HEAD', 'POST')  # Searching by upload stores nothing
+    
+    def get(self, request):
+        """Search by ?hash=<16 hex digits> or by an existing ?nft_id="""
+        exclude_id = None
+        nft_id = request.query_params.get('nft_id', '')
+        if nft_id:
+            nft = None
+            if nft_id.isdigit():
+                nft = NFTMetadata.objects.filter(id=nft_id).values('id', 'perceptual_hash').first()
+            if nft is None or not nft['perceptual_hash']:
+                return Response({
+                    'success': False,
+                    'error': 'NFT not found or has no perceptual hash'
+                }, status=status.HTTP_404_NOT_FOUND)
+            hash_hex, exclude_id = nft['perceptual_hash'], nft['id']
+        else:
+            hash_hex = request.query_params.get('hash', '').lower()
+            if not re.fullmatch(r'[0-9a-f]{16}', hash_hex):
+                return Response({
+                    'success': False,
+                    'error': 'Provide hash (16 hex digits) or nft_id'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        return self.search(request, hash_hex, exclude_id)
+    
+    def post(self, request):
+        """Search with an uploaded image, without storing it"""
+        serializer = ImageUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'error': 'Invalid image data',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with decoded(serializer.validated_data['image'].image_probe) as image:
+                hash_hex = dhash(image)
+        except ImageRejected as e:
+            return invalid_image_response(e)
+        return self.search(request, hash_hex)
+    
+    def search(self, request, hash_hex, exclude_id=None):
+        try:
+            distance = int(request.query_params.get('distance', settings.PHASH_DUPLICATE_DISTANCE))
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'distance and limit must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        distance = min(max(distance, 0), settings.PHASH_MAX_SEARCH_DISTANCE)
+        
+        return Response({
+            'success': True,
+            'perceptual_hash': hash_hex,
+            'distance': distance,
+            'matches': get_phash_index().find_similar(hash_hex, distance, limit=limit, exclude_id=exclude_id)
+        })
+
+
+class ProfileListView(views.APIView):
+    """Admin-only listing of captured request profiles"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """List captured profiles, newest first"""
+        return Response({
+            'success': True,
+            'profiles': get_profile_store().list()
+        })
+
+
+class ProfileDetailView(views.APIView):
+    """Admin-only access to a captured profile's metadata and SQL log"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        """Return profile metadata including recorded SQL queries"""
+        info = get_profile_store().get(profile_id)
+        if info is None:
+            return Response({
+                'success': False,
+                'error': 'Profile not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'success': True,
+            'profile': info
+        })
+
+
+class ProfileDownloadView(views.APIView):
+    """Admin-only download of a captured profile in pstats format"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        """Download the raw cProfile dump"""
+        path = get_profile_store().profile_path(profile_id)
+        if path is None:
+            return Response({
+                'success': False,
+                'error': 'Profile not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f"{profile_id}.prof",
+            content_type='application/octet-stream'
+        )
@@ -5,6 +5,7 @@ import "@openzeppelin/contracts/token/ERC721/ERC721.sol";
 import "@openzeppelin/contracts/token/ERC721/extensions/ERC721URIStorage.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/utils/Counters.sol";
+import "@openzeppelin/contracts/utils/Strings.sol";
 import "@openzeppelin/contracts/security/ReentrancyGuard.sol";
 import "@openzeppelin/contracts/security/Pausable.sol";
 
@@ -15,6 +16,7 @@ import "@openzeppelin/contracts/security/Pausable.sol";
  */
 contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausable {
     using Counters for Counters.Counter;
+    using Strings for uint256;
 
     // Token ID counter
     Counters.Counter private _tokenIdCounter;
@@ -31,6 +33,9 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
     // Maximum NFTs per transaction
     uint256 public constant MAX_PER_TX = 3;
 
+    // Maximum NFTs per owner batch mint (bounds the transaction's gas)
+    uint256 public constant MAX_BATCH_SIZE = 500;
+
     // Mapping to track minted count per address
     mapping(address => uint256) public mintedCount;
 
@@ -40,12 +45,25 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
     // Base URI for metadata
     string private _baseTokenURI;
 
+    // An owner batch mint: its tokens resolve to baseURI + tokenId
+    struct Batch {
+        uint256 quantity;
+        string baseURI;
+    }
+
+    // Start token ids of owner batch mints, ascending
+    uint256[] private _batchStarts;
+
+    // Owner batch mints by start token id
+    mapping(uint256 => Batch) private _batches;
+
     // Events
     event NFTMinted(address indexed to, uint256 indexed tokenId, string tokenURI);
     event NFTCreated(address indexed creator, address indexed to, uint256 indexed tokenId, string tokenURI);
     event MintPriceUpdated(uint256 oldPrice, uint256 newPrice);
     event BaseURIUpdated(string oldURI, string newURI);
     event Withdrawal(address indexed to, uint256 amount);
+    event BatchMinted(address indexed to, uint256 startTokenId, uint256 quantity);
 
     /**
      * @dev Constructor sets the NFT name, symbol, and initial owner
@@ -137,6 +155,58 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
         }
     }
 
+    /**
+     * @dev Owner-only batch mint for collections published as one metadata directory.
+     * No per-token URI is stored: the batch's tokens resolve to batchBaseURI + tokenId,
+     * so pass the collection's directory (e.g. ipfs://<rootCID>/). Tokens minted with
+     * mint/ownerMint keep resolving through the contract base URI.
+     * @param to Address to mint NFTs to
+     * @param quantity Number of NFTs to mint
+     * @param expectedStartTokenId Token id the directory's first file was published as
+     * @param batchBaseURI Base URI of the batch's metadata directory
+     */
+    function ownerBatchMint(
+        address to,
+        uint256 quantity,
+        uint256 expectedStartTokenId,
+        string calldata batchBaseURI
+    ) external onlyOwner nonReentrant {
+        require(to != address(0), "Cannot mint to zero address");
+        require(quantity > 0 && quantity <= MAX_BATCH_SIZE, "Invalid batch quantity");
+        require(bytes(batchBaseURI).length > 0, "Empty batch base URI");
+
+        // A mint landing first would shift every token off its published file
+        uint256 startTokenId = _tokenIdCounter.current();
+        require(startTokenId == expectedStartTokenId, "Unexpected start token id");
+        require(startTokenId + quantity <= MAX_SUPPLY, "Exceeds maximum supply");
+
+        _batchStarts.push(startTokenId);
+        Batch storage batch = _batches[startTokenId];
+        batch.quantity = quantity;
+        batch.baseURI = batchBaseURI;
+
+        for (uint256 i = 0; i < quantity; i++) {
+            _tokenIdCounter.increment();
+            _safeMint(to, startTokenId + i);
+        }
+
+        emit BatchMinted(to, startTokenId, quantity);
+    }
+
+    /**
+     * @dev Point an owner batch mint at a republished metadata directory (owner only)
+     * @param startTokenId First token id of the batch
+     * @param newBaseURI New base URI of the batch
+     */
+    function setBatchBaseURI(uint256 startTokenId, string calldata newBaseURI) external onlyOwner {
+        Batch storage batch = _batches[startTokenId];
+        require(batch.quantity > 0, "Unknown batch");
+        require(bytes(newBaseURI).length > 0, "Empty batch base URI");
+
+        batch.baseURI = newBaseURI;
+        emit BatchMetadataUpdate(startTokenId, startTokenId + batch.quantity - 1);
+    }
+
     /**
      * @dev Update the mint price (owner only)
      * @param newPrice New mint price in wei
@@ -148,7 +218,8 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
     }
 
     /**
-     * @dev Update the base token URI (owner only)
+     * @dev Update the base token URI of mint/ownerMint tokens (owner only);
+     * batch-minted tokens keep their batch's base URI
      * @param newBaseURI New base URI for metadata
      */
     function setBaseURI(string memory newBaseURI) external onlyOwner {
@@ -253,7 +324,28 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
     }
 
     /**
-     * @dev Override tokenURI to handle URI storage
+     * @dev Start token id of the owner batch mint containing a token, if any
+     */
+    function _batchStartOf(uint256 tokenId) internal view returns (bool, uint256) {
+        // Last batch starting at or before tokenId
+        uint256 low = 0;
+        uint256 high = _batchStarts.length;
+        while (low < high) {
+            uint256 middle = (low + high) / 2;
+            if (_batchStarts[middle] <= tokenId) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        if (low == 0) return (false, 0);
+
+        uint256 startTokenId = _batchStarts[low - 1];
+        return (tokenId < startTokenId + _batches[startTokenId].quantity, startTokenId);
+    }
+
+    /**
+     * @dev Override tokenURI to resolve batch-minted tokens through their batch's base URI
      */
     function tokenURI(uint256 tokenId)
         public
@@ -261,6 +353,11 @@ contract NFTMinting is ERC721, ERC721URIStorage, Ownable, ReentrancyGuard, Pausa
         override(ERC721, ERC721URIStorage)
         returns (string memory)
     {
+        _requireMinted(tokenId);
+        (bool batched, uint256 startTokenId) = _batchStartOf(tokenId);
+        if (batched) {
+            return string(abi.encodePacked(_batches[startTokenId].baseURI, tokenId.toString()));
+        }
         return super.tokenURI(tokenId);
     }
 
@@ -0,0 +1,148 @@
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+
+describe("NFTMinting gas", function () {
+  let nftContract;
+  let owner;
+  let addr1;
+
+  // As set by scripts/deploy.js; mint/ownerMint URIs resolve through it
+  const baseURI = "https://ipfs.filebase.io/ipfs/";
+  // A published collection directory
+  const batchBaseURI = "ipfs://bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi/";
+  // Realistic per-token URI as stored by mint/ownerMint today
+  const metadataURI = "ipfs://QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG";
+  // A batch stores its base URI once, so it pays off from a few tokens on
+  const batchSizes = [10, 100];
+
+  const gasPerToken = async (txPromise, quantity) => {
+    const receipt = await (await txPromise).wait();
+    return receipt.gasUsed.toNumber() / quantity;
+  };
+
+  beforeEach(async function () {
+    [owner, addr1] = await ethers.getSigners();
+
+    const NFTMinting = await ethers.getContractFactory("NFTMinting");
+    nftContract = await NFTMinting.deploy("Gas Test", "GAS", baseURI, owner.address);
+    await nftContract.deployed();
+  });
+
+  describe("ownerBatchMint", function () {
+    it("Should mint sequential token ids that resolve through the batch base URI", async function () {
+      await nftContract.connect(owner).ownerMint(addr1.address, 1, [metadataURI]);
+
+      await expect(nftContract.connect(owner).ownerBatchMint(addr1.address, 3, 1, batchBaseURI))
+        .to.emit(nftContract, "BatchMinted")
+        .withArgs(addr1.address, 1, 3);
+      await nftContract.connect(owner).ownerMint(addr1.address, 1, [metadataURI]);
+
+      expect(await nftContract.totalSupply()).to.equal(5);
+      expect(await nftContract.ownerOf(3)).to.equal(addr1.address);
+      expect(await nftContract.tokenURI(2)).to.equal(batchBaseURI + "2");
+      // Tokens minted with their own URI, before and after the batch, are unaffected
+      expect(await nftContract.tokenURI(0)).to.equal(baseURI + metadataURI);
+      expect(await nftContract.tokenURI(4)).to.equal(baseURI + metadataURI);
+    });
+
+    it("Should keep each batch on its own base URI", async function () {
+      const otherBaseURI = "ipfs://bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku/";
+      await nftContract.connect(owner).ownerBatchMint(addr1.address, 2, 0, batchBaseURI);
+      await nftContract.connect(owner).ownerBatchMint(addr1.address, 2, 2, otherBaseURI);
+      await nftContract.connect(owner).setBaseURI("ipfs://");
+
+      expect(await nftContract.tokenURI(1)).to.equal(batchBaseURI + "1");
+      expect(await nftContract.tokenURI(2)).to.equal(otherBaseURI + "2");
+
+      await expect(nftContract.connect(owner).setBatchBaseURI(0, otherBaseURI))
+        .to.emit(nftContract, "BatchMetadataUpdate")
+        .withArgs(0, 1);
+      expect(await nftContract.tokenURI(1)).to.equal(otherBaseURI + "1");
+      await expect(nftContract.connect(owner).setBatchBaseURI(1, otherBaseURI)).to.be.revertedWith("Unknown batch");
+    });
+
+    it("Should refuse a batch that would not start at the published token id", async function () {
+      // Another mint landed between publishing and minting
+      await nftContract.connect(owner).ownerMint(addr1.address, 1, [metadataURI]);
+
+      await expect(
+        nftContract.connect(owner).ownerBatchMint(addr1.address, 3, 0, batchBaseURI)
+      ).to.be.revertedWith("Unexpected start token id");
+    });
+
+    it("Should emit the BatchMinted log the backend indexer links tokens from", async function () {
+      // BATCH_MINTED_TOPIC in backend/nfts/indexer.py
+      const batchMintedTopic = "0x59f9fb6d992d2aee0ed338bb4c504a17fd3f67ae91a3135bc2ef947e308c41b2";
+      expect(ethers.utils.id("BatchMinted(address,uint256,uint256)")).to.equal(batchMintedTopic);
+
+      const receipt = await (await nftContract.connect(owner).ownerBatchMint(addr1.address, 3, 0, batchBaseURI)).wait();
+      const log = receipt.logs.find((entry) => entry.topics[0] === batchMintedTopic);
+      expect(log).to.not.equal(undefined);
+      expect(log.address).to.equal(nftContract.address);
+      expect(log.topics[1]).to.equal(ethers.utils.hexZeroPad(addr1.address, 32).toLowerCase());
+
+      // The indexer reads startTokenId and quantity from the data words, then tokenURI(startTokenId)
+      const [startTokenId, quantity] = ethers.utils.defaultAbiCoder.decode(["uint256", "uint256"], log.data);
+      expect(startTokenId).to.equal(0);
+      expect(quantity).to.equal(3);
+      expect(await nftContract.tokenURI(startTokenId)).to.equal(batchBaseURI + "0");
+    });
+
+    it("Should not allow non-owner to batch mint", async function () {
+      await expect(
+        nftContract.connect(addr1).ownerBatchMint(addr1.address, 2, 0, batchBaseURI)
+      ).to.be.revertedWith("Ownable: caller is not the owner");
+    });
+
+    it("Should enforce the batch size limit", async function () {
+      const maxBatch = await nftContract.MAX_BATCH_SIZE();
+
+      await expect(
+        nftContract.connect(owner).ownerBatchMint(addr1.address, maxBatch.add(1), 0, batchBaseURI)
+      ).to.be.revertedWith("Invalid batch quantity");
+    });
+  });
+
+  describe("Per-token gas", function () {
+    for (const quantity of batchSizes) {
+      it(`Should cost less per token than ownerMint for ${quantity} tokens`, async function () {
+        const uriMint = await gasPerToken(
+          nftContract.connect(owner).ownerMint(addr1.address, quantity, Array(quantity).fill(metadataURI)),
+          quantity
+        );
+        const batchMint = await gasPerToken(
+          nftContract.connect(owner).ownerBatchMint(addr1.address, quantity, quantity, batchBaseURI),
+          quantity
+        );
+
+        console.log(
+          `      ${quantity} tokens: ownerMint ${Math.round(uriMint)} gas/token, ` +
+            `ownerBatchMint ${Math.round(batchMint)} gas/token ` +
+            `(${Math.round((1 - batchMint / uriMint) * 100)}% less)`
+        );
+        expect(batchMint).to.be.lessThan(uriMint);
+      });
+    }
+
+    it("Should cost less per token than paid mint of MAX_PER_TX tokens", async function () {
+      const quantity = 3;
+      const cost = await nftContract.calculateCost(quantity);
+      const paidMint = await gasPerToken(
+        nftContract.connect(addr1).mint(addr1.address, quantity, Array(quantity).fill(metadataURI), {
+          value: cost,
+        }),
+        quantity
+      );
+      const batchMint = await gasPerToken(
+        nftContract.connect(owner).ownerBatchMint(addr1.address, quantity, quantity, batchBaseURI),
+        quantity
+      );
+
+      console.log(
+        `      ${quantity} tokens: mint ${Math.round(paidMint)} gas/token, ` +
+          `ownerBatchMint ${Math.round(batchMint)} gas/token`
+      );
+      expect(batchMint).to.be.lessThan(paidMint);
+    });
+  });
+});